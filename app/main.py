@@ -71,6 +71,7 @@ def process_streaming_response(response, question):
     """스트리밍 응답을 실시간으로 처리하고 UI에 표시합니다."""
     response_received = False
     interactive_seen = False
+    run_id = None
     
     # 현재까지의 모든 응답을 저장할 리스트
     current_responses = []
@@ -104,6 +105,8 @@ def process_streaming_response(response, question):
                 agent_label = "<small style='color:#666;'>🔄 콘솔 탐색 중...</small><br>"
             elif resp["chunk_type"] == "response":
                 agent_label = "<small style='color:#666;'>✅ 응답 생성 완료</small><br>"
+            elif resp["chunk_type"] == "error":
+                agent_label = "<small style='color:#c00;'>⚠️ 처리 실패</small><br>"
             full_response += f"{agent_label}{resp['content']}<br><br>"
         
         message_placeholder.markdown(full_response, unsafe_allow_html=True)
@@ -136,8 +139,32 @@ def process_streaming_response(response, question):
             new_chunk_type = None
             new_chunk_text = None
             
-            # 우선순위: table_ui > table_rag > ui_intro > interactive > navigation > progress > response
-            if "table_ui" in event_data and isinstance(event_data["table_ui"], dict) and "response" in event_data["table_ui"]:
+            # 서버 compact 이벤트: {"type": 노드명, "response": 본문, "meta": {...}}
+            event_type = event_data.get("type")
+            if event_type == "run":
+                # 실패 시 같은 질문을 다시 보내면 이 run_id로 중단 지점부터 재개
+                run_id = (event_data.get("meta") or {}).get("run_id")
+            elif event_type == "error":
+                # 실패한 실행: 완료 표시(legacy "response" 분기)로 떨어지지 않도록 먼저 처리
+                new_chunk_type = "error"
+                new_chunk_text = event_data.get("response") or "처리 중 오류가 발생했습니다."
+                if (event_data.get("meta") or {}).get("retryable") and run_id:
+                    st.session_state.resume_run = {"question": question, "run_id": run_id}
+                    new_chunk_text += "<br>같은 질문을 다시 보내면 완료된 단계는 건너뛰고 중단된 지점부터 이어서 처리합니다."
+            elif event_type in ("table_ui", "table_rag", "ui_intro", "interactive", "navigation"):
+                new_chunk_type = event_type
+                new_chunk_text = event_data.get("response")
+                if event_type == "interactive":
+                    interactive_seen = True
+            elif event_type == "rag":
+                # RAG 자체 응답은 숨기고 진행 메시지만 노출
+                new_chunk_type = "progress"
+                new_chunk_text = "문서 검색 중..."
+            elif event_type == "route":
+                # 라우팅 결과는 표시하지 않음
+                pass
+            # (구 형식) 우선순위: table_ui > table_rag > ui_intro > interactive > navigation > progress > response
+            elif "table_ui" in event_data and isinstance(event_data["table_ui"], dict) and "response" in event_data["table_ui"]:
                 new_chunk_type = "table_ui"
                 new_chunk_text = event_data["table_ui"]["response"]
             elif "table_rag" in event_data and isinstance(event_data["table_rag"], dict) and "response" in event_data["table_rag"]:
@@ -219,9 +246,14 @@ def process_question(question):
         # 스트리밍 API 호출
         with st.spinner("APIM 서비스 문서를 검색하는 중입니다..."):
             print(f"[DEBUG] API 요청 시작: {question}")
+            # 직전에 같은 질문이 재시도 가능한 오류로 끝났으면 그 run_id로 재개 요청
+            payload = {"question": question}
+            resume = st.session_state.pop("resume_run", None)
+            if resume and resume.get("question") == question:
+                payload["run_id"] = resume["run_id"]
             response = requests.post(
                 f"{API_BASE_URL}/stream",
-                json={"question": question},
+                json=payload,
                 stream=True,
                 headers={"Content-Type": "application/json"},
                 timeout=60  # 타임아웃 설정
@@ -233,6 +265,13 @@ def process_question(question):
                 # 스트리밍 응답을 chunk별로 처리하여 UI에 바로 반영
                 process_streaming_response(response, question)
                 print(f"[DEBUG] 스트리밍 응답 처리 완료")
+            elif response.status_code == 503:
+                # 서버 부하 차단: 대기열 초과/예상 대기 시간 초과
+                detail = response.json().get("detail") or {}
+                st.session_state.chat_history.append({
+                    "role": "error",
+                    "content": detail.get("message") or "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요",
+                })
             else:
                 error_msg = f"API 오류: {response.status_code} - {response.text}"
                 print(f"[ERROR] {error_msg}")
@@ -0,0 +1,91 @@
+"""record/replay LLM 백엔드로 그래프 + 스트리머 엔드투엔드 지연/처리량 측정
+
+1) 실제 Azure 호출을 한 번 기록:
+    LLM_BACKEND=record python -m benchmarks.graph_replay --runs 1
+2) 이후 오프라인에서 반복 측정(기록된 지연 재현 또는 고정 지연):
+    python -m benchmarks.graph_replay --runs 5 --concurrency 4
+    python -m benchmarks.graph_replay --latency-ms 0      # LLM 지연 제외, 순수 오버헤드
+
+재생 모드는 ui_mode="never"로 고정한다: 기록/재생 대상은 LLM 호출뿐이고 navigation/interactive 노드는
+실제 콘솔에 Chromium으로 접속하므로, 켜 두면 오프라인 측정이 아니게 되고 콘솔 응답 시간이 결과에 섞인다.
+따라서 측정 범위는 route → rag → table_rag 문서 경로와 스트리머 오버헤드다.
+기록 모드(LLM_BACKEND=record, 온라인)에서만 --ui-mode로 콘솔 브랜치를 포함할 수 있다.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from utils.config import settings
+from utils.replay_llm import get_cassette
+from benchmarks.llm_tiers import DEFAULT_QUESTIONS
+
+
+async def consume(question: str, use_cache: bool = False, ui_mode: str = "never") -> dict:
+    """apim_query_streamer의 SSE 출력을 끝까지 소비하고 측정값 반환"""
+    from routers.workflow import apim_query_streamer
+    start = time.perf_counter()
+    first = None
+    events = 0
+    nbytes = 0
+    async for line in apim_query_streamer(question, ui_mode=ui_mode, use_cache=use_cache):
+        if first is None:
+            first = time.perf_counter() - start
+        events += 1
+        nbytes += len(line.encode("utf-8"))
+    return {"total": time.perf_counter() - start, "first": first or 0.0, "events": events, "bytes": nbytes}
+
+
+async def bench(questions: list[str], runs: int, concurrency: int, use_cache: bool = False,
+                ui_mode: str = "never") -> None:
+    sem = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(q):
+        async with sem:
+            results.append(await consume(q, use_cache, ui_mode))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for _ in range(runs) for q in questions))
+    wall = time.perf_counter() - start
+
+    totals = sorted(r["total"] for r in results)
+    p95 = totals[min(len(totals) - 1, int(len(totals) * 0.95))]
+    print(f"backend={settings.LLM_BACKEND} ui_mode={ui_mode} requests={len(results)} concurrency={concurrency}")
+    print(f"latency p50={statistics.median(totals):.3f}s p95={p95:.3f}s "
+          f"first-event p50={statistics.median(r['first'] for r in results):.3f}s")
+    print(f"throughput={len(results) / wall:.2f} req/s wall={wall:.2f}s "
+          f"avg events={statistics.mean(r['events'] for r in results):.1f} "
+          f"avg bytes={statistics.mean(r['bytes'] for r in results):.0f}")
+    if settings.LLM_BACKEND in ("record", "replay"):
+        cassette = get_cassette(settings.LLM_CASSETTE_PATH)
+        print(f"cassette={cassette.path} records={len(cassette.records)} hits={cassette.hits} misses={cassette.misses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="record/replay 기반 오프라인 엔드투엔드 벤치마크")
+    parser.add_argument("--question", action="append", help="질문(여러 번 지정 가능)")
+    parser.add_argument("--runs", type=int, default=3, help="질문별 반복 횟수")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 요청 수")
+    parser.add_argument("--latency-ms", type=float, default=None, help="재생 시 고정 LLM 지연(ms)")
+    parser.add_argument("--latency-scale", type=float, default=None, help="기록된 지연 배율")
+    parser.add_argument("--cache", action="store_true", help="답변 캐시 사용(기본: 미사용)")
+    parser.add_argument("--ui-mode", default="never", choices=["auto", "always", "never"],
+                        help="콘솔 브랜치(기록 모드에서만 적용, 재생 모드는 never 고정)")
+    args = parser.parse_args()
+    # 명시적으로 record를 지정하지 않으면 재생 모드로 실행(브라우저 노드 없이 오프라인)
+    ui_mode = args.ui_mode
+    if settings.LLM_BACKEND != "record":
+        settings.LLM_BACKEND = "replay"
+        if ui_mode != "never":
+            print(f"[graph_replay] 재생 모드는 오프라인 측정을 위해 ui_mode=never로 실행합니다(요청: {ui_mode})")
+        ui_mode = "never"
+    if args.latency_ms is not None:
+        settings.LLM_REPLAY_LATENCY_MS = args.latency_ms
+    if args.latency_scale is not None:
+        settings.LLM_REPLAY_LATENCY_SCALE = args.latency_scale
+    asyncio.run(bench(args.question or DEFAULT_QUESTIONS, args.runs, args.concurrency, args.cache, ui_mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""노드별 LLM 티어 구성에 따른 엔드투엔드 지연시간 비교 벤치마크
+
+사용법(server 디렉토리에서):
+    python -m benchmarks.llm_tiers --runs 3
+    python -m benchmarks.llm_tiers --configs baseline,tiered --question "게이트웨이 설정 방법은?"
+
+그래프는 ui_mode="never"로 실행한다(라우터 판단에 따라 실행마다 콘솔 탐색이 끼어들지 않도록).
+브라우저 노드(portal_select, next_action)의 티어는 비교 대상에서 빠진다.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from utils.config import settings
+from workflow.runtime import LLM_NODES, get_runtime, init_runtime
+
+# 비교할 티어 구성: baseline(전부 large) / tiered(기본값) / all_fast(전부 fast)
+TIER_CONFIGS = {
+    "baseline": {node: "large" for node in LLM_NODES},
+    "tiered": dict(settings.LLM_NODE_TIERS),
+    "all_fast": {node: "fast" for node in LLM_NODES},
+}
+
+DEFAULT_QUESTIONS = [
+    "API 인증 방법을 알려주세요",
+    "게이트웨이 설정 방법은?",
+    "사용자 권한 관리는 어떻게 하나요?",
+]
+
+
+async def run_once(question: str) -> dict:
+    """그래프를 한 번(문서 브랜치만) 실행하고 노드별 완료 시각(시작 기준, 초)과 전체 시간을 반환"""
+    graph = get_runtime().graph
+    state = {"messages": [{"role": "user", "content": question}], "ui_mode": "never"}
+    node_times = {}
+    start = time.perf_counter()
+    async for chunk in graph.astream(state, stream_mode="updates"):
+        for node in chunk or {}:
+            node_times[node] = time.perf_counter() - start
+    return {"total": time.perf_counter() - start, "nodes": node_times}
+
+
+async def bench(configs: list[str], questions: list[str], runs: int) -> None:
+    original = dict(settings.LLM_NODE_TIERS)
+    rows = []
+    try:
+        for name in configs:
+            settings.LLM_NODE_TIERS = TIER_CONFIGS[name]
+            # 티어 변경을 반영하도록 LLM 클라이언트/에이전트 재생성
+            init_runtime()
+            totals = []
+            first_answer = []
+            for _ in range(runs):
+                for q in questions:
+                    result = await run_once(q)
+                    totals.append(result["total"])
+                    if "table_rag" in result["nodes"]:
+                        first_answer.append(result["nodes"]["table_rag"])
+            rows.append((name, totals, first_answer))
+    finally:
+        settings.LLM_NODE_TIERS = original
+
+    print(f"{'config':<10} {'n':>3} {'p50(s)':>8} {'p95(s)':>8} {'mean(s)':>8} {'table_rag p50(s)':>17}")
+    for name, totals, first_answer in rows:
+        ordered = sorted(totals)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        fa = f"{statistics.median(first_answer):.2f}" if first_answer else "-"
+        print(f"{name:<10} {len(totals):>3} {statistics.median(totals):>8.2f} {p95:>8.2f} "
+              f"{statistics.mean(totals):>8.2f} {fa:>17}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="노드별 LLM 티어 구성별 지연시간 비교")
+    parser.add_argument("--configs", default=",".join(TIER_CONFIGS), help="쉼표로 구분한 구성 이름")
+    parser.add_argument("--question", action="append", help="질문(여러 번 지정 가능)")
+    parser.add_argument("--runs", type=int, default=1, help="질문별 반복 횟수")
+    args = parser.parse_args()
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    unknown = [c for c in configs if c not in TIER_CONFIGS]
+    if unknown:
+        parser.error(f"알 수 없는 구성: {unknown} (가능: {list(TIER_CONFIGS)})")
+    asyncio.run(bench(configs, args.question or DEFAULT_QUESTIONS, args.runs))
+
+
+if __name__ == "__main__":
+    main()
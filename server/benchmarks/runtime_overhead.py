@@ -0,0 +1,73 @@
+"""요청당 그래프 컴파일/에이전트·LLM 클라이언트 생성 오버헤드 측정(before/after)
+
+before: 요청마다 ApimRuntime을 새로 생성(그래프 재컴파일 + 에이전트/LLM 클라이언트 재생성, 기존 동작)
+after : lifespan에서 만든 런타임을 재사용
+
+사용법(server 디렉토리에서):
+    python -m benchmarks.runtime_overhead --iterations 50
+    python -m benchmarks.runtime_overhead --full --iterations 5   # replay 백엔드로 그래프 전체 실행 포함
+
+--full 실행은 ui_mode="never"로 고정한다: 라우터 판단(탐색 기록/탐색 샘플링)에 따라
+실행마다 브라우저 브랜치가 끼어들면 런타임 재사용 효과가 아니라 콘솔 탐색 시간을 재게 된다.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from utils.config import settings
+from workflow import runtime as rt
+
+
+def _stats(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1000:.2f}ms p95={p95 * 1000:.2f}ms mean={statistics.mean(ordered) * 1000:.2f}ms"
+
+
+async def _run_graph(question: str) -> None:
+    """문서 브랜치만 실행(ui_mode=never)"""
+    state = {"messages": [{"role": "user", "content": question}], "ui_mode": "never"}
+    async for _ in rt.get_runtime().graph.astream(state, stream_mode="updates"):
+        pass
+
+
+async def bench(iterations: int, full: bool, question: str) -> None:
+    vector_db = rt.get_runtime().vector_db  # 모델 로딩은 양쪽 모두 공유(측정 제외)
+
+    before, after = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rt.init_runtime(vector_db=vector_db)
+        if full:
+            await _run_graph(question)
+        before.append(time.perf_counter() - start)
+
+    shared = rt.init_runtime(vector_db=vector_db)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        assert rt.get_runtime() is shared
+        if full:
+            await _run_graph(question)
+        after.append(time.perf_counter() - start)
+
+    label = "요청 전체" if full else "요청당 준비 오버헤드"
+    print(f"[{label}] iterations={iterations}")
+    print(f"  before(요청마다 생성): {_stats(before)}")
+    print(f"  after (런타임 재사용): {_stats(after)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="런타임 컨테이너 도입 전후 요청당 오버헤드 비교")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--full", action="store_true", help="replay 백엔드로 그래프 전체 실행까지 포함")
+    parser.add_argument("--question", default="게이트웨이 설정 방법은?")
+    args = parser.parse_args()
+    if args.full and settings.LLM_BACKEND == "azure":
+        settings.LLM_BACKEND = "replay"
+        settings.LLM_REPLAY_LATENCY_MS = 0
+    asyncio.run(bench(args.iterations, args.full, args.question))
+
+
+if __name__ == "__main__":
+    main()
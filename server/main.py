@@ -1,8 +1,9 @@
 import uvicorn
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from pathlib import Path
-from retrieval.vector_db import init_global_vector_db
+import asyncio
+from retrieval.vector_db import init_default_vector_db
+from workflow.runtime import start_runtime, shutdown_runtime
 import os
 
 # from db.database import Base, engine  # DB 초기화 코드(주석처리)
@@ -15,13 +16,12 @@ from routers import workflow
 async def lifespan(app: FastAPI):
     # 토크나이저 병렬 경고 비활성화
     os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
-    root = Path(__file__).resolve().parents[0]
-    retrieval_dir = root / 'retrieval'
-    pdf_dir = retrieval_dir / 'apim_docs'
-    vec_path = retrieval_dir / 'apim_vector_data.pkl'
-    idx_path = retrieval_dir / 'apim_faiss_index.bin'
-    init_global_vector_db(str(pdf_dir), str(vec_path), str(idx_path))
+    # 문서 인덱스 로드(없거나 문서가 더 최신이면 재생성). CLI/벤치마크의 get_runtime()도 같은 경로를 쓴다
+    vector_db = await asyncio.to_thread(init_default_vector_db)
+    # 그래프 컴파일/에이전트/LLM 클라이언트를 한 번만 생성해 요청 간 공유
+    app.state.runtime = await start_runtime(vector_db=vector_db)
     yield
+    await shutdown_runtime()
 
 # FastAPI 인스턴스 생성
 app = FastAPI(
@@ -0,0 +1,102 @@
+# ReAct 스텝의 클릭 후보 사전 순위: 현재 화면의 링크/버튼을 질문·RAG 스니펫과 비교해 점수화
+# 문서 검색과 같은 인코더(VectorDB)로 요소 이름을 임베딩하고(encode_queries 캐시 → 메뉴/사이드바처럼 반복되는
+# 이름은 한 번만 인코딩), 점수는 행렬곱 한 번으로 계산한다.
+#   score = 0.7 * max(요소·질문 질의) + 0.3 * max(요소·RAG 스니펫)
+# 질문 질의는 원문 + APIM 용어 사전 확장(영문 UI 이름과 맞추기 위함).
+# InteractiveAgent는 상위 top_k개만 LLM에 보내고, 1위가 충분히 높고 2위와 격차가 크면 LLM 없이 바로 클릭한다.
+# score_pages는 병렬 탭 탐색에서 열어 본 화면(제목/헤딩/본문)을 질문과 비교하는 데 쓴다.
+
+import numpy as np
+
+from retrieval.query_rewrite import LocalQueryRewriter
+
+# 클릭으로 화면을 이동하는 역할만 후보(입력창/체크박스 등 제외)
+CLICKABLE_ROLES = {"link", "button", "menuitem", "menuitemcheckbox", "menuitemradio", "tab", "treeitem"}
+# 병렬 탭에서 미리 열어 봐도 되는 이동용 역할(버튼은 생성/삭제 같은 부수 효과가 있을 수 있어 제외)
+NAVIGATION_ROLES = {"link", "menuitem", "tab", "treeitem"}
+
+QUESTION_WEIGHT = 0.7
+SNIPPET_WEIGHT = 0.3
+
+
+def snippet_texts(rag_snippets: list[dict] | None, limit: int = 200) -> list[str]:
+    """search_texts 결과 → 스니펫 문자열"""
+    texts = []
+    for r in rag_snippets or []:
+        text = ((r.get("document") or {}).get("search_text") or "")[:limit].strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+class ActionRanker:
+    def __init__(self, vector_db, top_k: int = 12, auto_score: float = 0.6, auto_margin: float = 0.15):
+        """
+        Args:
+            vector_db: 인코더를 공유할 VectorDB
+            top_k: LLM에 보낼 후보 수
+            auto_score: 자동 클릭할 1위 최소 점수
+            auto_margin: 자동 클릭할 1위-2위 최소 격차
+        """
+        self.vector_db = vector_db
+        self.top_k = top_k
+        self.auto_score = auto_score
+        self.auto_margin = auto_margin
+        self.rewriter = LocalQueryRewriter(vector_db)
+        self.ranked_steps = 0
+        self.auto_steps = 0
+
+    def _question_queries(self, question: str) -> list[str]:
+        expanded = self.rewriter.expand(question)
+        return [question] + ([expanded] if expanded else [])
+
+    def rank(self, question: str, rag_snippets: list[dict] | None, elements: list[dict]) -> list[dict]:
+        """클릭 후보를 점수 내림차순으로 [{...element, score}]"""
+        candidates = [el for el in elements if el.get("role") in CLICKABLE_ROLES and el.get("name")]
+        if not candidates:
+            return []
+        queries = self._question_queries(question)
+        snippets = snippet_texts(rag_snippets)
+        names = [el["name"] for el in candidates]
+        # 질의/스니펫/요소 이름을 한 번의 배치로 인코딩(캐시에 없는 것만)
+        vectors = self.vector_db.encode_queries(queries + snippets + names)
+        q = vectors[:len(queries)]
+        s = vectors[len(queries):len(queries) + len(snippets)]
+        e = vectors[len(queries) + len(snippets):]
+        scores = QUESTION_WEIGHT * (e @ q.T).max(axis=1)
+        if len(snippets):
+            scores = scores + SNIPPET_WEIGHT * (e @ s.T).max(axis=1)
+        else:
+            scores = scores / QUESTION_WEIGHT
+        order = np.argsort(-scores)
+        self.ranked_steps += 1
+        return [{**candidates[i], "score": round(float(scores[i]), 3)} for i in order]
+
+    def score_pages(self, question: str, texts: list[str]) -> list[float]:
+        """화면 텍스트들과 질문의 유사도(질문 질의 중 최고값)"""
+        if not texts:
+            return []
+        queries = self._question_queries(question)
+        vectors = self.vector_db.encode_queries(queries + texts)
+        scores = (vectors[len(queries):] @ vectors[:len(queries)].T).max(axis=1)
+        return [round(float(x), 3) for x in scores]
+
+    def dominant(self, ranked: list[dict], exclude: set | None = None) -> dict | None:
+        """1위가 auto_score 이상이고 2위보다 auto_margin 이상 높으면 1위(이미 자동 클릭한 요소는 제외)"""
+        if not ranked:
+            return None
+        top = ranked[0]
+        if exclude and (top["role"], top["name"]) in exclude:
+            return None
+        runner_up = ranked[1]["score"] if len(ranked) > 1 else 0.0
+        if top["score"] >= self.auto_score and top["score"] - runner_up >= self.auto_margin:
+            self.auto_steps += 1
+            return top
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "ranked_steps": self.ranked_steps,
+            "auto_steps": self.auto_steps,
+            "auto_ratio": round(self.auto_steps / self.ranked_steps, 3) if self.ranked_steps else None,
+        }
@@ -0,0 +1,123 @@
+# 내비게이션 메모리: InteractiveAgent가 answer에 도달한 탐색 경로를 질문 임베딩 + 포털(호스트) 기준으로 저장
+# 항목: {question, host, start_url, final_url, clicks, headings, replays, failures, saved_at, last_used}
+# - clicks: 재생용 경로 [{"goto": url} | {"element": {role, name, nth | selector}} | {"target": {by, value}}]
+# - headings: 최종 화면의 헤딩(재방문 시 같은 화면인지 검증)
+# 비슷한 질문이 오면 최종 URL로 바로 이동(안 되면 클릭 경로 재생) → 검증에 실패하면 평소처럼 탐색한다.
+# 검증 실패가 누적된 항목(포털 화면 구조 변경 등)은 삭제한다.
+# 호출 측은 asyncio.to_thread로 부른다(질문 인코딩/파일 저장이 블로킹). 인코딩은 잠금 밖에서 하고
+# 잠금은 항목 변경과 저장에만 쓴다.
+
+import json
+import threading
+import time
+from pathlib import Path
+
+
+class NavigationMemory:
+    def __init__(self, path: str, vector_db, max_entries: int = 500, min_similarity: float = 0.85):
+        """
+        Args:
+            path: 저장 파일(JSON)
+            vector_db: 질문 임베딩에 쓸 VectorDB(문서 검색과 같은 인코더)
+            max_entries: 최대 항목 수(넘으면 가장 오래 안 쓴 항목부터 삭제)
+            min_similarity: 재사용할 최소 질문 유사도
+        """
+        self.path = Path(path)
+        self.vector_db = vector_db
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.entries: list[dict] = []
+        self._vectors = None  # entries와 같은 순서의 질문 임베딩(필요할 때 한 번에 계산)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.verified = 0
+        self.rejected = 0
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding="utf-8")).get("entries") or []
+                print(f"[nav_memory] 로드: {len(self.entries)}개 경로")
+            except Exception as e:
+                print(f"[nav_memory] 로드 실패: {e}")
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps({"entries": self.entries}, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception as e:
+            print(f"[nav_memory] 저장 실패: {e}")
+
+    def _matrix(self) -> tuple[list[dict], object]:
+        """(항목 스냅샷, 같은 순서의 질문 임베딩). 임베딩이 없거나 항목이 바뀌었으면 잠금 밖에서 다시 계산"""
+        with self._lock:
+            entries, vectors = list(self.entries), self._vectors
+        if vectors is None or len(vectors) != len(entries):
+            questions = [e["question"] for e in entries]
+            vectors = self.vector_db.encode_queries(questions)
+            with self._lock:
+                # 계산하는 사이 항목이 바뀌었으면 이번 조회에만 쓰고 저장하지 않음
+                if [e["question"] for e in self.entries] == questions:
+                    self._vectors = vectors
+        return entries, vectors
+
+    def lookup(self, question: str, host: str | None) -> dict | None:
+        """같은 포털에서 가장 비슷한 질문의 경로 {entry, similarity}. min_similarity 미만이면 None"""
+        with self._lock:
+            self.lookups += 1
+            if not self.entries:
+                return None
+        query = self.vector_db.encode_queries([question])[0]
+        entries, vectors = self._matrix()
+        similarities = vectors @ query
+        best, best_similarity = None, self.min_similarity
+        for entry, similarity in zip(entries, similarities):
+            if entry.get("host") == host and similarity >= best_similarity:
+                best, best_similarity = entry, float(similarity)
+        if best is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        return {"entry": best, "similarity": round(best_similarity, 3)}
+
+    def record(self, question: str, host: str | None, start_url: str, final_url: str, clicks: list[dict],
+               headings: list[str]) -> None:
+        """answer에 도달한 경로 저장(같은 포털의 같은 질문은 갱신)"""
+        now = time.time()
+        with self._lock:
+            entry = next((e for e in self.entries if e["question"] == question and e.get("host") == host), None)
+            if entry is None:
+                entry = {"question": question, "host": host, "replays": 0, "failures": 0}
+                self.entries.append(entry)
+            entry.update(start_url=start_url, final_url=final_url, clicks=clicks, headings=headings[:10],
+                         saved_at=now, last_used=now)
+            if len(self.entries) > self.max_entries:
+                self.entries.sort(key=lambda e: e.get("last_used") or 0, reverse=True)
+                del self.entries[self.max_entries:]
+                self._vectors = None
+            self._save()
+
+    def mark(self, entry: dict, verified: bool) -> None:
+        """재방문 검증 결과 반영. 실패가 재사용 성공보다 많아지면(2회 이상) 삭제"""
+        with self._lock:
+            if verified:
+                self.verified += 1
+                entry["replays"] = entry.get("replays", 0) + 1
+                entry["last_used"] = time.time()
+            else:
+                self.rejected += 1
+                entry["failures"] = entry.get("failures", 0) + 1
+                if entry["failures"] >= 2 and entry["failures"] > entry.get("replays", 0) and entry in self.entries:
+                    self.entries.remove(entry)
+                    self._vectors = None
+            self._save()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "verified": self.verified,
+            "rejected": self.rejected,
+        }
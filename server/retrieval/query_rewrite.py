@@ -0,0 +1,156 @@
+# 로컬 검색질의 변환(LLM 왕복 없이 한국어 질문 → 벡터DB 검색)
+# - glossary: APIM 한국어 용어 → 영어 키워드 사전 확장
+# - multilingual: 다국어 인코더(VECTOR_DB_MODEL)로 한국어 질문을 문서와 같은 공간에 직접 임베딩
+# - hybrid: 두 결과를 합쳐 문서별 최고 유사도로 정렬
+# 최고 유사도(confidence)가 임계값 미만이면 호출 측(RAGAgent)에서 LLM 변환으로 폴백한다.
+
+import re
+from typing import Any, Dict, List, Tuple
+
+# 긴 용어가 먼저 매칭되도록 길이 역순으로 사용
+APIM_GLOSSARY: Dict[str, str] = {
+    # 정책
+    "서킷 브레이커": "circuit breaker",
+    "서킷브레이커": "circuit breaker",
+    "레이트 리밋": "rate limiting",
+    "레이트리밋": "rate limiting",
+    "속도 제한": "rate limiting",
+    "호출 제한": "rate limiting",
+    "요청 크기": "request size limiting",
+    "요청 종료": "request termination",
+    "요청 변환": "request transformer",
+    "응답 변환": "response transformer",
+    "헤더 라우팅": "route by header",
+    "경로 허용": "path allow",
+    "프록시 캐시": "proxy cache",
+    "사전 함수": "pre-function",
+    "프리펑션": "pre-function",
+    "표준 출력": "stdout log",
+    "트랜잭션": "transaction id txid",
+    "타임아웃": "timeout",
+    "아이피": "IP restriction",
+    "캐시": "proxy cache",
+    "로그": "log",
+    "정책": "policy",
+    # 인증/인가
+    "키 인증": "key authentication key auth",
+    "api 키": "key authentication key auth",
+    "인증서": "certificate",
+    "인증": "authentication",
+    "인가": "authorization",
+    "토큰": "token",
+    "로그인": "login",
+    # 관리 대상
+    "게이트웨이": "gateway",
+    "프로젝트": "project",
+    "배포": "deployment",
+    "문서": "API document",
+    "레플리카": "replica",
+    "라우트": "route",
+    "라우팅": "routing",
+    "업스트림": "upstream",
+    "엔드포인트": "endpoint",
+    "도메인": "domain",
+    "서비스": "service",
+    "상품": "product",
+    "구독": "subscription",
+    "애플리케이션": "application",
+    "앱": "application",
+    "승인": "approval",
+    "모니터링": "monitoring",
+    "통계": "statistics monitoring",
+    "대시보드": "dashboard monitoring",
+    "공지": "notice forum",
+    "문의": "inquiry forum",
+    # 포털/사용자
+    "개발자 포털": "developer portal",
+    "개발자": "developer portal",
+    "관리자": "administrator console",
+    "콘솔": "console",
+    "테넌트": "tenant manager",
+    "사용자": "user management",
+    "계정": "user account",
+    "권한": "permission role",
+    "역할": "role",
+    "멤버": "member",
+    # 동작
+    "설정": "configuration settings",
+    "등록": "register",
+    "생성": "create",
+    "추가": "add",
+    "삭제": "delete",
+    "수정": "update",
+    "변경": "change",
+    "바꾸": "change",
+    "바꿔": "change",
+    "관리": "management",
+    "조회": "view list",
+    "허용": "allow",
+    "차단": "deny block",
+    "제한": "limit restriction",
+    "방법": "guide steps",
+    "어디": "location",
+}
+
+_ASCII_TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9\-_.]*")
+
+
+class LocalQueryRewriter:
+    def __init__(self, vector_db, mode: str = "glossary", glossary: Dict[str, str] | None = None):
+        """
+        Args:
+            vector_db: 검색에 사용할 VectorDB
+            mode: glossary | multilingual | hybrid
+            glossary: 한국어 용어 → 영어 키워드 사전(기본 APIM_GLOSSARY)
+        """
+        self.vector_db = vector_db
+        self.mode = mode
+        glossary = glossary or APIM_GLOSSARY
+        self._terms: List[Tuple[str, str]] = sorted(glossary.items(), key=lambda kv: len(kv[0]), reverse=True)
+
+    def expand(self, question: str) -> str:
+        """glossary로 한국어 질문을 영어 키워드 문장으로 변환. 매칭 용어가 없으면 빈 문자열."""
+        text = question.lower()
+        keywords: List[str] = []
+        for ko, en in self._terms:
+            if ko in text:
+                text = text.replace(ko, " ")
+                keywords.append(en)
+        # 질문에 포함된 영문 용어(JWT, OIDC, CORS 등)는 그대로 유지
+        ascii_tokens = [t for t in _ASCII_TOKEN.findall(question) if t.lower() not in ("apim",)]
+        if not keywords and not ascii_tokens:
+            return ""
+        seen = set()
+        words = []
+        for w in " ".join(["APIM"] + ascii_tokens + keywords).split():
+            if w.lower() not in seen:
+                seen.add(w.lower())
+                words.append(w)
+        return " ".join(words)
+
+    def queries(self, question: str) -> List[str]:
+        """모드에 따라 벡터 검색에 쓸 질의 목록(배치 임베딩 사전 계산에도 사용)"""
+        queries: List[str] = []
+        if self.mode in ("glossary", "hybrid"):
+            expanded = self.expand(question)
+            if expanded:
+                queries.append(expanded)
+        if self.mode in ("multilingual", "hybrid"):
+            queries.append(question)
+        return queries
+
+    def search(self, question: str, k: int = 5) -> Tuple[List[Dict[str, Any]], str, float]:
+        """로컬 변환으로 검색. (결과, 사용한 질의, confidence=최고 유사도) 반환"""
+        queries = self.queries(question)
+        if not queries:
+            return [], "", 0.0
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        for q in queries:
+            for r in self.vector_db.search(q, k=k):
+                name = r.get("document", {}).get("name", "")
+                if name not in merged or r["similarity"] > merged[name]["similarity"]:
+                    merged[name] = r
+        results = sorted(merged.values(), key=lambda r: r["similarity"], reverse=True)[:k]
+        confidence = results[0]["similarity"] if results else 0.0
+        return results, " | ".join(queries), confidence
@@ -0,0 +1,127 @@
+# 포털 사이트맵 인덱스: 크롤러(workflow.crawler)가 수집한 페이지 그래프 + 페이지별 임베딩
+# 페이지: {url, portal, title, headings, links, summary, depth, crawled_at}
+# 임베딩은 문서 검색과 같은 인코더(VectorDB.model)로 title/headings/summary를 인코딩해 FAISS에 적재하고,
+# 질문과 가장 가까운 페이지를 찾아 InteractiveAgent가 해당 화면으로 바로 이동(또는 스냅샷으로 답변)하게 한다.
+
+import json
+import time
+import faiss
+import numpy as np
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+def page_text(page: dict) -> str:
+    """임베딩/검색용 페이지 텍스트"""
+    parts = [page.get("title") or "", " / ".join(page.get("headings") or []), (page.get("summary") or "")[:1000]]
+    return "\n".join(p for p in parts if p)
+
+
+class SiteMap:
+    def __init__(self, root: str, vector_db=None):
+        self.root = Path(root)
+        self.vector_db = vector_db
+        self.pages: list[dict] = []
+        self.index = None
+        self.model_name = None
+        self.built_at: float | None = None
+        self._mtime = 0.0
+        self.load()
+
+    @property
+    def _pages_path(self) -> Path:
+        return self.root / "pages.json"
+
+    @property
+    def _index_path(self) -> Path:
+        return self.root / "index.bin"
+
+    # ---- 구축/저장 ----
+    def build(self, pages: list[dict]) -> None:
+        """페이지 목록으로 인덱스를 새로 만들고 저장"""
+        texts = [page_text(p) for p in pages]
+        embeddings = self.vector_db.model.encode(texts, batch_size=64, normalize_embeddings=True) if texts else None
+        index = faiss.IndexFlatL2(self.vector_db.vector_dim)
+        if texts:
+            index.add(np.asarray(embeddings, dtype='float32'))
+        self.pages, self.index = pages, index
+        self.model_name = self.vector_db.model_name
+        self.built_at = time.time()
+        self.save()
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta = {"model_name": self.model_name, "built_at": self.built_at}
+        tmp = self._pages_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"meta": meta, "pages": self.pages}, ensure_ascii=False), encoding="utf-8")
+        faiss.write_index(self.index, str(self._index_path))
+        tmp.replace(self._pages_path)
+        self._mtime = self._pages_path.stat().st_mtime
+        print(f"[site_map] 저장: {len(self.pages)}개 페이지 → {self.root}")
+
+    def load(self) -> None:
+        """저장된 사이트맵 로드(없으면 빈 상태). 다른 프로세스(CLI 크롤러)가 갱신한 경우에도 호출"""
+        if not self._pages_path.exists() or not self._index_path.exists():
+            return
+        try:
+            data = json.loads(self._pages_path.read_text(encoding="utf-8"))
+            index = faiss.read_index(str(self._index_path))
+        except Exception as e:
+            print(f"[site_map] 로드 실패: {e}")
+            return
+        self.pages = data.get("pages") or []
+        self.index = index
+        self.model_name = (data.get("meta") or {}).get("model_name")
+        self.built_at = (data.get("meta") or {}).get("built_at")
+        self._mtime = self._pages_path.stat().st_mtime
+        print(f"[site_map] 로드: {len(self.pages)}개 페이지")
+
+    def _reload_if_changed(self) -> None:
+        try:
+            if self._pages_path.stat().st_mtime > self._mtime:
+                self.load()
+        except FileNotFoundError:
+            pass
+
+    # ---- 조회 ----
+    @property
+    def usable(self) -> bool:
+        """인덱스가 있고 현재 인코더로 만든 것인지(모델이 바뀌면 재크롤 필요)"""
+        return (self.index is not None and bool(self.pages) and self.vector_db is not None
+                and self.model_name == self.vector_db.model_name)
+
+    def search(self, question: str, k: int = 3, host: str | None = None) -> list[dict]:
+        """질문과 가까운 페이지 [{page, similarity}] (host를 주면 그 포털 페이지만)"""
+        self._reload_if_changed()
+        if not self.usable:
+            return []
+        query = self.vector_db.encode_queries([question])
+        # host 필터 후에도 k개가 남도록 넉넉히 검색
+        n = min(len(self.pages), k * 4 if host else k)
+        distances, indices = self.index.search(query.astype('float32'), n)
+        results = []
+        for dist, idx in zip(distances[0], indices[0]):
+            if idx == -1 or idx >= len(self.pages):
+                continue
+            page = self.pages[idx]
+            if host and urlparse(page["url"]).hostname != host:
+                continue
+            results.append({"page": page, "similarity": float(1.0 - dist / 2)})
+            if len(results) >= k:
+                break
+        return results
+
+    def age_s(self, page: dict) -> float:
+        return time.time() - (page.get("crawled_at") or 0)
+
+    def stats(self) -> dict:
+        portals = {}
+        for page in self.pages:
+            portals[page.get("portal")] = portals.get(page.get("portal"), 0) + 1
+        return {
+            "pages": len(self.pages),
+            "portals": portals,
+            "model_name": self.model_name,
+            "usable": self.usable,
+            "age_s": round(time.time() - self.built_at) if self.built_at else None,
+        }
@@ -1,8 +1,11 @@
 import os
 import json
+import hashlib
 import faiss
 import numpy as np
 import pickle
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any
 from sentence_transformers import SentenceTransformer
 import logging
@@ -25,10 +28,18 @@ class VectorDB:
         Args:
             model_name: 사용할 Sentence Transformer 모델 이름
         """
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         self.documents = []
         self.index = None
-        self.vector_dim = 384  # all-MiniLM-L6-v2 모델의 벡터 차원
+        self.version = ""  # 인덱스 버전(모델+문서 구성 해시). 답변 캐시 키 등에 사용
+        # 모델별 벡터 차원(all-MiniLM-L6-v2: 384)
+        self.vector_dim = self.model.get_sentence_embedding_dimension()
+        # 질의 임베딩 캐시(같은 질의 재검색/배치 사전 계산 시 encode 생략)
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.query_cache_size = 2048
+        # 검색/인코딩은 이벤트 루프 밖(asyncio.to_thread)에서 동시에 불리므로 캐시 접근만 잠금(encode는 잠그지 않음)
+        self._query_lock = threading.Lock()
 
     def ingest_pdfs(self, pdf_dir: str, chunk_size: int = 2500, overlap: int = 300) -> None:
         """
@@ -145,18 +156,27 @@ class VectorDB:
             
             # 문서 텍스트를 벡터로 변환
             texts = [doc['search_text'] for doc in self.documents]
-            embeddings = self.model.encode(texts, show_progress_bar=True)
+            embeddings = self.model.encode(texts, show_progress_bar=True, normalize_embeddings=True)
             
             # FAISS 인덱스 생성
             self.index = faiss.IndexFlatL2(self.vector_dim)
             self.index.add(embeddings.astype('float32'))
             
+            self.version = self._compute_version()
             logger.info(f"Successfully created FAISS index with {len(self.documents)} documents")
             
         except Exception as e:
             logger.error(f"Error creating index: {str(e)}")
             raise
 
+    def _compute_version(self) -> str:
+        """임베딩 모델과 문서(이름/본문) 구성으로 인덱스 버전 해시 계산"""
+        h = hashlib.sha1(self.model_name.encode("utf-8"))
+        for doc in self.documents:
+            h.update(doc.get('name', '').encode("utf-8"))
+            h.update(doc.get('search_text', '').encode("utf-8"))
+        return h.hexdigest()[:12]
+
     def save(self, vector_data_path: str = 'vector_data.pkl', index_path: str = 'faiss_index.bin') -> None:
         """
         벡터 DB 상태 저장
@@ -172,6 +192,10 @@ class VectorDB:
             # FAISS 인덱스 저장
             if self.index is not None:
                 faiss.write_index(self.index, index_path)
+
+            # 인덱스를 만든 임베딩 모델 기록(모델 변경 시 재인덱싱 판단용)
+            with open(_meta_path(index_path), 'w', encoding='utf-8') as f:
+                json.dump({'model_name': self.model_name}, f)
                 
             logger.info(f"Saved vector data to {vector_data_path} and index to {index_path}")
             
@@ -194,12 +218,31 @@ class VectorDB:
             # FAISS 인덱스 로드
             self.index = faiss.read_index(index_path)
             
+            self.version = self._compute_version()
             logger.info(f"Loaded {len(self.documents)} documents and FAISS index")
             
         except Exception as e:
             logger.error(f"Error loading vector DB: {str(e)}")
             raise
 
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """질의들을 임베딩(캐시에 없는 것만 한 번의 배치 encode). 반환: (len(queries), dim)"""
+        with self._query_lock:
+            found = {q: self._query_vectors[q] for q in queries if q in self._query_vectors}
+        missing = list(dict.fromkeys(q for q in queries if q not in found))
+        if missing:
+            vectors = self.model.encode(missing, batch_size=64, normalize_embeddings=True)
+            for q, v in zip(missing, vectors):
+                found[q] = np.asarray(v, dtype='float32')
+        with self._query_lock:
+            for q in dict.fromkeys(queries):
+                self._query_vectors[q] = found[q]
+                self._query_vectors.move_to_end(q)
+            while len(self._query_vectors) > self.query_cache_size:
+                self._query_vectors.popitem(last=False)
+        result = [found[q] for q in queries]
+        return np.stack(result) if result else np.zeros((0, self.vector_dim), dtype='float32')
+
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """
         쿼리와 가장 유사한 문서 검색
@@ -211,7 +254,7 @@ class VectorDB:
         """
         try:
             # 쿼리를 벡터로 변환
-            query_vector = self.model.encode([query])
+            query_vector = self.encode_queries([query])
             
             # 유사한 벡터 검색
             distances, indices = self.index.search(query_vector.astype('float32'), k)
@@ -235,6 +278,21 @@ class VectorDB:
 # 전역 싱글톤 관리
 GLOBAL_VECTOR_DB: VectorDB | None = None
 
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def _meta_path(index_path: str) -> Path:
+    return Path(f"{index_path}.meta.json")
+
+
+def _indexed_model_name(index_path: str) -> str:
+    """인덱스를 만든 모델 이름. 메타 파일이 없으면 기존 기본 모델로 간주"""
+    try:
+        with open(_meta_path(index_path), 'r', encoding='utf-8') as f:
+            return json.load(f).get('model_name') or DEFAULT_MODEL_NAME
+    except Exception:
+        return DEFAULT_MODEL_NAME
+
 def _latest_mtime_in_dir(root: Path) -> float:
     latest = 0.0
     for p in root.rglob("*"):
@@ -248,7 +306,8 @@ def _latest_mtime_in_dir(root: Path) -> float:
 
 def init_global_vector_db(pdf_dir: str, vector_data_path: str, index_path: str) -> None:
     global GLOBAL_VECTOR_DB
-    vdb = VectorDB()
+    from utils.config import settings
+    vdb = VectorDB(model_name=settings.VECTOR_DB_MODEL)
     vec_p = Path(vector_data_path)
     idx_p = Path(index_path)
     base_dir = Path(pdf_dir)
@@ -258,7 +317,7 @@ def init_global_vector_db(pdf_dir: str, vector_data_path: str, index_path: str)
         # 콘텐츠가 더 최신이면 재인덱싱
         content_mtime = _latest_mtime_in_dir(base_dir)
         index_mtime = max(vec_p.stat().st_mtime, idx_p.stat().st_mtime)
-        if index_mtime >= content_mtime:
+        if index_mtime >= content_mtime and _indexed_model_name(index_path) == vdb.model_name:
             need_rebuild = False
 
     if not need_rebuild:
@@ -281,6 +340,18 @@ def init_global_vector_db(pdf_dir: str, vector_data_path: str, index_path: str)
 def get_global_vector_db() -> VectorDB | None:
     return GLOBAL_VECTOR_DB
 
+# 기본 문서/인덱스 경로(server/retrieval 아래). 서버 lifespan과 CLI/벤치마크/크롤러가 같은 인덱스를 쓰도록 공유
+RETRIEVAL_DIR = Path(__file__).resolve().parent
+DOCS_DIR = RETRIEVAL_DIR / "apim_docs"
+VECTOR_DATA_PATH = RETRIEVAL_DIR / "apim_vector_data.pkl"
+INDEX_PATH = RETRIEVAL_DIR / "apim_faiss_index.bin"
+
+def init_default_vector_db() -> VectorDB:
+    """기본 경로로 전역 VectorDB를 초기화해 반환(이미 초기화됐으면 그대로 반환)"""
+    if GLOBAL_VECTOR_DB is None:
+        init_global_vector_db(str(DOCS_DIR), str(VECTOR_DATA_PATH), str(INDEX_PATH))
+    return GLOBAL_VECTOR_DB
+
 def search_texts(query: str, k: int = 5) -> list[dict]:
     """전역 VectorDB에서 간단 검색을 수행하는 헬퍼. 없으면 자동 초기화 시도.
     반환 형식: VectorDB.search 결과 리스트 그대로 반환
@@ -288,12 +359,8 @@ def search_texts(query: str, k: int = 5) -> list[dict]:
     try:
         vdb = get_global_vector_db()
         if vdb is None:
-            base_dir = Path(__file__).resolve().parents[2] / "retrieval" / "apim_docs"
-            vec_path = Path(__file__).resolve().parents[2] / "apim_vector_data.pkl"
-            idx_path = Path(__file__).resolve().parents[2] / "apim_faiss_index.bin"
             try:
-                init_global_vector_db(str(base_dir), str(vec_path), str(idx_path))
-                vdb = get_global_vector_db()
+                vdb = init_default_vector_db()
             except Exception as e:
                 logger.error(f"Global VectorDB init failed: {e}")
                 # 폴백: 빈 인덱스 생성 방지. None 반환
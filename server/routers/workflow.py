@@ -1,9 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Literal
 import asyncio
 import json
-from workflow.graph import create_apim_query_graph, ApimQueryState
+import math
+import time
+import uuid
+from workflow.graph import ApimQueryState
+from workflow.runtime import get_runtime
+from workflow.jobs import Job, JobRejected
+from workflow.crawler import crawl_status, start_background_crawl
+from utils.artifact_store import ArtifactStore
+from utils.browser_pool import get_browser_pool
+from utils.readiness import get_readiness, total_wait_ms
+from utils.click_resolver import get_click_resolver
+from utils.config import settings
+from utils.deadline import new_deadline
 import logging
 
 router = APIRouter(
@@ -14,28 +27,417 @@ router = APIRouter(
 
 class QueryRequest(BaseModel):
     question: str
+    # 콘솔(UI) 탐색: auto(라우터 판단) | always(항상 탐색) | never(문서만)
+    ui_mode: Literal["auto", "always", "never"] = "auto"
+    # 답변 캐시 사용 여부(False면 항상 새로 실행)
+    use_cache: bool = True
+    # 이전 스트림의 run 이벤트로 받은 run_id. 지정하면 실패 지점부터 재개
+    run_id: str | None = None
+    # 요청 전체 시간 예산(초). 미지정 시 REQUEST_TIMEOUT_S. 소진되면 부분 답변으로 마무리
+    timeout_s: float | None = None
 
-async def apim_query_streamer(question):
-    logging.info(f"[apim_query_streamer] 질문 수신: {question}")
-    graph = create_apim_query_graph()
-    initial_state: ApimQueryState = {
-        "messages": [{"role": "user", "content": question}]
+class BatchRequest(BaseModel):
+    questions: list[str]
+    ui_mode: Literal["auto", "always", "never"] = "auto"
+    concurrency: int | None = None     # 미지정 시 BATCH_CONCURRENCY
+    refresh: bool = True               # True면 캐시를 읽지 않고 새로 계산해 답변 캐시 갱신
+    share_login: bool = True           # 콘솔 로그인 1회 후 질문 간 세션 공유
+    timeout_s: float | None = None     # 질문별 시간 예산. 미지정 시 BATCH_TIMEOUT_S
+
+class CrawlRequest(BaseModel):
+    portals: list[str] | None = None   # 미지정 시 CRAWL_PORTALS
+    max_pages: int | None = None       # 포털당. 미지정 시 CRAWL_MAX_PAGES
+    max_depth: int | None = None
+    concurrency: int | None = None
+
+# 대용량 산출물은 스트림에 싣지 않고 참조만 전달
+artifact_store = ArtifactStore()
+ARTIFACT_URL = router.prefix + "/artifacts/{}"
+
+def _artifact_ref(value) -> str | None:
+    if not value:
+        return None
+    return ARTIFACT_URL.format(artifact_store.put(value))
+
+def _map_meta(value, fn):
+    """meta를 재귀로 돌며 leaf 값에 fn 적용"""
+    if isinstance(value, dict) and "$artifact" not in value:
+        return {k: _map_meta(v, fn) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_meta(v, fn) for v in value]
+    return fn(value)
+
+def _detach_artifacts(events: list[dict]) -> list[dict]:
+    """캐시 저장용: meta의 artifact 참조를 실제 값({"$artifact": 값})으로 바꿈
+    (아티팩트 저장소는 1시간/500개만 보관하므로 캐시 항목이 참조에 기대면 재생 시 404)"""
+    prefix = ARTIFACT_URL.format("")
+
+    def detach(value):
+        if isinstance(value, str) and value.startswith(prefix):
+            return {"$artifact": artifact_store.get(value[len(prefix):])}
+        return value
+
+    return [{**event, "meta": _map_meta(event.get("meta") or {}, detach)} for event in events]
+
+def _attach_artifacts(events: list[dict]) -> list[dict]:
+    """캐시 재생용: 저장해 둔 값을 아티팩트 저장소에 다시 넣고 새 참조로 바꿈"""
+    def attach(value):
+        if isinstance(value, dict) and "$artifact" in value:
+            return _artifact_ref(value["$artifact"])
+        return value
+
+    return [{**event, "meta": _map_meta(event.get("meta") or {}, attach)} for event in events]
+
+def project_event(node: str, update: dict) -> dict:
+    """노드 update(delta)를 compact 이벤트로 투영: {type, response, meta}
+    - messages 전체, RAG 청크 원문, final_dom 등은 제외(필요 시 artifacts 참조로 조회)
+    """
+    update = update or {}
+    meta = {}
+    if node == "route":
+        route = update.get("ui_route") or {}
+        meta = {k: route.get(k) for k in ("explore", "reason", "question_class", "confidence")}
+    elif node == "rag":
+        docs = update.get("rag_result") or []
+        meta = {
+            "docs": [
+                {"name": (r.get("document") or {}).get("name"), "similarity": round(r.get("similarity") or 0.0, 3)}
+                for r in docs
+            ],
+            "artifact": _artifact_ref(docs),
+        }
+    elif node == "navigation":
+        nav = update.get("navigation_result") or {}
+        meta = {k: nav.get(k) for k in ("selected_portal", "target_url", "login_completed")}
+        meta["wait_ms"] = total_wait_ms(nav.get("waits"))
+    elif node in ("table_rag", "table_ui"):
+        # 요약 실패(role=error)/시간 제한으로 근거만 표시(degraded) 여부
+        messages = update.get("messages") or []
+        degraded = next((m.get("degraded") or "error" for m in messages
+                         if m.get("role") == "error" or m.get("degraded")), None)
+        meta = {"degraded": degraded} if degraded else {}
+    elif node == "interactive":
+        result = update.get("interactive_result") or {}
+        meta = {
+            "final_url": result.get("final_url"),
+            "steps": len(result.get("visit_trace") or []),
+            "partial": bool(result.get("partial")),
+            "wait_ms": total_wait_ms(result.get("waits")),
+            "source": result.get("source") or "browser",
+            "artifacts": {
+                "visit_trace": _artifact_ref(result.get("visit_trace")),
+                "final_dom": _artifact_ref(result.get("final_dom")),
+            },
+        }
+    return {"type": node, "response": update.get("response") or "", "meta": meta}
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+def _needs_console_retry(values: dict) -> bool:
+    """완료된 실행에서 콘솔 브랜치(navigation/interactive)가 실패했는지 여부"""
+    if not (values.get("ui_route") or {}).get("explore"):
+        return False
+    return not values.get("navigation_result") or not values.get("interactive_result")
+
+async def _resume_config(graph, run_id: str) -> tuple[dict, str] | None:
+    """run_id의 체크포인트에서 재개할 config와 재개 지점 반환. 재개할 것이 없으면 None
+    - 예외로 중단된 실행: 남은 노드(next)부터 그대로 재개
+    - 콘솔 단계가 실패한 채 끝난 실행: interactive 직전 체크포인트에서 분기(완료된 문서 브랜치 재사용)
+    """
+    if graph.checkpointer is None:
+        return None
+    config = {"configurable": {"thread_id": run_id}}
+    snapshot = await graph.aget_state(config)
+    if not snapshot or not snapshot.values:
+        return None
+    if snapshot.next:
+        return config, ",".join(snapshot.next)
+    if _needs_console_retry(snapshot.values):
+        async for snap in graph.aget_state_history(config):
+            if "interactive" in snap.next:
+                return {"configurable": {**snap.config["configurable"], "resume": True}}, "interactive"
+    return None
+
+async def _discard_completed(graph, config: dict) -> None:
+    """성공적으로 끝난 실행의 체크포인트 삭제(재개할 일이 없음). 실패/중단된 실행은 TTL 정리 대상"""
+    if graph.checkpointer is None:
+        return
+    # 분기 재개 config에는 checkpoint_id가 있으므로 스레드의 최신 상태를 조회
+    thread_id = config["configurable"]["thread_id"]
+    snapshot = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+    if snapshot.next or _needs_console_retry(snapshot.values or {}):
+        return
+    await graph.checkpointer.adelete_thread(thread_id)
+
+async def run_graph_events(question: str, ui_mode: str = "auto", run_id: str | None = None,
+                           timeout_s: float | None = None, auth_state_path: str | None = None):
+    """그래프를 실행하며 노드별 compact 이벤트를 순서대로 생성
+    첫 이벤트는 run 이벤트(run_id). 같은 run_id로 재요청하면 체크포인트에서 재개한다.
+    요청 데드라인은 state["deadline"]으로 전달(재개 시에는 config로 새 데드라인 전달)
+    """
+    graph = get_runtime().graph
+    deadline = new_deadline(timeout_s or settings.REQUEST_TIMEOUT_S)
+    resume = await _resume_config(graph, run_id) if run_id else None
+    if resume:
+        config, resumed_from = resume
+        config = {"configurable": {**config["configurable"], "deadline": deadline}}
+        graph_input = None
+        logging.info(f"[run_graph_events] run_id={run_id} 재개: {resumed_from}")
+    else:
+        run_id = uuid.uuid4().hex
+        resumed_from = None
+        config = {"configurable": {"thread_id": run_id}}
+        graph_input: ApimQueryState = {
+            "messages": [{"role": "user", "content": question}],
+            "ui_mode": ui_mode,
+            "deadline": deadline,
+            "auth_state_path": auth_state_path,
+        }
+    yield {
+        "type": "run",
+        "response": "",
+        "meta": {"run_id": run_id, "resumed_from": resumed_from, "deadline": deadline},
     }
+    get_browser_pool().track_owner(run_id)
+    try:
+        async for chunk in graph.astream(graph_input, config, stream_mode="updates"):
+            if not chunk:
+                continue
+            for node, update in chunk.items():
+                yield project_event(node, update)
+        await _discard_completed(graph, config)
+    finally:
+        # 실행이 끝나거나 실패하면 노드 간 인계 중이던 브라우저 페이지 반납
+        await get_browser_pool().release_owner(run_id)
+
+async def _refresh_cached_answer(key: str, question: str, ui_mode: str, timeout_s: float):
+    """stale 항목 갱신 작업(작업 큐에서 실행). 새로 실행한 결과는 query_events가 캐시에 저장"""
+    try:
+        async for event in query_events(question, ui_mode, timeout_s=timeout_s, refresh=True):
+            yield event
+        logging.info(f"[answer_cache] 백그라운드 갱신 완료: {question}")
+    finally:
+        get_runtime().answer_cache.end_refresh(key)
+
+def _schedule_refresh(key: str, question: str, ui_mode: str) -> None:
+    """stale 항목 갱신을 낮은 우선순위 작업으로 접수(사용자 요청이 대기 중이면 다음 적중 때 다시 시도)"""
+    runtime = get_runtime()
+    if not runtime.answer_cache.begin_refresh(key):
+        return
+    try:
+        runtime.jobs.submit(
+            lambda timeout_s: _refresh_cached_answer(key, question, ui_mode, timeout_s),
+            timeout_s=settings.BATCH_TIMEOUT_S,
+            params={"question": question, "ui_mode": ui_mode, "refresh": True},
+            low_priority=True,
+        )
+    except JobRejected as e:
+        logging.info(f"[answer_cache] 백그라운드 갱신 보류({e.reason}): {question}")
+        runtime.answer_cache.end_refresh(key)
+
+def _cache_key(question: str, ui_mode: str) -> str:
+    runtime = get_runtime()
+    return runtime.answer_cache.key(question, ui_mode, runtime.vector_db.version)
+
+def _use_cache(use_cache: bool, run_id: str | None) -> bool:
+    # 재개 요청은 캐시를 거치지 않는다
+    return use_cache and settings.ANSWER_CACHE_ENABLED and not run_id
+
+async def query_events(question, ui_mode: str = "auto", use_cache: bool = True, run_id: str | None = None,
+                       timeout_s: float | None = None, auth_state_path: str | None = None, refresh: bool = False,
+                       cached: tuple[dict, str] | None = None):
+    """질의 하나의 이벤트(dict) 시퀀스: 캐시 재생 또는 그래프 실행. 마지막은 end 이벤트
+    refresh=True면 캐시를 읽지 않고 새로 실행한 결과로 캐시를 갱신(배치 사전 계산)
+    cached: 호출자가 이미 조회한 캐시 적중 (entry, status) — 다시 조회하지 않는다
+    """
+    logging.info(f"[query_events] 질문 수신: {question} (ui_mode={ui_mode})")
+    cache = get_runtime().answer_cache
+    use_cache = _use_cache(use_cache, run_id)
+    key = _cache_key(question, ui_mode)
+
+    if use_cache and not refresh:
+        entry, status = cached or cache.lookup(key)
+        if entry is not None:
+            age_s = round(time.time() - entry["created_at"], 1)
+            logging.info(f"[query_events] 캐시 적중({status}, age={age_s}s): {question}")
+            yield {"type": "cache", "response": "", "meta": {"status": status, "age_s": age_s}}
+            for event in _attach_artifacts(entry["events"]):
+                yield event
+            if status == "stale":
+                _schedule_refresh(key, question, ui_mode)
+            yield {"type": "end"}
+            return
+
     chunk_count = 0
-    async for chunk in graph.astream(initial_state, stream_mode="updates"):
-        if not chunk:
-            continue
-        chunk_count += 1
-        logging.info(f"[apim_query_streamer] chunk {chunk_count}: {chunk}")
-        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    events = []
+    try:
+        async for event in run_graph_events(question, ui_mode, run_id, timeout_s, auth_state_path):
+            chunk_count += 1
+            events.append(event)
+            logging.info(f"[query_events] chunk {chunk_count}: {event['type']}")
+            yield event
+    except Exception as e:
+        # 체크포인트가 남아 있으므로 같은 run_id로 재요청하면 중단 지점부터 재개된다
+        logging.error(f"[query_events] 그래프 실행 오류: {e}")
+        yield {"type": "error", "response": f"처리 중 오류가 발생했습니다: {e}", "meta": {"retryable": True}}
+        use_cache = False
+    if use_cache:
+        # run 이벤트(run_id)는 요청마다 다르므로 캐시에서 제외
+        cache.put(key, _detach_artifacts([e for e in events if e["type"] != "run"]))
+    logging.info(f"[query_events] 종료 (총 {chunk_count}개 chunk)")
+    yield {"type": "end"}
+
+async def apim_query_streamer(question, ui_mode: str = "auto", use_cache: bool = True, run_id: str | None = None,
+                              timeout_s: float | None = None, cached: tuple[dict, str] | None = None):
+    """작업 큐를 거치지 않는 SSE 스트림(캐시 적중 응답, CLI/벤치마크용)"""
+    async for event in query_events(question, ui_mode, use_cache, run_id, timeout_s, cached=cached):
+        payload = _sse(event)
+        logging.debug(f"[apim_query_streamer] payload: {payload}")
+        yield payload
         await asyncio.sleep(0.01)
-    logging.info(f"[apim_query_streamer] 스트림 종료 (총 {chunk_count}개 chunk)")
-    yield f"data: {json.dumps({'type': 'end'}, ensure_ascii=False)}\n\n"
+
+def _submit(factory, timeout_s: float, params: dict) -> Job:
+    """작업 큐에 접수. 부하 차단 시 503 + Retry-After"""
+    try:
+        return get_runtime().jobs.submit(factory, timeout_s=timeout_s, params=params)
+    except JobRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"reason": e.reason, "message": e.message, "retry_after_s": round(e.retry_after_s, 1)},
+            headers={"Retry-After": str(math.ceil(e.retry_after_s))},
+        )
+
+def _submit_job(request: QueryRequest) -> Job:
+    """작업 큐에 질의 접수"""
+    return _submit(
+        lambda timeout_s: query_events(request.question, request.ui_mode, request.use_cache, request.run_id, timeout_s),
+        timeout_s=request.timeout_s or settings.REQUEST_TIMEOUT_S,
+        params={"question": request.question, "ui_mode": request.ui_mode, "run_id": request.run_id},
+    )
+
+def _job_accepted(job: Job) -> dict:
+    return {
+        **get_runtime().jobs.status(job),
+        "status_url": f"{router.prefix}/jobs/{job.id}",
+        "stream_url": f"{router.prefix}/jobs/{job.id}/stream",
+    }
+
+def _get_job(job_id: str) -> Job:
+    job = get_runtime().jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found or expired")
+    return job
+
+async def job_streamer(job: Job, start: int = 0):
+    """작업 이벤트를 SSE로 전달. 첫 이벤트는 job 이벤트(job_id, 대기 순번)"""
+    jobs = get_runtime().jobs
+    yield _sse({"type": "job", "response": "", "meta": {"job_id": job.id, "status": job.status, "position": jobs.position(job)}})
+    async for event in jobs.follow(job, start):
+        yield _sse(event)
 
 @router.post("/stream")
 async def stream_apim_query(request: QueryRequest):
     logging.info(f"[stream_apim_query] POST /stream 요청: {request}")
-    return StreamingResponse(
-        apim_query_streamer(request.question),
-        media_type="text/event-stream",
+    # 캐시 적중은 큐를 거치지 않고 즉시 재생, 그 외에는 작업 큐(동시 실행 상한) 경유
+    if _use_cache(request.use_cache, request.run_id):
+        entry, status = get_runtime().answer_cache.lookup(_cache_key(request.question, request.ui_mode))
+    else:
+        entry, status = None, None
+    if entry is not None:
+        return StreamingResponse(
+            apim_query_streamer(request.question, request.ui_mode, request.use_cache, cached=(entry, status)),
+            media_type="text/event-stream",
+        )
+    job = _submit_job(request)
+    return StreamingResponse(job_streamer(job), media_type="text/event-stream")
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: QueryRequest):
+    return _job_accepted(_submit_job(request))
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return get_runtime().jobs.status(_get_job(job_id))
+
+@router.get("/jobs/{job_id}/stream")
+async def attach_job_stream(job_id: str, start: int = 0):
+    """진행 중/완료된 작업의 이벤트 스트림에 연결(start번째 이벤트부터)"""
+    job = _get_job(job_id)
+    return StreamingResponse(job_streamer(job, start), media_type="text/event-stream")
+
+async def _batch_job_events(request: BatchRequest, timeout_s: float):
+    from workflow.batch import batch_events
+    async for event in batch_events(
+        request.questions,
+        ui_mode=request.ui_mode,
+        concurrency=request.concurrency,
+        refresh=request.refresh,
+        share_login=request.share_login,
+        timeout_s=request.timeout_s,
+        deadline=new_deadline(timeout_s),
+    ):
+        yield event
+    yield {"type": "end"}
+
+@router.post("/batch", status_code=202)
+async def run_batch_queries(request: BatchRequest):
+    """여러 질문을 공유 자원(배치 임베딩, 공유 로그인, 제한된 병렬)으로 실행하는 작업을 접수
+    진행은 stream_url(batch_item 이벤트), 전체 보고서는 마지막 batch 이벤트로 받는다. 부하 차단 시 503 + Retry-After
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="questions is empty")
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"too many questions (max {settings.BATCH_MAX_QUESTIONS})")
+    # 전체 예산: 질문별 예산 × 병렬 라운드 수 + 공유 로그인 몫(한 라운드)
+    per_question_s = request.timeout_s or settings.BATCH_TIMEOUT_S
+    rounds = math.ceil(len(request.questions) / max(1, request.concurrency or settings.BATCH_CONCURRENCY))
+    job = _submit(
+        lambda timeout_s: _batch_job_events(request, timeout_s),
+        timeout_s=per_question_s * (rounds + 1),
+        params={"batch": len(request.questions), "ui_mode": request.ui_mode, "refresh": request.refresh},
     )
+    return _job_accepted(job)
+
+@router.get("/metrics")
+async def get_metrics():
+    """작업 큐(대기/실행/거절, 대기 시간), 브라우저/LLM 동시 실행 상한, 브라우저 풀, 로그인 세션 캐시,
+    페이지 준비 대기(단계별 p50/p95), 클릭 후보 자동 선택 비율, 내비게이션 메모리 재사용, 클릭 전략 현황"""
+    runtime = get_runtime()
+    sessions = runtime.navigation_agent.sessions
+    return {
+        "jobs": runtime.jobs.metrics(),
+        "browser": runtime.browser_limiter.stats(),
+        "browser_pool": get_browser_pool().stats(),
+        "llm": runtime.llm_limiter.stats(),
+        "auth_sessions": sessions.stats() if sessions else None,
+        "readiness": get_readiness().stats(),
+        "action_ranker": runtime.action_ranker.stats() if runtime.action_ranker else None,
+        "nav_memory": runtime.nav_memory.stats() if runtime.nav_memory else None,
+        "click_resolver": get_click_resolver().stats(),
+    }
+
+@router.get("/site-map")
+async def get_site_map():
+    """포털 사이트맵 인덱스 현황과 크롤 실행 상태"""
+    site_map = get_runtime().site_map
+    return {"site_map": site_map.stats() if site_map else None, "crawl": crawl_status()}
+
+@router.post("/site-map/crawl", status_code=202)
+async def start_site_map_crawl(request: CrawlRequest):
+    """포털 크롤링을 백그라운드로 시작(이미 실행 중이면 409)"""
+    if get_runtime().site_map is None:
+        raise HTTPException(status_code=404, detail="site map disabled")
+    unknown = set(request.portals or []) - set(get_runtime().navigation_agent.portals)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown portals: {sorted(unknown)}")
+    if not start_background_crawl(**request.model_dump()):
+        raise HTTPException(status_code=409, detail="crawl already running")
+    return crawl_status()
+
+@router.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str):
+    value = artifact_store.get(artifact_id)
+    if value is None:
+        raise HTTPException(status_code=404, detail="artifact not found or expired")
+    return {"id": artifact_id, "data": value}
@@ -0,0 +1,31 @@
+"""답변 캐시 판정 테스트 (server/ 에서 `python -m pytest tests` 로 실행)"""
+from utils.answer_cache import AnswerCache, answer_status, is_cacheable
+
+
+def _rag_events(answer: str, **table_meta) -> list[dict]:
+    return [
+        {"type": "route", "response": "", "meta": {}},
+        {"type": "rag", "response": "검색 결과", "meta": {"docs": [{"source": "errors.md"}]}},
+        {"type": "table_rag", "response": answer, "meta": table_meta},
+    ]
+
+
+def test_answer_mentioning_errors_is_cached():
+    events = _rag_events("📚 APIM Document 근거\n\n| 오류 코드 | 의미 |\n| 401 | 인증 실패 |")
+    assert answer_status(events) == "ok"
+    cache = AnswerCache(ttl_s=60)
+    cache.put("q", events)
+    entry, status = cache.lookup("q")
+    assert entry is not None and status == "fresh"
+
+
+def test_structured_failures_are_not_cached():
+    assert answer_status(_rag_events("근거만 표시", degraded="deadline")) == "degraded"
+    assert answer_status(_rag_events("")) == "degraded"
+    no_docs = _rag_events("답변")
+    no_docs[1]["meta"]["docs"] = []
+    assert not is_cacheable(no_docs)
+    partial = _rag_events("답변") + [
+        {"type": "interactive", "response": "", "meta": {"partial": True, "final_url": "https://x"}}]
+    assert answer_status(partial) == "degraded"
+    assert answer_status(_rag_events("답변") + [{"type": "error", "response": "boom"}]) == "error"
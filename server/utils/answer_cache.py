@@ -0,0 +1,119 @@
+# 요청 단위 답변 캐시(stale-while-revalidate)
+# 키: 정규화된 질문 + ui_mode + 문서 인덱스 버전
+# 값: 스트림 이벤트 시퀀스(project_event 결과). 캐시 적중 시 같은 형식으로 즉시 재생한다.
+#     artifact 참조는 실제 값으로 바꿔 저장하고 재생 때 아티팩트 저장소에 다시 넣는다(routers.workflow)
+# - 문서 기반 답변은 인덱스 버전이 같으면 ttl_s 동안 fresh
+# - 콘솔 탐색 결과가 포함된 답변은 console_max_age_s 동안만 fresh(콘솔 상태가 바뀔 수 있음)
+# - fresh 기간이 지나도 stale_max_s(콘솔 답변은 console_stale_max_s) 이내면 stale로 즉시 재생 + 백그라운드 갱신
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_ANSWER_TYPES = ("table_rag", "table_ui")
+
+
+def normalize_question(question: str) -> str:
+    q = unicodedata.normalize("NFKC", question or "").lower().strip()
+    q = re.sub(r"\s+", " ", q)
+    return q.rstrip("?!.~ ")
+
+
+def answer_status(events: list[dict]) -> str:
+    """이벤트의 구조화된 신호로 답변 상태 판정: ok | degraded | error
+    (응답 문구는 보지 않는다: 장애/오류 코드/시간 제한 정책을 설명하는 정상 답변도 같은 단어를 쓴다)
+    - error: error 이벤트(그래프 실행 실패)
+    - degraded: 요약 답변 없음, 요약 실패/시간 제한(table meta.degraded), 문서 검색 결과 없음,
+      콘솔 로그인 실패, 콘솔 탐색 미완료(interactive meta.partial 또는 final_url 없음)
+    """
+    if any(ev.get("type") == "error" for ev in events):
+        return "error"
+    if not any(ev.get("type") in _ANSWER_TYPES and (ev.get("response") or "").strip() for ev in events):
+        return "degraded"
+    for ev in events:
+        kind, meta = ev.get("type"), ev.get("meta") or {}
+        if kind in _ANSWER_TYPES and meta.get("degraded"):
+            return "degraded"
+        if kind == "rag" and not meta.get("docs"):
+            return "degraded"
+        if kind == "navigation" and not meta.get("login_completed"):
+            return "degraded"
+        if kind == "interactive" and (meta.get("partial") or not meta.get("final_url")):
+            return "degraded"
+    return "ok"
+
+
+def is_cacheable(events: list[dict]) -> bool:
+    """실패/부분 답변은 캐시하지 않는다"""
+    return answer_status(events) == "ok"
+
+
+class AnswerCache:
+    def __init__(self, ttl_s: float = 86400, console_max_age_s: float = 900,
+                 stale_max_s: float = 7 * 86400, max_entries: int = 1000, console_stale_max_s: float = 300,
+                 refresh_timeout_s: float = 300):
+        self.ttl_s = ttl_s
+        self.console_max_age_s = console_max_age_s
+        self.stale_max_s = stale_max_s
+        self.console_stale_max_s = console_stale_max_s
+        self.max_entries = max_entries
+        self.refresh_timeout_s = refresh_timeout_s
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        # 키 → 갱신 시작 시각. 갱신 작업이 대기열에서 시간 초과로 끝나면 end_refresh가 불리지 않으므로
+        # refresh_timeout_s가 지난 표시는 무시한다
+        self._refreshing: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str, ui_mode: str, index_version: str) -> str:
+        raw = f"{normalize_question(question)}|{ui_mode}|{index_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> tuple[dict | None, str | None]:
+        """(entry, status) 반환. status: fresh | stale | None(미적중/만료)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(key)
+        age = time.time() - entry["created_at"]
+        fresh_for = self.console_max_age_s if entry["has_console"] else self.ttl_s
+        if age <= fresh_for:
+            return entry, "fresh"
+        # 콘솔 상태는 바뀔 수 있으므로 콘솔 답변의 stale 재생은 짧게만
+        stale_for = self.console_stale_max_s if entry["has_console"] else self.stale_max_s
+        if age <= fresh_for + stale_for:
+            return entry, "stale"
+        return None, None
+
+    def put(self, key: str, events: list[dict]) -> bool:
+        if not is_cacheable(events):
+            return False
+        entry = {
+            "events": events,
+            "created_at": time.time(),
+            "has_console": any(ev.get("type") == "interactive" for ev in events),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def begin_refresh(self, key: str) -> bool:
+        """같은 키의 백그라운드 갱신이 이미 진행 중이면 False"""
+        now = time.time()
+        with self._lock:
+            started_at = self._refreshing.get(key)
+            if started_at is not None and now - started_at < self.refresh_timeout_s:
+                return False
+            self._refreshing[key] = now
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.pop(key, None)
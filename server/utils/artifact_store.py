@@ -0,0 +1,35 @@
+# 스트림 이벤트에서 참조(ID)로만 전달하는 대용량 산출물(최종 DOM, 방문 경로, RAG 청크 등) 보관소
+# 메모리 내 LRU + TTL. 클라이언트는 필요할 때만 /api/v1/workflow/artifacts/{id}로 조회한다.
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any
+
+
+class ArtifactStore:
+    def __init__(self, max_items: int = 500, ttl_s: float = 3600):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> str:
+        artifact_id = uuid.uuid4().hex
+        with self._lock:
+            self._items[artifact_id] = (time.time(), value)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return artifact_id
+
+    def get(self, artifact_id: str) -> Any | None:
+        with self._lock:
+            item = self._items.get(artifact_id)
+            if item is None:
+                return None
+            created, value = item
+            if time.time() - created > self.ttl_s:
+                self._items.pop(artifact_id, None)
+                return None
+            return value
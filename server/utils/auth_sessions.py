@@ -0,0 +1,152 @@
+# 포털별 로그인 세션 캐시
+# 로그인 후 Playwright storage state(쿠키/스토리지)를 포털 단위로 보관해 다음 요청은 로그인 폼을 건너뛴다.
+# - 만료 추정: 인증 쿠키 만료 시각과 created_at + ttl_s 중 이른 시각
+# - 검증: probe_interval_s가 지난 세션만 호출 측이 가벼운 probe(HTTP 1회)로 확인
+# - 선제 갱신: 만료 refresh_margin_s 전부터 호출 측이 백그라운드 재로그인
+# - 로그인 셀렉터 기억: 포털별로 실제 성공한 입력/버튼 셀렉터를 저장해 다음 로그인 때 먼저 시도
+# persist_dir를 주면 세션/셀렉터를 디스크에도 저장해 서버 재시작 후에도 재사용한다.
+
+import json
+import threading
+import time
+from pathlib import Path
+
+
+class AuthSessionCache:
+    def __init__(self, persist_dir: str | None = None, ttl_s: float = 1800, refresh_margin_s: float = 300,
+                 probe_interval_s: float = 60):
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self.ttl_s = ttl_s
+        self.refresh_margin_s = refresh_margin_s
+        self.probe_interval_s = probe_interval_s
+        self._sessions: dict[str, dict] = {}
+        self._selectors: dict[str, dict] = {}
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.logins = 0
+        self.invalidations = 0
+        self._load()
+
+    # ---- 세션 ----
+    def _expires_at(self, storage_state: dict, created_at: float) -> float:
+        expires = created_at + self.ttl_s
+        for cookie in storage_state.get("cookies") or []:
+            cookie_exp = cookie.get("expires") or -1
+            if cookie_exp > 0:  # -1: 세션 쿠키(브라우저 종료 시까지)
+                expires = min(expires, cookie_exp)
+        return expires
+
+    def get(self, portal: str) -> dict | None:
+        """만료되지 않은 세션 entry({storage_state, created_at, expires_at, validated_at}) 또는 None"""
+        with self._lock:
+            entry = self._sessions.get(portal)
+            if entry is not None and entry["expires_at"] <= time.time():
+                self._sessions.pop(portal, None)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def needs_probe(self, entry: dict) -> bool:
+        return time.time() - entry.get("validated_at", 0) > self.probe_interval_s
+
+    def needs_refresh(self, entry: dict) -> bool:
+        return entry["expires_at"] - time.time() < self.refresh_margin_s
+
+    def mark_valid(self, portal: str) -> None:
+        with self._lock:
+            if portal in self._sessions:
+                self._sessions[portal]["validated_at"] = time.time()
+
+    def store(self, portal: str, storage_state: dict) -> dict:
+        now = time.time()
+        entry = {
+            "storage_state": storage_state,
+            "created_at": now,
+            "validated_at": now,
+            "expires_at": self._expires_at(storage_state, now),
+        }
+        with self._lock:
+            self._sessions[portal] = entry
+            self.logins += 1
+        self._save_session(portal, entry)
+        print(f"[auth_sessions] {portal} 세션 저장 (만료까지 {entry['expires_at'] - now:.0f}s)")
+        return entry
+
+    def invalidate(self, portal: str) -> None:
+        with self._lock:
+            if self._sessions.pop(portal, None) is not None:
+                self.invalidations += 1
+        if self.persist_dir:
+            (self.persist_dir / f"{portal}.json").unlink(missing_ok=True)
+        print(f"[auth_sessions] {portal} 세션 무효화")
+
+    def begin_refresh(self, portal: str) -> bool:
+        """선제 갱신 시작(이미 진행 중이면 False)"""
+        with self._lock:
+            if portal in self._refreshing:
+                return False
+            self._refreshing.add(portal)
+            return True
+
+    def end_refresh(self, portal: str) -> None:
+        with self._lock:
+            self._refreshing.discard(portal)
+
+    # ---- 로그인 셀렉터 ----
+    def selectors(self, portal: str) -> dict:
+        return dict(self._selectors.get(portal) or {})
+
+    def remember_selectors(self, portal: str, selectors: dict) -> None:
+        if not selectors or self._selectors.get(portal) == selectors:
+            return
+        with self._lock:
+            self._selectors[portal] = dict(selectors)
+        self._write_json("login_selectors.json", self._selectors)
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "logins": self.logins,
+            "invalidations": self.invalidations,
+            "portals": {p: round(e["expires_at"] - now) for p, e in self._sessions.items()},
+        }
+
+    # ---- 디스크 저장 ----
+    def _write_json(self, name: str, data) -> None:
+        if not self.persist_dir:
+            return
+        try:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.persist_dir / f"{name}.tmp"
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.persist_dir / name)
+        except Exception as e:
+            print(f"[auth_sessions] 저장 실패({name}): {e}")
+
+    def _save_session(self, portal: str, entry: dict) -> None:
+        self._write_json(f"{portal}.json", entry)
+
+    def _load(self) -> None:
+        if not self.persist_dir or not self.persist_dir.exists():
+            return
+        now = time.time()
+        for path in self.persist_dir.glob("*.json"):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            if path.name == "login_selectors.json":
+                self._selectors = data
+            elif data.get("expires_at", 0) > now and data.get("storage_state"):
+                # 재시작 후 첫 사용 때 probe로 다시 검증
+                data["validated_at"] = 0
+                self._sessions[path.stem] = data
+        if self._sessions:
+            print(f"[auth_sessions] 저장된 세션 로드: {sorted(self._sessions)}")
@@ -0,0 +1,279 @@
+# 장수명 Playwright + headless Chromium 풀
+# 요청마다 async_playwright()/chromium.launch()를 반복하지 않고, 서버 lifespan에서 띄운 브라우저에서
+# 요청별로 격리된 BrowserContext를 발급한다(쿠키/스토리지는 컨텍스트 단위로 분리).
+# - 헬스 체크: 발급 시 연결 상태 확인, 끊긴(크래시) 브라우저는 재기동
+# - 재활용: 브라우저당 max_uses개 컨텍스트를 발급하면 진행 중 컨텍스트가 끝난 뒤 종료 → 다음 요청 때 재기동
+# - 메모리 상한: 브라우저 프로세스 수 = size (동시 컨텍스트 수는 runtime.browser_limiter가 제한)
+# - 세션 인계: open_session으로 연 컨텍스트+페이지는 블록을 벗어나도 유지되어, 핸들(문자열)로
+#   다음 그래프 노드가 같은 페이지를 이어 쓴다(release/release_owner로 반납, session_ttl_s 초과 시 회수)
+#   slot(browser_limiter 슬롯)을 넘기면 세션이 반납될 때까지 점유 → 인계 중인 세션도 동시 실행 상한에 포함
+#   실행 중인 owner(track_owner ~ release_owner)의 세션은 session_ttl_s가 지나도 회수하지 않는다
+# - 요청 차단: request_policy가 있으면 모든 컨텍스트에 적용(이미지/폰트/트래커 등). 스크린샷처럼
+#   전체 리소스가 필요하면 context(block_resources=False)
+
+import asyncio
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from playwright.async_api import async_playwright
+
+
+class _PooledBrowser:
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.uses = 0          # 현재 프로세스가 발급한 컨텍스트 수
+        self.active = 0        # 사용 중 컨텍스트 수
+        self.retiring = False  # max_uses 도달: 사용 중 컨텍스트가 끝나면 종료
+        self.launched_at: float | None = None
+        self.lock = asyncio.Lock()
+
+    def healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class BrowserSession:
+    """노드 간에 넘기는 열린 컨텍스트/페이지. 그래프 state에는 handle만 저장(체크포인트 직렬화 가능)"""
+
+    def __init__(self, owner: str | None, context, page, stack: AsyncExitStack):
+        self.handle = uuid.uuid4().hex
+        self.owner = owner            # 실행(run_id) 단위 일괄 반납용
+        self.context = context
+        self.page = page
+        self.opened_at = time.time()
+        self._stack = stack
+
+    def alive(self) -> bool:
+        return not self.page.is_closed()
+
+
+class BrowserPool:
+    def __init__(self, size: int = 1, max_uses: int = 50, headless: bool = True, session_ttl_s: float = 300.0,
+                 request_policy=None):
+        self.size = max(1, int(size))
+        self.request_policy = request_policy
+        self.max_uses = max(1, int(max_uses))
+        self.headless = headless
+        self.session_ttl_s = session_ttl_s
+        self._sessions: dict[str, BrowserSession] = {}
+        self._running_owners: set[str] = set()
+        self.handoffs = 0
+        self.reaped = 0
+        self._playwright = None
+        self._loop = None
+        self._slots = [_PooledBrowser(i) for i in range(self.size)]
+        self._start_lock = None
+        self.launches = 0
+        self.recycles = 0
+        self.crashes = 0
+        self.contexts = 0
+
+    async def start(self, warm: bool = True) -> None:
+        """Playwright 시작(현재 이벤트 루프에 바인딩). warm이면 첫 브라우저를 미리 띄운다"""
+        loop = asyncio.get_running_loop()
+        if self._playwright is not None and self._loop is loop:
+            return
+        if self._playwright is not None:
+            # 다른 이벤트 루프(CLI에서 asyncio.run 반복 등)에서 만든 인스턴스는 사용할 수 없다
+            print("[browser_pool] 이벤트 루프 변경: Playwright 재시작")
+            self._playwright = None
+            self._slots = [_PooledBrowser(i) for i in range(self.size)]
+            self._sessions = {}
+        self._loop = loop
+        self._playwright = await async_playwright().start()
+        print(f"[browser_pool] Playwright 시작 (size={self.size}, max_uses={self.max_uses})")
+        if warm:
+            await self._ensure_browser(self._slots[0])
+
+    async def _ensure_browser(self, slot: _PooledBrowser) -> None:
+        async with slot.lock:
+            if slot.healthy():
+                return
+            if slot.browser is not None:
+                # 연결이 끊긴 브라우저(크래시/강제 종료)
+                self.crashes += 1
+                print(f"[browser_pool] 브라우저 #{slot.index} 연결 끊김: 재기동")
+            t0 = time.perf_counter()
+            slot.browser = await self._playwright.chromium.launch(headless=self.headless)
+            slot.uses = 0
+            slot.retiring = False
+            slot.launched_at = time.time()
+            self.launches += 1
+            print(f"[browser_pool] 브라우저 #{slot.index} 기동 ({(time.perf_counter() - t0) * 1000:.0f}ms)")
+
+    def _pick(self) -> _PooledBrowser:
+        """재활용 대기 중이 아닌 슬롯 중 사용 중 컨텍스트가 가장 적은 것"""
+        candidates = [s for s in self._slots if not s.retiring] or self._slots
+        return min(candidates, key=lambda s: (s.active, not s.healthy()))
+
+    async def _retire(self, slot: _PooledBrowser) -> None:
+        async with slot.lock:
+            browser, slot.browser = slot.browser, None
+            slot.retiring = False
+        if browser is not None:
+            self.recycles += 1
+            print(f"[browser_pool] 브라우저 #{slot.index} 재활용(uses={slot.uses})")
+            try:
+                await browser.close()
+            except Exception as e:
+                print(f"[browser_pool] 브라우저 종료 실패: {e}")
+
+    @asynccontextmanager
+    async def context(self, block_resources: bool = True, **context_kwargs):
+        """격리된 BrowserContext 발급. 블록을 벗어나면 컨텍스트를 닫고 슬롯 반납"""
+        if self._start_lock is None or self._loop is not asyncio.get_running_loop():
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            await self.start(warm=False)
+        kwargs = {k: v for k, v in context_kwargs.items() if v is not None}
+        slot = self._pick()
+        slot.active += 1
+        context = None
+        try:
+            await self._ensure_browser(slot)
+            try:
+                context = await slot.browser.new_context(**kwargs)
+            except Exception as e:
+                # 헬스 체크 통과 직후 죽은 경우: 한 번 재기동 후 재시도
+                if slot.healthy():
+                    raise
+                print(f"[browser_pool] 컨텍스트 생성 실패, 재기동 후 재시도: {e}")
+                await self._ensure_browser(slot)
+                context = await slot.browser.new_context(**kwargs)
+            if block_resources and self.request_policy is not None:
+                await self.request_policy.attach(context)
+            slot.uses += 1
+            self.contexts += 1
+            if slot.uses >= self.max_uses:
+                slot.retiring = True
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    print(f"[browser_pool] 컨텍스트 종료 실패: {e}")
+            slot.active -= 1
+            if slot.retiring and slot.active == 0:
+                await self._retire(slot)
+
+    # ---- 노드 간 세션 인계 ----
+    async def open_session(self, owner: str | None = None, slot=None, **context_kwargs) -> BrowserSession:
+        """블록에 묶이지 않는 컨텍스트+페이지를 열고 등록. 반드시 release/release_owner로 반납
+        slot: 세션이 반납될 때까지 점유할 동시 실행 슬롯(async context manager, 예: browser_limiter.slot(deadline))
+        """
+        await self._reap()
+        stack = AsyncExitStack()
+        try:
+            if slot is not None:
+                await stack.enter_async_context(slot)
+            context = await stack.enter_async_context(self.context(**context_kwargs))
+            page = await context.new_page()
+        except BaseException:
+            await stack.aclose()
+            raise
+        session = BrowserSession(owner, context, page, stack)
+        self._sessions[session.handle] = session
+        return session
+
+    def session(self, handle: str | None) -> BrowserSession | None:
+        """핸들로 열린 세션 조회. 없거나(반납/회수/재시작) 페이지가 닫혔으면 None"""
+        session = self._sessions.get(handle) if handle else None
+        if session is None or not session.alive():
+            return None
+        self.handoffs += 1
+        return session
+
+    async def release(self, handle: str | None) -> None:
+        session = self._sessions.pop(handle, None) if handle else None
+        if session is not None:
+            await session._stack.aclose()
+
+    def track_owner(self, owner: str | None) -> None:
+        """실행 시작 표시: release_owner까지 그 실행의 세션은 TTL 회수 대상에서 제외"""
+        if owner:
+            self._running_owners.add(owner)
+
+    async def release_owner(self, owner: str | None) -> None:
+        """실행 종료/실패 시 그 실행이 연 세션 일괄 반납"""
+        if not owner:
+            return
+        self._running_owners.discard(owner)
+        for handle in [h for h, s in self._sessions.items() if s.owner == owner]:
+            print(f"[browser_pool] 미반납 세션 정리: {handle} (run {owner})")
+            await self.release(handle)
+
+    async def _reap(self) -> None:
+        """session_ttl_s를 넘긴 세션 회수(반납 누락 방지). 실행 중인 owner의 세션은 제외"""
+        now = time.time()
+        for handle in [h for h, s in self._sessions.items()
+                       if now - s.opened_at > self.session_ttl_s and s.owner not in self._running_owners]:
+            self.reaped += 1
+            print(f"[browser_pool] 오래된 세션 회수: {handle}")
+            await self.release(handle)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "max_uses": self.max_uses,
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "crashes": self.crashes,
+            "contexts": self.contexts,
+            "sessions": len(self._sessions),
+            "handoffs": self.handoffs,
+            "reaped": self.reaped,
+            "request_policy": self.request_policy.stats() if self.request_policy else None,
+            "browsers": [
+                {"index": s.index, "alive": s.healthy(), "active": s.active, "uses": s.uses}
+                for s in self._slots
+            ],
+        }
+
+    async def close(self) -> None:
+        for handle in list(self._sessions):
+            try:
+                await self.release(handle)
+            except Exception:
+                pass
+        for slot in self._slots:
+            if slot.browser is not None:
+                try:
+                    await slot.browser.close()
+                except Exception:
+                    pass
+                slot.browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+        self._playwright = None
+        print("[browser_pool] 종료")
+
+
+_POOL: BrowserPool | None = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """전역 브라우저 풀. lifespan 밖(CLI/벤치마크)에서는 최초 사용 시 생성"""
+    global _POOL
+    if _POOL is None:
+        from utils.config import settings
+        from utils.request_policy import RequestPolicy
+        policy = RequestPolicy(
+            block_types=settings.BLOCK_RESOURCE_TYPES,
+            block_domains=settings.BLOCK_TRACKER_DOMAINS,
+            allowlist=settings.BLOCK_ALLOWLIST,
+            enabled=settings.BLOCK_RESOURCES_ENABLED,
+        )
+        _POOL = BrowserPool(size=settings.BROWSER_POOL_SIZE, max_uses=settings.BROWSER_MAX_USES,
+                            session_ttl_s=settings.BROWSER_SESSION_TTL_S, request_policy=policy)
+    return _POOL
+
+
+async def shutdown_browser_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        await _POOL.close()
+    _POOL = None
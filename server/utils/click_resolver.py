@@ -0,0 +1,125 @@
+# 클릭 대상 해석: 후보 locator 전략을 동시에 대기시키고(race) 처음으로 보이고 활성화된 요소를 클릭
+# 전략을 차례로 시도하면 전략마다 대기 타임아웃(text 10초, href 7초+7초)이 쌓여 실패 한 번에 20초 이상 걸렸다.
+# - 대상 하나에 대해 가능한 전략(역할/이름, 텍스트, href, id ...)을 한 번에 걸고 먼저 visible+enabled가 된 것을 쓰고
+#   나머지는 취소한다. 모두 실패해도 비용은 짧은 타임아웃(timeout_ms) 한 번
+# - 화면(URL)별로 성공한 전략을 기억해 두고, 다음에는 그 전략을 대기 없이 먼저 확인한다
+
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
+
+from utils.concurrency import first_success
+from utils.deadline import budget_ms
+from utils.observation import locator_for
+
+
+def _quote(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _page_key(url: str) -> str:
+    parsed = urlparse(url or "")
+    return f"{parsed.hostname}{parsed.path}#{parsed.fragment}"
+
+
+def strategies(page, target: dict, element: dict | None = None) -> dict:
+    """대상 → {전략 이름: locator}. element(관찰 요소)가 있으면 그 역할/이름 기준"""
+    if element is not None:
+        candidates = {"element": locator_for(page, element)}
+        if element.get("selector"):
+            # DOM 스냅샷 셀렉터(:has-text 등)가 맞지 않을 때를 대비해 역할/이름으로도
+            candidates["role"] = page.get_by_role(element["role"], name=element["name"], exact=True).first
+        return candidates
+    by = (target.get("by") or "").lower()
+    value = str(target.get("value") or "")
+    if not value:
+        return {}
+    if by == "text":
+        return {
+            "text": page.locator(f"text={value}").first,
+            "link": page.get_by_role("link", name=value).first,
+            "button": page.get_by_role("button", name=value).first,
+            "exact": page.get_by_text(value, exact=True).first,
+        }
+    if by == "href":
+        return {
+            "href": page.locator(f"a[href='{_quote(value)}']").first,
+            "href_partial": page.locator(f"a[href*='{_quote(value)}']").first,
+        }
+    if by == "id":
+        return {
+            "id": page.locator(f"[id='{_quote(value)}']").first,
+            "testid": page.get_by_test_id(value).first,
+        }
+    return {}
+
+
+class ClickResolver:
+    def __init__(self, timeout_ms: int = 3000, cache_size: int = 1000):
+        self.timeout_ms = timeout_ms
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, str] = OrderedDict()  # (화면, 대상) → 성공한 전략
+        self.wins = Counter()
+        self.cache_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    async def _clickable(locator, timeout_ms: int) -> None:
+        await locator.wait_for(state="visible", timeout=timeout_ms)
+        if not await locator.is_enabled():
+            raise RuntimeError("disabled")
+
+    @staticmethod
+    async def _clickable_now(locator) -> bool:
+        try:
+            return await locator.is_visible() and await locator.is_enabled()
+        except Exception:
+            return False
+
+    async def click(self, page, target: dict, deadline: float | None = None, element: dict | None = None) -> bool:
+        """대상을 찾아 클릭. 어떤 전략으로도 timeout_ms 안에 찾지 못하면 False"""
+        candidates = strategies(page, target, element)
+        if not candidates:
+            return False
+        signature = (element["role"], element["name"], element.get("nth", element.get("selector"))) if element \
+            else ((target.get("by") or "").lower(), str(target.get("value")))
+        key = (_page_key(page.url), signature)
+        cached = self._cache.get(key)
+        if cached in candidates and await self._clickable_now(candidates[cached]):
+            winner = cached
+            self.cache_hits += 1
+        else:
+            timeout = budget_ms(deadline, self.timeout_ms)
+            winner = await first_success({name: self._clickable(locator, timeout) for name, locator in candidates.items()})
+        if winner is None:
+            self.misses += 1
+            self._cache.pop(key, None)
+            print(f"[click_resolver] 대상 없음({self.timeout_ms}ms): {target if element is None else element['name']}")
+            return False
+        self.wins[winner] += 1
+        self._cache[key] = winner
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        await candidates[winner].click(timeout=budget_ms(deadline, self.timeout_ms))
+        return True
+
+    def stats(self) -> dict:
+        resolved = sum(self.wins.values())
+        return {
+            "resolved": resolved,
+            "misses": self.misses,
+            "cache_hits": self.cache_hits,
+            "cached": len(self._cache),
+            "wins": dict(self.wins),
+        }
+
+
+_CLICK_RESOLVER: ClickResolver | None = None
+
+
+def get_click_resolver() -> ClickResolver:
+    global _CLICK_RESOLVER
+    if _CLICK_RESOLVER is None:
+        from utils.config import settings
+        _CLICK_RESOLVER = ClickResolver(timeout_ms=settings.CLICK_RESOLVE_TIMEOUT_MS)
+    return _CLICK_RESOLVER
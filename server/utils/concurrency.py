@@ -0,0 +1,111 @@
+# 프로세스 내 동시 실행 상한(브라우저 세션 / LLM 호출) + 대기 시간 통계
+# 상한을 넘는 요청은 실패시키지 않고 슬롯이 빌 때까지 대기하며,
+# 대기는 요청 데드라인 안에서만 한다(넘으면 DeadlineExceeded → 호출 측이 단계를 생략/축소).
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from utils.deadline import DeadlineExceeded, with_budget
+
+
+def percentile(values, q: float) -> float | None:
+    """단순 백분위(nearest-rank). 값이 없으면 None"""
+    data = sorted(values)
+    if not data:
+        return None
+    idx = max(0, math.ceil(q / 100 * len(data)) - 1)
+    return data[idx]
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+
+async def first_success(waiters: dict) -> str | None:
+    """여러 대기를 동시에 걸고 먼저 성공한 것의 이름 반환(나머지는 취소). 모두 실패하면 None"""
+    tasks = {asyncio.ensure_future(coro): name for name, coro in waiters.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    return tasks[task]
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, limit: int, window: int = 200):
+        self.name = name
+        self.limit = max(1, int(limit))
+        self._sem = asyncio.Semaphore(self.limit)
+        self.in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self._waits_ms: deque[float] = deque(maxlen=window)
+
+    @asynccontextmanager
+    async def slot(self, deadline: float | None = None):
+        """슬롯 하나를 점유. deadline까지 못 얻으면 DeadlineExceeded"""
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            await with_budget(self._sem.acquire(), deadline)
+        except DeadlineExceeded:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        wait_ms = (time.perf_counter() - t0) * 1000
+        self._waits_ms.append(wait_ms)
+        if wait_ms > 100:
+            print(f"[concurrency] {self.name} 슬롯 대기 {wait_ms:.0f}ms (limit={self.limit})")
+        self.in_use += 1
+        self.acquired += 1
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            self._sem.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": _round(percentile(self._waits_ms, 50)),
+            "wait_ms_p95": _round(percentile(self._waits_ms, 95)),
+        }
+
+
+class LimitedLLM:
+    """LLM 클라이언트 래퍼: ainvoke를 LLM 동시 호출 상한 안에서 실행(그 외 속성은 그대로 위임)"""
+
+    def __init__(self, inner, limiter: ConcurrencyLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        async with self.limiter.slot():
+            return await self.inner.ainvoke(messages, *args, **kwargs)
+
+    def invoke(self, messages, *args, **kwargs):
+        """동기 호출은 상한을 적용할 수 없으므로 이벤트 루프 밖(CLI/스크립트)에서만 허용"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self.inner.invoke(messages, *args, **kwargs)
+        raise RuntimeError("LimitedLLM.invoke는 이벤트 루프 안에서 쓸 수 없습니다. await ainvoke()를 사용하세요")
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
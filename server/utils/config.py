@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings, ChatOpenAI
+from pathlib import Path
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
@@ -38,10 +39,173 @@ class Settings(BaseSettings):
     APIM_LOGIN_EMAIL: str | None = None
     APIM_LOGIN_PASSWORD: str | None = None
 
+    # 노드별 LLM 티어 설정
+    # fast: 짧은 JSON을 내는 단계(검색질의 변환/포털 선택/다음 액션)용 저지연 모델
+    # large: 최종 요약/답변(TableAgent, InteractiveAgent 최종 답변)용 모델
+    AOAI_DEPLOY_FAST: str | None = None  # 미설정 시 AOAI_DEPLOY_GPT4O 사용
+    LLM_FAST_TEMPERATURE: float = 0.0
+    LLM_FAST_MAX_TOKENS: int | None = 256
+    LLM_LARGE_TEMPERATURE: float = 0.7
+    LLM_LARGE_MAX_TOKENS: int | None = None
+    # 노드 → 티어 이름 또는 개별 설정(JSON)
+    # 예: LLM_NODE_TIERS='{"rag_query":"fast","table_summary":{"tier":"large","max_tokens":1500}}'
+    LLM_NODE_TIERS: dict = {
+        "rag_query": "fast",
+        "portal_select": "fast",
+        "next_action": "fast",
+        "table_summary": "large",
+        "final_answer": "large",
+    }
+
+    # LLM 백엔드: azure(실호출) | record(실호출 + cassette 기록) | replay(cassette 재생, 오프라인)
+    LLM_BACKEND: str = "azure"
+    LLM_CASSETTE_PATH: str = str(Path(__file__).resolve().parents[1] / "benchmarks" / "llm_cassette.jsonl")
+    LLM_REPLAY_LATENCY_MS: float | None = None  # None이면 기록된 지연 × LLM_REPLAY_LATENCY_SCALE
+    LLM_REPLAY_LATENCY_SCALE: float = 1.0
+    LLM_REPLAY_PER_CHAR_MS: float = 0.0
+    LLM_REPLAY_JITTER_MS: float = 0.0
+    LLM_REPLAY_MISS_COMPLETION: str = "{}"
+
+    # 벡터DB 임베딩 모델(다국어 모델 지정 시 한국어 질문을 문서와 같은 공간에 직접 임베딩)
+    # 예: paraphrase-multilingual-MiniLM-L12-v2 (변경 시 서버 시작 때 자동 재인덱싱)
+    VECTOR_DB_MODEL: str = "all-MiniLM-L6-v2"
+    # RAG 검색질의 변환: llm | glossary | multilingual | hybrid
+    # llm 외 모드는 로컬 변환을 먼저 시도하고, 최고 유사도가 임계값 미만일 때만 LLM 변환으로 폴백
+    RAG_QUERY_REWRITE: str = "glossary"
+    RAG_LOCAL_MIN_SIMILARITY: float = 0.45
+
+    # 런타임 데이터(탐색 결과 통계 등) 저장 디렉토리
+    DATA_DIR: str = str(Path(__file__).resolve().parents[1] / "data")
+
+    # UI(콘솔) 탐색 라우팅: 문서 유사도가 UI_ROUTE_DOC_CONFIDENCE 이상인 설명형 질문은 탐색 생략
+    UI_ROUTE_DOC_CONFIDENCE: float = 0.6
+    UI_ROUTE_MIN_SUCCESS_RATE: float = 0.3  # 유형별 과거 탐색 성공률이 이보다 낮으면 생략
+    UI_ROUTE_MIN_SAMPLES: int = 5           # 성공률을 반영하기 위한 최소 표본 수
+    UI_ROUTE_EXPLORE_RATE: float = 0.1      # 성공률이 낮아 생략할 질문도 이 확률로는 탐색
+    UI_ROUTE_DECAY: float = 0.95            # 성공률 누적 시 이전 결과 감쇠 비율
+
+    # 답변 캐시(같은 질문 재요청 시 저장된 이벤트 즉시 재생, stale-while-revalidate)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_S: float = 86400            # 문서 기반 답변 fresh 기간
+    ANSWER_CACHE_CONSOLE_MAX_AGE_S: float = 900  # 콘솔 탐색 스냅샷 포함 답변 fresh 기간
+    ANSWER_CACHE_STALE_MAX_S: float = 604800     # fresh 이후 stale로 재생 가능한 기간(문서 기반 답변)
+    ANSWER_CACHE_CONSOLE_STALE_MAX_S: float = 300  # 콘솔 탐색 포함 답변의 stale 재생 기간
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+
+    # 그래프 체크포인트(SQLite): 실패한 실행을 run_id로 재시도하면 마지막 성공 노드부터 재개
+    GRAPH_CHECKPOINT_ENABLED: bool = True
+    GRAPH_CHECKPOINT_PATH: str = ""   # 비우면 DATA_DIR/graph_checkpoints.sqlite
+    # 성공한 실행은 끝나는 즉시 삭제, 실패/중단된 실행(재개 대상)은 마지막 체크포인트 후 이 기간이 지나면 삭제
+    GRAPH_CHECKPOINT_TTL_S: float = 86400
+
+    # 요청 데드라인: 클라이언트 timeout(60s)보다 먼저 부분 답변이라도 돌려주도록 전체 예산 설정
+    REQUEST_TIMEOUT_S: float = 55.0
+    # 노드별 예산 = 요청 데드라인 - 뒤 단계 몫(reserve). navigation은 interactive/table_ui 몫을 남긴다
+    NODE_DEADLINE_RESERVE_S: dict = {
+        "navigation": 25.0,
+        "interactive": 6.0,
+    }
+    # interactive: 탐색(ReAct)을 멈추고 최종 답변 LLM에 남겨둘 시간
+    INTERACTIVE_ANSWER_RESERVE_S: float = 8.0
+
+    # 작업 큐/동시 실행 상한(버스트 시 OOM 대신 대기·거절로 처리량을 완만하게 낮춤)
+    JOB_WORKERS: int = 4                 # 동시에 실행하는 질의 수
+    JOB_QUEUE_MAX: int = 20              # 대기열 상한(초과 시 503)
+    JOB_MAX_QUEUE_WAIT_S: float = 20.0   # 예상 대기 시간 상한(초과 시 503)
+    JOB_RETENTION_S: float = 600.0       # 완료된 작업 결과 보관 기간
+    BROWSER_MAX_CONCURRENCY: int = 2     # 동시 Chromium 세션 수(navigation/interactive)
+    LLM_MAX_CONCURRENCY: int = 8         # 동시 LLM 호출 수
+    # 장수명 Chromium 풀(lifespan에서 기동, 요청별 격리 컨텍스트 발급)
+    BROWSER_POOL_SIZE: int = 1           # Chromium 프로세스 수
+    BROWSER_MAX_USES: int = 50           # 브라우저당 컨텍스트 발급 수(초과 시 재기동해 메모리 누수 방지)
+    BROWSER_SESSION_TTL_S: float = 300.0 # navigation → interactive로 인계한 페이지의 최대 보유 시간(반납 누락 회수)
+
+    # 에이전트 브라우저 요청 차단(DOM 텍스트만 읽으므로 무거운 리소스/트래커는 받지 않음)
+    BLOCK_RESOURCES_ENABLED: bool = True
+    BLOCK_RESOURCE_TYPES: list[str] = ["image", "media", "font"]
+    BLOCK_TRACKER_DOMAINS: list[str] = [
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+        "facebook.net", "hotjar.com", "clarity.ms", "segment.io", "nr-data.net", "mixpanel.com",
+        "amplitude.com", "channel.io",
+    ]
+    # 페이지 호스트별 예외(resource type 또는 URL 부분 문자열). 예: {"console.skapim.com": ["captcha"]}
+    BLOCK_ALLOWLIST: dict = {}
+
+    # 페이지 준비 판정(utils.readiness): 호스트별 준비 완료 DOM 셀렉터(ready)/데이터 API 경로(api)
+    # 신호가 READY_TIMEOUT_MS 안에 오지 않으면 networkidle을 READY_FALLBACK_MS까지만 기다리고 진행
+    READY_RULES: dict = {
+        "console.skapim.com": {"ready": ".ant-layout-content, .ant-table, .ant-list, .ant-card", "api": "/api/"},
+        "tenant.skapim.com": {"ready": ".ant-layout-content, .ant-table, .ant-list, .ant-card", "api": "/api/"},
+        "developers.skapim.com": {"ready": "main, article, .ant-layout-content"},
+        "default": {"ready": "main, [role='main'], form, h1"},
+    }
+    READY_TIMEOUT_MS: int = 8000
+    READY_FALLBACK_MS: int = 1500
+    # 클릭 대상 해석(utils.click_resolver): 모든 locator 전략을 동시에 대기, 못 찾으면 이 시간 한 번만 소모
+    CLICK_RESOLVE_TIMEOUT_MS: int = 3000
+
+    # 포털별 로그인 세션 캐시(유효한 storage state가 있으면 로그인 폼 생략)
+    AUTH_SESSION_CACHE_ENABLED: bool = True
+    AUTH_SESSION_PERSIST: bool = True            # DATA_DIR/auth_sessions에 세션/셀렉터 저장
+    AUTH_SESSION_TTL_S: float = 1800             # 쿠키 만료 정보가 없을 때 세션 유효 기간 추정치
+    AUTH_SESSION_REFRESH_MARGIN_S: float = 300   # 만료 이 시간 전부터 백그라운드 재로그인
+    AUTH_SESSION_PROBE_INTERVAL_S: float = 60    # 마지막 검증 후 이 시간이 지나면 probe로 재검증
+
+    # 포털 사이트맵(workflow.crawler로 구축, DATA_DIR/site_map)
+    SITE_MAP_ENABLED: bool = True
+    CRAWL_PORTALS: list[str] = ["console", "developers", "tenant"]
+    CRAWL_MAX_PAGES: int = 150            # 포털당
+    CRAWL_MAX_DEPTH: int = 3
+    CRAWL_CONCURRENCY: int = 2            # 동시 탭 수
+    SITE_MAP_JUMP_SIMILARITY: float = 0.55     # 이 이상이면 탐색 시작 페이지를 사이트맵 페이지로
+    SITE_MAP_ANSWER_SIMILARITY: float = 0.75   # 이 이상이고 스냅샷이 최신이면 브라우저 탐색 없이 스냅샷으로 답변
+    SITE_MAP_MAX_AGE_S: float = 86400.0        # 스냅샷으로 답변할 수 있는 최대 경과 시간
+
+    # ReAct 클릭 후보 사전 순위(retrieval.action_ranker)
+    ACTION_RANK_ENABLED: bool = True
+    ACTION_RANK_TOP_K: int = 12              # LLM에 보낼 후보 수
+    ACTION_RANK_AUTO_SCORE: float = 0.6      # 1위 점수가 이 이상이고
+    ACTION_RANK_AUTO_MARGIN: float = 0.15    # 2위보다 이만큼 높으면 LLM 없이 바로 클릭
+    # 병렬 탭 탐색: 1위가 압도적이지 않으면 상위 후보 링크들을 같은 컨텍스트의 탭에서 동시에 열어 보고
+    # 질문과 가장 잘 맞는 화면에서 계속(0/1이면 사용 안 함)
+    EXPLORE_CANDIDATES: int = 3
+    EXPLORE_MAX_TABS: int = 2               # 동시에 로딩하는 탭 상한
+    EXPLORE_MIN_GAIN: float = 0.05          # 현재 화면보다 이만큼 더 맞아야 이동
+
+    # 내비게이션 메모리(retrieval.nav_memory, DATA_DIR/nav_memory.json): answer에 도달한 경로를 비슷한 질문에 재사용
+    NAV_MEMORY_ENABLED: bool = True
+    NAV_MEMORY_SIMILARITY: float = 0.85     # 이 이상 비슷한 질문이면 저장된 최종 화면으로 바로 이동
+    NAV_MEMORY_MAX_ENTRIES: int = 500
+
+    # 배치 질의(FAQ/상위 질의 사전 계산, 회귀 테스트)
+    BATCH_MAX_QUESTIONS: int = 200
+    BATCH_CONCURRENCY: int = 2           # 배치 내 동시 실행 질문 수
+    BATCH_TIMEOUT_S: float = 180.0       # 질문별 시간 예산(클라이언트 대기가 없으므로 넉넉히)
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, extra="ignore")
 
+    def _with_backend(self, node: str, factory):
+        """LLM_BACKEND에 따라 실제 LLM 또는 record/replay 래퍼 반환"""
+        if self.LLM_BACKEND not in ("record", "replay"):
+            return factory()
+        from utils.replay_llm import RecordReplayLLM, get_cassette
+        return RecordReplayLLM(
+            get_cassette(self.LLM_CASSETTE_PATH),
+            mode=self.LLM_BACKEND,
+            inner=factory() if self.LLM_BACKEND == "record" else None,
+            node=node,
+            latency_ms=self.LLM_REPLAY_LATENCY_MS,
+            latency_scale=self.LLM_REPLAY_LATENCY_SCALE,
+            per_char_ms=self.LLM_REPLAY_PER_CHAR_MS,
+            jitter_ms=self.LLM_REPLAY_JITTER_MS,
+            miss_completion=self.LLM_REPLAY_MISS_COMPLETION,
+        )
+
     def get_llm_azopai(self):
         """Azure OpenAI LLM 인스턴스 반환 (툴 바인딩 없음)"""
+        return self._with_backend("default", self._azure_llm)
+
+    def _azure_llm(self):
         return AzureChatOpenAI(
             openai_api_key=settings.AOAI_API_KEY,
             azure_endpoint=settings.AOAI_ENDPOINT,
@@ -51,6 +215,44 @@ class Settings(BaseSettings):
             streaming=True,
         )
 
+    def llm_profile(self, node: str) -> dict:
+        """노드 이름에 해당하는 LLM 설정(deployment/temperature/max_tokens) 반환.
+        LLM_NODE_TIERS에 없는 노드는 large 티어를 사용한다.
+        """
+        tiers = {
+            "fast": {
+                "deployment": self.AOAI_DEPLOY_FAST or self.AOAI_DEPLOY_GPT4O,
+                "temperature": self.LLM_FAST_TEMPERATURE,
+                "max_tokens": self.LLM_FAST_MAX_TOKENS,
+            },
+            "large": {
+                "deployment": self.AOAI_DEPLOY_GPT4O,
+                "temperature": self.LLM_LARGE_TEMPERATURE,
+                "max_tokens": self.LLM_LARGE_MAX_TOKENS,
+            },
+        }
+        spec = self.LLM_NODE_TIERS.get(node, "large")
+        if isinstance(spec, str):
+            spec = {"tier": spec}
+        profile = dict(tiers.get(spec.get("tier", "large"), tiers["large"]))
+        for key in ("deployment", "temperature", "max_tokens"):
+            if key in spec:
+                profile[key] = spec[key]
+        return profile
+
+    def get_llm_for(self, node: str):
+        """노드별 티어 설정이 적용된 Azure OpenAI LLM 인스턴스 반환"""
+        profile = self.llm_profile(node)
+        return self._with_backend(node, lambda: AzureChatOpenAI(
+            openai_api_key=settings.AOAI_API_KEY,
+            azure_endpoint=settings.AOAI_ENDPOINT,
+            azure_deployment=profile["deployment"],
+            api_version=settings.AOAI_API_VERSION,
+            temperature=profile["temperature"],
+            max_tokens=profile["max_tokens"],
+            streaming=True,
+        ))
+
     def get_llm_openrouter(self):
         """OpenRouter LLM 인스턴스 반환 (툴 바인딩 없음)"""
         print(settings.OPENROUTER_API_KEY)
@@ -81,6 +283,9 @@ settings = Settings()
 def get_llm_azopai():
     return settings.get_llm_azopai()
 
+def get_llm_for(node: str):
+    return settings.get_llm_for(node)
+
 def get_llm_openrouter():
     return settings.get_llm_openrouter()
 
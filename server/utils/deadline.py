@@ -0,0 +1,63 @@
+# 요청 데드라인(시간 예산) 유틸
+# 데드라인은 epoch 초(float)로 그래프 state["deadline"]에 실려 노드/에이전트로 전달된다.
+# (체크포인트에 그대로 저장되도록 직렬화 가능한 값 사용)
+# - 브라우저 대기: budget_ms()로 기본 timeout을 남은 시간으로 clamp
+# - LLM 호출: with_budget()으로 남은 시간 안에서만 대기
+# - 예산이 소진되면 DeadlineExceeded → 각 에이전트가 부분 답변으로 degrade
+
+import asyncio
+import time
+
+
+class DeadlineExceeded(Exception):
+    """요청 시간 예산 소진"""
+
+
+def new_deadline(timeout_s: float | None) -> float | None:
+    return time.time() + timeout_s if timeout_s else None
+
+
+def shift(deadline: float | None, reserve_s: float) -> float | None:
+    """뒤 단계 몫(reserve_s)을 남겨둔 데드라인"""
+    if deadline is None or not reserve_s:
+        return deadline
+    return deadline - reserve_s
+
+
+def remaining(deadline: float | None) -> float | None:
+    """남은 시간(초). 데드라인이 없으면 None(무제한)"""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expired(deadline: float | None) -> bool:
+    left = remaining(deadline)
+    return left is not None and left <= 0
+
+
+def budget_ms(deadline: float | None, default_ms: int) -> int:
+    """Playwright timeout(ms)을 남은 시간으로 clamp. 이미 소진됐으면 DeadlineExceeded
+    (Playwright는 timeout=0을 '무제한'으로 해석하므로 최소 1ms)
+    """
+    left = remaining(deadline)
+    if left is None:
+        return default_ms
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return max(1, min(default_ms, int(left * 1000)))
+
+
+async def with_budget(awaitable, deadline: float | None):
+    """남은 시간 안에서 awaitable 대기. 시간 초과 시 DeadlineExceeded"""
+    left = remaining(deadline)
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("request deadline exceeded") from e
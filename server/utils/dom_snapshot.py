@@ -0,0 +1,108 @@
+# 페이지 DOM 스냅샷: page.evaluate 한 번으로 페이지 안에서 필요한 정보만 추려 구조화된 dict로 반환
+# (page.content()로 전체 HTML을 받아 BeautifulSoup으로 다시 파싱하지 않음)
+# {title, headings, controls: [{tag, role, text, href, abs, selector}], paragraphs, policies}
+# - controls: 보이는 링크/버튼과 다시 찾을 수 있는 셀렉터(id → data-testid → a[href] → :has-text 순)
+# - policies: 정책 목록 영역 항목 + 정책 관련 키워드를 가진 a/button/span 텍스트
+# render_summary(요약 텍스트)와 policy_items(정책 항목)는 같은 스냅샷을 재사용한다.
+
+POLICY_KEYWORDS = ["Policy", "정책", "JWT", "Rate Limiting", "Key", "OIDC", "SAML", "CORS"]
+
+_POLICY_SELECTOR = ", ".join([
+    "[class*='policy'] li",
+    "[class*='policy'] .ant-list-item",
+    "[class*='policy'] .ant-collapse-item .ant-collapse-header",
+    "[class*='Policies'] li",
+    "[class*='Policies'] .ant-list-item",
+    "[class*='Policies'] .ant-collapse-item .ant-collapse-header",
+])
+
+SNAPSHOT_JS = """([policySelector, policyKeywords, maxControls]) => {
+    const visible = el => {
+        if (!el.getClientRects().length) return false;
+        const style = getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const text = el => (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim();
+    const quote = s => s.replace(/["\\\\]/g, '\\\\$&');
+    const selectorFor = el => {
+        if (el.id) return '#' + CSS.escape(el.id);
+        const testId = el.getAttribute('data-testid');
+        if (testId) return `[data-testid="${quote(testId)}"]`;
+        const href = el.getAttribute('href');
+        if (el.tagName === 'A' && href) return `a[href="${quote(href)}"]`;
+        const t = text(el).slice(0, 50);
+        if (t) return `${el.tagName.toLowerCase()}:has-text("${quote(t)}")`;
+        return null;
+    };
+    const headings = [...document.querySelectorAll('h1, h2, h3')]
+        .filter(visible).map(text).filter(Boolean).slice(0, 40);
+    const controls = [];
+    for (const el of document.querySelectorAll("a, button, [role='button'], [role='link'], [role='menuitem'], [role='tab']")) {
+        if (controls.length >= maxControls) break;
+        if (!visible(el)) continue;
+        const t = text(el).slice(0, 100);
+        const href = el.getAttribute('href') || '';
+        if (!t && !href) continue;
+        controls.push({
+            tag: el.tagName.toLowerCase(), role: el.getAttribute('role') || '',
+            text: t, href: href, abs: el.href || '', selector: selectorFor(el),
+        });
+    }
+    const paragraphs = [];
+    let size = 0;
+    for (const el of document.querySelectorAll('p, li')) {
+        if (size > 2500) break;
+        if (!visible(el)) continue;
+        const t = text(el);
+        if (t) { paragraphs.push(t.slice(0, 500)); size += t.length; }
+    }
+    const policies = [];
+    for (const el of document.querySelectorAll(policySelector)) {
+        const t = text(el);
+        if (t.length > 1) policies.push(t);
+    }
+    for (const el of document.querySelectorAll('a, button, span')) {
+        if (el.children.length) continue;
+        const t = text(el);
+        if (t && policyKeywords.some(k => t.includes(k))) policies.push(t);
+    }
+    return {title: document.title || '', headings, controls, paragraphs, policies};
+}"""
+
+
+async def take_snapshot(page, max_controls: int = 200) -> dict:
+    """현재 페이지의 구조화 스냅샷(page.evaluate 1회)"""
+    return await page.evaluate(SNAPSHOT_JS, [_POLICY_SELECTOR, POLICY_KEYWORDS, max_controls])
+
+
+def render_summary(snapshot: dict, limit: int = 3000) -> str:
+    """스냅샷 → LLM용 DOM 요약 텍스트(제목/헤딩 → 링크·버튼 → 문단 순, limit자 상한)"""
+    pieces = []
+    if snapshot.get("title"):
+        pieces.append(f"# {snapshot['title']}")
+    pieces.extend(f"## {h}" for h in snapshot.get("headings") or [])
+    for control in snapshot.get("controls") or []:
+        if not control.get("text"):
+            continue
+        href = control.get("href") or ""
+        if len(href) > 120:
+            href = href[:120] + "..."
+        pieces.append(f"- {control['text']} {href}")
+    size = len("\n".join(pieces))
+    for paragraph in snapshot.get("paragraphs") or []:
+        pieces.append(paragraph)
+        size += len(paragraph) + 1
+        if size > 2500:
+            break
+    return "\n".join(pieces)[:limit]
+
+
+def policy_items(snapshot: dict) -> list[str]:
+    """스냅샷의 정책 후보 텍스트 정제(중복 제거, 200자 미만)"""
+    cleaned, seen = [], set()
+    for text in snapshot.get("policies") or []:
+        text = text.strip()
+        if text and text not in seen and len(text) < 200:
+            seen.add(text)
+            cleaned.append(text)
+    return cleaned
@@ -0,0 +1,160 @@
+# ReAct 결정용 관찰(observation) 생성: Playwright 접근성 트리 기반
+# 접근성 트리에서 상호작용 요소(링크/버튼/메뉴/탭 ...)만 골라 번호를 붙인 짧은 목록으로 만든다.
+#   [페이지] 제목
+#   [헤딩] 헤딩1 | 헤딩2
+#   [본문] 화면 텍스트 앞부분
+#   [1] link "API 목록"
+#   [2] button "정책 추가"
+# LLM은 {"by": "index", "value": 2}처럼 번호로 대상을 지정하고, 실행 시에는 get_by_role(role, name).nth(k)로
+# 정확히 그 요소를 찾는다(text= 부분 일치 클릭에 의존하지 않음).
+# 접근성 스냅샷을 쓸 수 없으면 DOM 스냅샷(utils.dom_snapshot)의 링크/버튼과 셀렉터로 대신한다.
+# 포털 화면은 헤더/사이드바/메뉴를 공유하므로, ObservationTracker로 요소 번호를 세션 내내 고정하고
+# 직전 관찰과의 차이(새 요소/유지 요소/사라진 요소)만 프롬프트와 방문 로그에 남긴다(render_diff).
+
+from utils.dom_snapshot import take_snapshot
+
+INTERACTIVE_ROLES = {
+    "link", "button", "menuitem", "menuitemcheckbox", "menuitemradio", "tab", "treeitem",
+    "checkbox", "radio", "switch", "combobox", "textbox", "searchbox", "option",
+}
+
+
+def _walk(node: dict, elements: list, headings: list, texts: list, seen: dict, max_items: int) -> None:
+    role = node.get("role") or ""
+    name = (node.get("name") or "").strip()
+    if role == "heading" and name and len(headings) < 15:
+        headings.append(name[:80])
+    elif role in ("text", "StaticText") and name and sum(len(t) for t in texts) < 400:
+        texts.append(name[:200])
+    elif role in INTERACTIVE_ROLES and name and len(elements) < max_items:
+        key = (role, name)
+        nth = seen.get(key, 0)
+        seen[key] = nth + 1
+        elements.append({"index": len(elements) + 1, "role": role, "name": name[:100], "nth": nth})
+    for child in node.get("children") or []:
+        _walk(child, elements, headings, texts, seen, max_items)
+
+
+def _header(title: str, headings: list, texts: list | None = None) -> str:
+    lines = [f"[페이지] {title}"] if title else []
+    if headings:
+        lines.append("[헤딩] " + " | ".join(headings))
+    if texts:
+        lines.append("[본문] " + " ".join(texts)[:400])
+    return "\n".join(lines)
+
+
+def _line(el: dict) -> str:
+    return f"[{el['index']}] {el['role']} \"{el['name']}\""
+
+
+def _render(header: str, elements: list) -> str:
+    lines = [header] if header else []
+    lines.extend(_line(el) for el in elements)
+    return "\n".join(lines)
+
+
+def _observation(header: str, elements: list, source: str, headings: list | None = None) -> dict:
+    return {"text": _render(header, elements), "header": header, "headings": headings or [],
+            "elements": elements, "source": source}
+
+
+async def build_observation(page, max_items: int = 60) -> dict:
+    """{"text": 번호 목록 텍스트, "header": 제목/헤딩/본문, "headings": [...],
+    "elements": [{index, role, name, nth | selector}], "source": a11y|dom}"""
+    elements, headings, texts = [], [], []
+    try:
+        tree = await page.accessibility.snapshot()
+    except Exception:
+        tree = None
+    if tree:
+        _walk(tree, elements, headings, texts, {}, max_items)
+        title = await page.title()
+        return _observation(_header(title, headings, texts), elements, "a11y", headings)
+    # 폴백: DOM 스냅샷의 보이는 링크/버튼
+    snapshot = await take_snapshot(page, max_controls=max_items)
+    for control in snapshot.get("controls") or []:
+        if not control.get("text") or not control.get("selector"):
+            continue
+        role = control.get("role") or ("link" if control.get("tag") == "a" else "button")
+        elements.append({"index": len(elements) + 1, "role": role, "name": control["text"],
+                         "selector": control["selector"]})
+    texts = [" ".join(snapshot.get("paragraphs") or [])[:400]]
+    headings = (snapshot.get("headings") or [])[:15]
+    return _observation(_header(snapshot.get("title") or "", headings, texts), elements, "dom", headings)
+
+
+def render_elements(observation: dict, elements: list) -> str:
+    """관찰의 헤더 + 주어진 요소들만(번호는 원래 번호 유지)"""
+    return _render(observation.get("header") or "", elements)
+
+
+def element_at(observation: dict | None, index) -> dict | None:
+    """관찰의 index번 요소(1부터). 잘못된 번호면 None"""
+    try:
+        index = int(index)
+    except (TypeError, ValueError):
+        return None
+    elements = (observation or {}).get("elements") or []
+    return next((el for el in elements if el.get("index") == index), None)
+
+
+def locator_for(page, element: dict):
+    """관찰 요소 → Playwright locator"""
+    if element.get("selector"):
+        return page.locator(element["selector"]).first
+    return page.get_by_role(element["role"], name=element["name"], exact=True).nth(element.get("nth", 0))
+
+
+class ObservationTracker:
+    """탐색 세션 하나의 관찰 이력: 요소 번호를 (role, name, 순번) 기준으로 고정하고 직전 관찰과 비교"""
+
+    def __init__(self):
+        self._numbers: dict[tuple, int] = {}
+        self._previous: set | None = None
+        self._header: str | None = None
+
+    def update(self, observation: dict) -> dict:
+        """관찰의 요소 번호를 세션 번호로 바꾸고 직전 관찰 대비 차이를 반환
+        {"first", "header_changed", "added": [요소], "kept": [요소], "removed": 사라진 요소 수}"""
+        elements = observation["elements"]
+        keys = []
+        for el in elements:
+            key = (el["role"], el["name"], el.get("nth", el.get("selector")))
+            el["index"] = self._numbers.setdefault(key, len(self._numbers) + 1)
+            keys.append(key)
+        observation["text"] = _render(observation.get("header") or "", elements)
+        previous = self._previous or set()
+        diff = {
+            "first": self._previous is None,
+            "header_changed": observation.get("header") != self._header,
+            "added": [el for el, key in zip(elements, keys) if key not in previous],
+            "kept": [el for el, key in zip(elements, keys) if key in previous],
+            "removed": len(previous - set(keys)),
+        }
+        self._previous, self._header = set(keys), observation.get("header")
+        return diff
+
+
+def render_diff(observation: dict, diff: dict | None, focus: list | None = None) -> str:
+    """직전 관찰 대비 텍스트: 새 요소 + (focus에 든) 유지 요소, 나머지 유지 요소는 개수만.
+    focus(예: 후보 순위 상위 요소)를 주면 그 안의 요소만 나열한다. 첫 관찰이면 전체 목록"""
+    if not diff or diff["first"]:
+        return render_elements(observation, focus if focus is not None else observation["elements"])
+    focused = None if focus is None else {el["index"] for el in focus}
+    added = [el for el in diff["added"] if focused is None or el["index"] in focused]
+    kept = [el for el in diff["kept"] if focused is not None and el["index"] in focused]
+    header = observation.get("header") or ""
+    lines = [header if diff["header_changed"] else "[페이지] 이전 관찰과 같음"]
+    if added:
+        lines.append("[새 요소]")
+        lines.extend(_line(el) for el in added)
+    if kept:
+        lines.append("[이전 화면에도 있던 요소]")
+        lines.extend(_line(el) for el in kept)
+    omitted = len(diff["kept"]) - len(kept)
+    if omitted:
+        lines.append(f"[생략] 이전 화면과 같은 요소 {omitted}개(번호 동일)")
+    if diff["removed"]:
+        lines.append(f"[사라진 요소] {diff['removed']}개")
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+# 페이지 준비 판정(readiness) 전략
+# 고정 sleep/networkidle 대신 "이 화면을 읽어도 되는가"를 알려주는 구체적인 신호를 기다린다.
+# - DOM 조건: 호스트별 준비 완료 셀렉터(READY_RULES[host]["ready"]) + 단계별 추가 셀렉터
+# - API 응답: 호스트별 데이터 API 경로(READY_RULES[host]["api"])의 응답 도착
+# - URL 변화: 로그인 제출처럼 다른 화면으로 넘어가야 끝나는 단계
+# 신호가 하나도 오지 않으면 networkidle을 짧은 상한(fallback_ms)까지만 기다리고 진행한다
+# (폴링하는 SPA는 networkidle에 도달하지 않으므로 긴 networkidle 대기는 하지 않음).
+# API 응답 대기는 이동/클릭 전에 걸어야 한다(arm → action → ready(armed=...), 또는 after로 한 번에).
+# action이 끝난 뒤에 걸면 그 사이에 이미 도착한 데이터 응답을 놓쳐 타임아웃까지 기다리게 된다.
+# 단계(step)별 대기 시간과 충족 신호를 기록해 /metrics와 에이전트 결과(waits)로 노출한다.
+
+import asyncio
+import time
+from collections import Counter, defaultdict, deque
+from urllib.parse import urlparse
+from utils.concurrency import _round, first_success, percentile
+from utils.deadline import DeadlineExceeded, budget_ms
+
+
+class Readiness:
+    def __init__(self, rules: dict[str, dict] | None = None, timeout_ms: int = 8000, fallback_ms: int = 1500,
+                 window: int = 200):
+        self.rules = rules or {}
+        self.timeout_ms = timeout_ms
+        self.fallback_ms = fallback_ms
+        self._waits_ms: dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._via: dict[str, Counter] = defaultdict(Counter)
+
+    def _rule(self, url: str) -> dict:
+        host = urlparse(url or "").hostname or ""
+        return self.rules.get(host) or self.rules.get("default") or {}
+
+    def arm(self, page, deadline: float | None = None, url: str | None = None) -> asyncio.Task | None:
+        """이동/클릭 전에 데이터 API 응답 대기를 걸어 둔 task(호스트 규칙에 api가 없으면 None)
+        url: 이동할 URL(호스트 규칙 선택용). 없으면 현재 페이지 URL
+        """
+        api = self._rule(url or page.url).get("api")
+        if not api:
+            return None
+        return asyncio.ensure_future(page.wait_for_response(lambda r: api in r.url and r.ok,
+                                                            timeout=budget_ms(deadline, self.timeout_ms)))
+
+    @staticmethod
+    async def disarm(armed: asyncio.Task | None) -> None:
+        """쓰지 않은 응답 대기 정리(취소하고 결과/예외 회수)"""
+        if armed is not None:
+            armed.cancel()
+            await asyncio.gather(armed, return_exceptions=True)
+
+    async def after(self, page, action, step: str, deadline: float | None = None, selector: str | None = None,
+                    timings: list | None = None, url: str | None = None) -> tuple:
+        """응답 대기를 건 뒤 action(goto/click 코루틴)을 실행하고 화면 준비 대기 → (action 결과, 충족 신호)
+        action이 False를 반환하면(클릭 대상 없음 등 화면 변화 없음) 준비 대기는 생략한다.
+        """
+        try:
+            armed = self.arm(page, deadline, url)
+            if armed is not None:
+                await asyncio.sleep(0)  # action 시작 전에 대기 task가 응답 리스너를 등록하도록 한 번 양보
+        except BaseException:
+            action.close()
+            raise
+        try:
+            result = await action
+        except BaseException:
+            await self.disarm(armed)
+            raise
+        if result is False:
+            await self.disarm(armed)
+            return result, "skipped"
+        return result, await self.ready(page, step, deadline, selector, timings, armed=armed)
+
+    async def ready(self, page, step: str, deadline: float | None = None, selector: str | None = None,
+                    timings: list | None = None, armed: asyncio.Task | None = None) -> str:
+        """페이지가 읽을 수 있는 상태가 될 때까지 대기하고 충족된 신호(selector|response|fallback) 반환
+        selector: 이 단계에서 추가로 준비 완료로 인정할 DOM 조건(호스트 규칙과 OR)
+        armed: action 전에 arm()으로 걸어 둔 응답 대기(없으면 지금 건다)
+        """
+        t0 = time.perf_counter()
+        via = "deadline"
+        try:
+            via = await self._wait_signals(page, deadline, selector, armed)
+        finally:
+            await self.disarm(armed)
+            self._record(step, t0, via, timings)
+        return via
+
+    async def url_change(self, page, from_url: str, step: str, deadline: float | None = None,
+                         timings: list | None = None, accept=None, armed: asyncio.Task | None = None) -> bool:
+        """from_url에서 다른 URL로 넘어갈 때까지(accept(url)가 주어지면 그 조건까지) 대기 후 새 화면 준비 대기
+        넘어가지 않으면 False(대기는 timeout_ms 상한). armed: 클릭 전에 arm()으로 걸어 둔 응답 대기
+        """
+        t0 = time.perf_counter()
+        via = "timeout"
+        try:
+            try:
+                await page.wait_for_url(lambda url: url != from_url and (accept is None or accept(url)),
+                                        timeout=budget_ms(deadline, self.timeout_ms))
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                return False
+            via = "url+" + await self._wait_signals(page, deadline, None, armed)
+            return True
+        finally:
+            await self.disarm(armed)
+            self._record(step, t0, via, timings)
+
+    async def _wait_signals(self, page, deadline: float | None, selector: str | None,
+                            armed: asyncio.Task | None = None) -> str:
+        try:
+            await page.wait_for_load_state("domcontentloaded", timeout=budget_ms(deadline, self.timeout_ms))
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            pass
+        rule = self._rule(page.url)
+        ready_selector = ", ".join(s for s in (selector, rule.get("ready")) if s)
+        waiters = {}
+        if ready_selector:
+            waiters["selector"] = page.wait_for_selector(ready_selector, state="visible",
+                                                         timeout=budget_ms(deadline, self.timeout_ms))
+        if armed is not None:
+            waiters["response"] = armed
+        elif rule.get("api"):
+            api = rule["api"]
+            waiters["response"] = page.wait_for_response(lambda r: api in r.url and r.ok,
+                                                         timeout=budget_ms(deadline, self.timeout_ms))
+        if waiters:
+            winner = await first_success(waiters)
+            if winner:
+                return winner
+        # 신호 없음: networkidle을 짧게만 기다리고 현재 DOM으로 진행
+        try:
+            await page.wait_for_load_state("networkidle", timeout=budget_ms(deadline, self.fallback_ms))
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            pass
+        return "fallback"
+
+    def _record(self, step: str, t0: float, via: str, timings: list | None) -> None:
+        ms = round((time.perf_counter() - t0) * 1000, 1)
+        self._waits_ms[step].append(ms)
+        self._via[step][via] += 1
+        if timings is not None:
+            timings.append({"step": step, "ms": ms, "via": via})
+
+    def stats(self) -> dict:
+        """단계별 대기 시간(p50/p95)과 충족 신호 분포"""
+        return {
+            step: {
+                "count": len(waits),
+                "wait_ms_p50": _round(percentile(waits, 50)),
+                "wait_ms_p95": _round(percentile(waits, 95)),
+                "via": dict(self._via[step]),
+            }
+            for step, waits in self._waits_ms.items()
+        }
+
+
+def total_wait_ms(timings: list | None) -> float:
+    return round(sum(t["ms"] for t in timings or []), 1)
+
+
+_READINESS: Readiness | None = None
+
+
+def get_readiness() -> Readiness:
+    global _READINESS
+    if _READINESS is None:
+        from utils.config import settings
+        _READINESS = Readiness(settings.READY_RULES, timeout_ms=settings.READY_TIMEOUT_MS,
+                               fallback_ms=settings.READY_FALLBACK_MS)
+    return _READINESS
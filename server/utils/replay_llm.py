@@ -0,0 +1,168 @@
+# LLM 기록/재생(record/replay) 백엔드
+# - record: 실제 LLM 호출 결과(prompt → completion, 소요시간)를 cassette(JSONL)에 기록
+# - replay: 네트워크 없이 cassette에서 응답을 찾아 반환(지연시간 시뮬레이션 포함)
+# 오프라인 환경에서 그래프/라우터/스트리머의 자체 오버헤드를 반복 가능하게 측정하기 위한 용도
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+
+def _normalize_prompt(prompt: Any) -> list[dict]:
+    """ainvoke 입력(문자열/dict 메시지/BaseMessage)을 비교 가능한 형태로 정규화"""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    normalized = []
+    for m in prompt or []:
+        if isinstance(m, BaseMessage):
+            normalized.append({"role": m.type, "content": m.content})
+        elif isinstance(m, dict):
+            normalized.append({"role": m.get("role", ""), "content": m.get("content", "")})
+        elif isinstance(m, (tuple, list)) and len(m) == 2:
+            normalized.append({"role": m[0], "content": m[1]})
+        else:
+            normalized.append({"role": "", "content": str(m)})
+    return normalized
+
+
+def prompt_key(prompt: Any) -> str:
+    payload = json.dumps(_normalize_prompt(prompt), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """prompt 해시 → 기록(completion, latency_s) 저장소. JSONL 한 줄당 한 건."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.records: dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rec = json.loads(line)
+                        self.records[rec["key"]] = rec
+                    except Exception:
+                        continue
+
+    def get(self, key: str) -> dict | None:
+        rec = self.records.get(key)
+        if rec is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return rec
+
+    def add(self, key: str, node: str, prompt: Any, completion: str, latency_s: float) -> None:
+        rec = {
+            "key": key,
+            "node": node,
+            "prompt": _normalize_prompt(prompt),
+            "completion": completion,
+            "latency_s": round(latency_s, 4),
+        }
+        with self._lock:
+            self.records[key] = rec
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+# 경로별 cassette 공유(여러 노드가 같은 파일에 기록)
+_CASSETTES: dict[str, Cassette] = {}
+
+
+def get_cassette(path: str) -> Cassette:
+    key = str(Path(path).resolve())
+    if key not in _CASSETTES:
+        _CASSETTES[key] = Cassette(path)
+    return _CASSETTES[key]
+
+
+class RecordReplayLLM:
+    """get_llm_azopai()/get_llm_for()가 돌려주는 LLM 대신 사용 가능한 ainvoke/invoke 호환 래퍼
+
+    Args:
+        cassette: 기록 저장소
+        mode: "record"(inner 호출 후 기록) 또는 "replay"(기록만 사용)
+        inner: record 모드에서 실제로 호출할 LLM
+        node: 기록 메타용 노드 이름
+        latency_ms: 재생 시 고정 지연(ms). None이면 기록된 지연 × latency_scale
+        latency_scale: 기록된 지연에 곱할 배율
+        per_char_ms: 응답 길이(문자)당 추가 지연(ms)
+        jitter_ms: 지연 흔들림 폭(ms). prompt 해시로 시드하여 재현 가능
+        miss_completion: 재생 시 기록이 없을 때 반환할 응답
+    """
+
+    def __init__(self, cassette: Cassette, mode: str = "replay", inner=None, node: str = "",
+                 latency_ms: float | None = None, latency_scale: float = 1.0,
+                 per_char_ms: float = 0.0, jitter_ms: float = 0.0, miss_completion: str = "{}"):
+        if mode == "record" and inner is None:
+            raise ValueError("record 모드에는 실제 LLM(inner)이 필요합니다")
+        self.cassette = cassette
+        self.mode = mode
+        self.inner = inner
+        self.node = node
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self.per_char_ms = per_char_ms
+        self.jitter_ms = jitter_ms
+        self.miss_completion = miss_completion
+
+    def _simulated_latency(self, key: str, rec: dict | None, completion: str) -> float:
+        if self.latency_ms is not None:
+            base = self.latency_ms / 1000.0
+        else:
+            base = (rec or {}).get("latency_s", 0.0) * self.latency_scale
+        base += len(completion) * self.per_char_ms / 1000.0
+        if self.jitter_ms:
+            rnd = random.Random(key)
+            base += rnd.uniform(-self.jitter_ms, self.jitter_ms) / 1000.0
+        return max(0.0, base)
+
+    def _replay(self, prompt: Any) -> tuple[str, float]:
+        key = prompt_key(prompt)
+        rec = self.cassette.get(key)
+        if rec is None:
+            print(f"[replay_llm] cassette miss (node={self.node}, key={key[:12]})")
+            completion = self.miss_completion
+        else:
+            completion = rec["completion"]
+        return completion, self._simulated_latency(key, rec, completion)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> AIMessage:
+        if self.mode == "record":
+            start = time.perf_counter()
+            resp = await self.inner.ainvoke(prompt, *args, **kwargs)
+            completion = getattr(resp, "content", str(resp))
+            self.cassette.add(prompt_key(prompt), self.node, prompt, completion, time.perf_counter() - start)
+            return AIMessage(content=completion)
+        completion, delay = self._replay(prompt)
+        if delay:
+            await asyncio.sleep(delay)
+        return AIMessage(content=completion)
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> AIMessage:
+        if self.mode == "record":
+            start = time.perf_counter()
+            resp = self.inner.invoke(prompt, *args, **kwargs)
+            completion = getattr(resp, "content", str(resp))
+            self.cassette.add(prompt_key(prompt), self.node, prompt, completion, time.perf_counter() - start)
+            return AIMessage(content=completion)
+        completion, delay = self._replay(prompt)
+        if delay:
+            time.sleep(delay)
+        return AIMessage(content=completion)
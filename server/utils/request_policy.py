@@ -0,0 +1,83 @@
+# 에이전트 브라우저 컨텍스트의 요청 차단 정책(Playwright route)
+# 에이전트는 DOM 텍스트만 읽으므로 이미지/폰트/미디어와 서드파티 트래커는 내려받지 않는다.
+# - block_types: 차단할 resource type(image, media, font ...). CSS는 is_visible 판정에 필요하므로 기본 허용
+# - block_domains: 트래커/분석 도메인(요청 호스트가 이 도메인이거나 하위 도메인이면 차단)
+# - allowlist: 페이지 호스트별 예외. 항목은 resource type 또는 URL 부분 문자열
+# 차단한 요청 수와 절감 바이트(resource type별 평균 크기 추정치)를 집계한다.
+
+from collections import Counter
+from urllib.parse import urlparse
+
+# 차단한 요청의 크기는 알 수 없으므로 resource type별 대략적인 평균 크기로 절감량을 추정
+_EST_BYTES = {"image": 40_000, "media": 500_000, "font": 60_000, "stylesheet": 30_000, "script": 50_000}
+_EST_DEFAULT = 10_000
+
+
+def _host(url: str) -> str:
+    return urlparse(url or "").hostname or ""
+
+
+class RequestPolicy:
+    def __init__(self, block_types: list[str] | None = None, block_domains: list[str] | None = None,
+                 allowlist: dict[str, list[str]] | None = None, enabled: bool = True):
+        self.enabled = enabled
+        self.block_types = set(block_types or [])
+        self.block_domains = tuple(d.lower().lstrip(".") for d in block_domains or [])
+        self.allowlist = allowlist or {}
+        self.requests = 0
+        self.blocked = Counter()   # 차단 사유별 요청 수(type:image, tracker:도메인 ...)
+        self.bytes_saved_est = 0
+
+    def _tracker(self, host: str) -> str | None:
+        return next((d for d in self.block_domains if host == d or host.endswith("." + d)), None)
+
+    def _allowed(self, page_url: str, url: str, resource_type: str) -> bool:
+        allow = self.allowlist.get(_host(page_url)) or []
+        return any(item == resource_type or item in url for item in allow)
+
+    def decide(self, page_url: str, url: str, resource_type: str) -> str | None:
+        """차단 사유 반환. 통과면 None"""
+        if self._allowed(page_url, url, resource_type):
+            return None
+        tracker = self._tracker(_host(url))
+        if tracker:
+            return f"tracker:{tracker}"
+        if resource_type in self.block_types:
+            return f"type:{resource_type}"
+        return None
+
+    async def attach(self, context) -> None:
+        """컨텍스트의 모든 요청에 정책 적용"""
+        if not self.enabled or not (self.block_types or self.block_domains):
+            return
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route) -> None:
+        request = route.request
+        self.requests += 1
+        try:
+            page_url = request.frame.url
+        except Exception:
+            page_url = request.url
+        reason = self.decide(page_url, request.url, request.resource_type)
+        try:
+            if reason is None:
+                await route.continue_()
+                return
+            self.blocked[reason] += 1
+            self.bytes_saved_est += _EST_BYTES.get(request.resource_type, _EST_DEFAULT)
+            await route.abort("blockedbyclient")
+        except Exception:
+            # 컨텍스트가 이미 닫힌 경우 등
+            pass
+
+    def stats(self) -> dict:
+        blocked = sum(self.blocked.values())
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "blocked": blocked,
+            "blocked_ratio": round(blocked / self.requests, 3) if self.requests else None,
+            "bytes_saved_est": self.bytes_saved_est,
+            "by_reason": dict(self.blocked.most_common(20)),
+        }
@@ -1,267 +1,588 @@
 import asyncio
 import json
 from pathlib import Path
-from playwright.async_api import async_playwright
+from utils.browser_pool import get_browser_pool
 import traceback
 from datetime import datetime
-from bs4 import BeautifulSoup
 from retrieval.vector_db import search_texts
+from retrieval.action_ranker import NAVIGATION_ROLES
 from utils.prompts import build_final_answer_messages
-from utils.config import get_llm_azopai
+from utils.config import get_llm_for, settings
+from utils.deadline import DeadlineExceeded, budget_ms, expired, shift, with_budget
+from utils.readiness import get_readiness
+from utils.click_resolver import get_click_resolver
+from utils.dom_snapshot import policy_items, render_summary, take_snapshot
+from utils.observation import ObservationTracker, build_observation, element_at, locator_for, render_diff
 import re
 from urllib.parse import urljoin, urlparse
 
+# 시간 예산 소진 시 안내(부분 답변)
+SKIP_MSG = "⏱️ 응답 시간 제한으로 콘솔 탐색을 생략했습니다. 위 문서 기반 답변을 참고해주세요"
+PARTIAL_NOTE = "⏱️ 응답 시간 제한으로 탐색을 마치지 못해 지금까지 확인한 화면 경로만 안내합니다."
+
 class InteractiveAgent:
-    def __init__(self, llm=None):
-        self.llm = llm or get_llm_azopai()
+    def __init__(self, llm=None, action_llm=None, site_map=None, ranker=None, memory=None, browser_limiter=None):
+        # 최종 답변은 large 티어, 스텝별 액션 JSON은 fast 티어
+        self.llm = llm or get_llm_for("final_answer")
+        self.action_llm = action_llm or get_llm_for("next_action")
         self.role = "interactive_agent"
         self.base_url = "https://console.skapim.com"
         self.max_steps = 5  # 최대 탐색 단계
+        self.site_map = site_map  # 크롤러가 구축한 포털 사이트맵(retrieval.site_map)
+        self.ranker = ranker  # 클릭 후보 사전 순위(retrieval.action_ranker)
+        self.memory = memory  # 성공한 탐색 경로(retrieval.nav_memory)
+        self.browser_limiter = browser_limiter  # 새 세션을 열 때만 점유(인계받은 세션은 이미 슬롯 보유)
         
-    async def run(self, state: dict = None, user_question: str = "", target_url: str = None) -> dict:
+    async def run(self, state: dict = None, user_question: str = "", target_url: str = None,
+                  session_owner: str | None = None) -> dict:
         try:
             print(f"[interactive_agent] 시작: 질문='{user_question}', URL='{target_url}'")
             if state and "navigation_result" in state:
                 target_url = state["navigation_result"].get("target_url", target_url)
             if not target_url:
                 target_url = f"{self.base_url}/gateway"
+            # 노드 예산: 탐색(ReAct)은 최종 답변 몫을 남기고 explore_deadline까지만
+            deadline = (state or {}).get("deadline")
+            explore_deadline = shift(deadline, settings.INTERACTIVE_ANSWER_RESERVE_S)
+            partial = False
+            waits = []  # 단계별 페이지 준비 대기 시간
+            pool = get_browser_pool()
+            handle = (state or {}).get("browser_session")
+            if expired(explore_deadline):
+                print("[interactive_agent] 시간 예산 부족: 콘솔 탐색 생략")
+                await pool.release(handle)
+                if state:
+                    state.setdefault("messages", []).append({"role": self.role, "content": SKIP_MSG})
+                    return {**state, "response": SKIP_MSG}
+                return {"response": SKIP_MSG}
 
-            async with async_playwright() as p:
-                # Navigation에서 저장한 세션 상태 파일을 사용
-                browser = await p.chromium.launch(headless=True)
-                context = None
-                if state and state.get("navigation_result"):
-                    storage_state = state["navigation_result"].get("auth_state_path")
-                    if storage_state:
-                        storage_state_path = Path(storage_state)
-                        if not storage_state_path.is_absolute():
-                            server_root = Path(__file__).resolve().parents[2]
-                            storage_state_path = (server_root / storage_state_path).resolve()
-                        if storage_state_path.exists():
-                            context = await browser.new_context(storage_state=str(storage_state_path))
-                        else:
-                            context = await browser.new_context()
-                    else:
-                        context = await browser.new_context()
-                else:
-                    context = await browser.new_context()
-                page = await context.new_page()
+            # 사이트맵: 스냅샷이 충분히 최신이고 질문과 잘 맞으면 브라우저 탐색 없이 답변,
+            # 그 정도는 아니어도 가까운 페이지가 있으면 그 화면에서 탐색 시작
+            hit = await asyncio.to_thread(self._site_map_hit, user_question, target_url)
+            if hit and hit["similarity"] >= settings.SITE_MAP_ANSWER_SIMILARITY \
+                    and self.site_map.age_s(hit["page"]) <= settings.SITE_MAP_MAX_AGE_S:
+                await pool.release(handle)
+                return await self._answer_from_snapshot(state, user_question, hit, deadline)
+            if hit and hit["similarity"] >= settings.SITE_MAP_JUMP_SIMILARITY:
+                print(f"[interactive_agent] 사이트맵 페이지로 바로 이동: {hit['page']['url']} ({hit['similarity']:.2f})")
+                target_url = hit["page"]["url"]
+
+            # Navigation이 로그인해 둔 페이지를 그대로 인계받음(브라우저 재기동/재로딩 없음)
+            session = pool.session(handle)
+            # 인계가 끊긴 경우(재개 실행/회수): Navigation에서 저장한 세션 상태 파일로 새 컨텍스트
+            storage_state = None
+            if session is None and state and state.get("navigation_result"):
+                auth_state_path = state["navigation_result"].get("auth_state_path")
+                if auth_state_path:
+                    storage_state_path = Path(auth_state_path)
+                    if not storage_state_path.is_absolute():
+                        server_root = Path(__file__).resolve().parents[2]
+                        storage_state_path = (server_root / storage_state_path).resolve()
+                    if storage_state_path.exists():
+                        storage_state = str(storage_state_path)
+
+            if session is not None:
+                print(f"[interactive_agent] Navigation 페이지 인계: {session.page.url}")
+            else:
+                slot = self.browser_limiter.slot(deadline) if self.browser_limiter else None
+                session = await pool.open_session(owner=session_owner, slot=slot, storage_state=storage_state)
+            page = session.page
+            # 세션은 탐색이 끝나거나 실패하면 반납
+            try:
+                # 내비게이션 메모리: 비슷한 질문에서 answer에 도달했던 화면으로 바로 이동(안 되면 클릭 경로 재생),
+                # 같은 화면으로 검증되면 탐색 없이 답변
+                # (질문 인코딩/파일 저장은 이벤트 루프 밖에서)
+                remembered = await asyncio.to_thread(self._memory_hit, user_question, target_url)
+                if remembered is not None:
+                    verified_obs = await self._replay_memory(page, remembered["entry"], explore_deadline, waits)
+                    await asyncio.to_thread(self.memory.mark, remembered["entry"], verified_obs is not None)
+                    if verified_obs is not None:
+                        print(f"[interactive_agent] 저장된 경로 재사용: {page.url} ({remembered['similarity']:.2f})")
+                        visit_trace = [{
+                            "step": 0,
+                            "url": page.url,
+                            "path": urlparse(page.url).path,
+                            "observation": render_diff(verified_obs, None)[:800],
+                            "action_result": f"nav_memory:{remembered['similarity']:.2f}",
+                        }]
+                        return await self._answer_on_page(state, user_question, page, visit_trace, deadline, waits,
+                                                          source="nav_memory")
+                    print("[interactive_agent] 저장된 경로 검증 실패: 탐색으로 진행")
 
-                # 시작 URL 이동
-                await page.goto(target_url)
-                await page.wait_for_load_state('networkidle')
+                # 시작 URL 이동(인계받은 페이지가 이미 그 URL이면 생략)
+                if page.url != target_url:
+                    await self._act(page, page.goto(target_url, wait_until="domcontentloaded", timeout=budget_ms(explore_deadline, 30000)),
+                                    explore_deadline, "interactive.start", waits, url=target_url)
 
                 visit_trace = []  # 각 스텝별 관찰/행동 로그
                 current_url = page.url
+                start_url = current_url
+                replay_path = []  # 메모리에 남길 재생 경로(실제로 수행한 이동/클릭)
 
-                # 최초 접속 직후 DOM 관찰을 강제 기록
-                initial_dom = await self._summarize_dom(page)
+                # 관찰 이력: 요소 번호 고정 + 직전 관찰 대비 차이만 프롬프트/방문 로그에 사용
+                tracker = ObservationTracker()
+                # 최초 접속 직후 관찰을 강제 기록(첫 관찰은 전체 목록)
+                initial_obs = await self._observe(page, tracker)
                 visit_trace.append({
                     "step": 0,
                     "url": current_url,
                     "path": urlparse(current_url).path,
-                    "observation": initial_dom[:800]
+                    "observation": self._trace_observation(initial_obs)
                 })
 
-                # ReAct 루프: DOM 관찰 → 결정 → 실행
-                for step in range(self.max_steps):
-                    print(f"[interactive_agent] ReAct step {step+1}/{self.max_steps}")
-
-                    # Observation 1: DOM 요약
-                    dom_text = await self._summarize_dom(page)
-                    # Observation 2: RAG 스니펫
-                    rag_snippets = search_texts(f"{user_question}\n{current_url}", k=5)
-
-                    # Think: 다음 행동 결정 (첫 스텝에서는 answer 금지 권고)
-                    decision = await self._decide_next_action(user_question, current_url, dom_text, rag_snippets, step)
-                    print(f"[interactive_agent] 결정: {decision}")
-
-                    action = (decision.get("action") or "stop").lower()
-                    target = (decision.get("target") or {})
-
-                    # 방문 로그에 관찰/결정 기록
-                    visit_trace.append({
-                        "step": step + 1,
-                        "url": current_url,
-                        "path": urlparse(current_url).path,
-                        "decision": decision,
-                        "observation": dom_text[:800]
-                    })
-                    # 진행중 메시지(프론트에서 progress로 표시)
-                    if state is not None:
-                        state.setdefault("messages", []).append({
-                            "role": self.role,
-                            "content": f"해당 페이지에서 탐색 중... (step {step+1}) URL: {current_url}",
-                            "chunk_type": "progress"
-                        })
-
-                    if action == "goto":
-                        url = target.get("value") or target.get("url") or ""
-                        # by='text'인 goto는 링크/버튼 클릭으로 처리
-                        if (target.get("by") or "").lower() == "text":
-                            acted = await self._click_by(page, {"by": "text", "value": url})
-                            await page.wait_for_load_state('networkidle')
-                            current_url = page.url if acted else current_url
-                            post_dom = await self._summarize_dom(page)
+                # ReAct 루프: 관찰(번호 붙은 요소 목록) → 결정 → 실행
+                # 행동 직후 관찰(post)은 다음 스텝의 관찰로 재사용(같은 화면을 두 번 추출하지 않음)
+                post_obs = initial_obs
+                auto_clicked = set()  # 자동 클릭한 (role, name): 같은 메뉴를 반복해서 누르지 않음
+                explored_urls = set()  # 병렬 탭 탐색을 이미 한 화면
+                try:
+                    for step in range(self.max_steps):
+                        if expired(explore_deadline):
+                            raise DeadlineExceeded("explore budget exhausted")
+                        print(f"[interactive_agent] ReAct step {step+1}/{self.max_steps}")
+
+                        # Observation 1: 접근성 트리 기반 요소 목록(클릭은 번호로 지정)
+                        fresh = post_obs is None
+                        obs = await self._observe(page, tracker) if fresh else post_obs
+                        post_obs = None
+                        focus = None
+                        # Observation 2: RAG 스니펫
+                        rag_snippets = await asyncio.to_thread(search_texts, f"{user_question}\n{current_url}", k=5)
+
+                        # 클릭 후보 사전 순위: 상위 후보만 LLM에, 1위가 압도적이면 LLM 없이 클릭
+                        decision = None
+                        if self.ranker is not None:
+                            ranked = await asyncio.to_thread(self.ranker.rank, user_question, rag_snippets, obs["elements"])
+                            if ranked:
+                                focus = ranked[:self.ranker.top_k]
+                            top = self.ranker.dominant(ranked, exclude=auto_clicked)
+                            if top is not None:
+                                auto_clicked.add((top["role"], top["name"]))
+                                decision = {"action": "click", "target": {"by": "index", "value": top["index"]},
+                                            "reason": f"후보 순위 1위 자동 선택(score={top['score']})",
+                                            "confidence": top["score"], "auto": True}
+
+                        # 1위가 압도적이지 않으면 상위 후보 링크들을 병렬 탭으로 열어 보고 가장 잘 맞는 화면에서 계속
+                        explored = None
+                        if decision is None and self.ranker is not None and current_url not in explored_urls:
+                            explored_urls.add(current_url)
+                            explored = await self._explore_parallel(session.context, page, obs, ranked, user_question,
+                                                                    auto_clicked, explore_deadline, waits)
+                            if explored is not None:
+                                element = explored["element"]
+                                decision = {"action": "explore", "target": {"by": "index", "value": element["index"]},
+                                            "reason": f"병렬 탭 {explored['tried']}개 중 질문과 가장 가까운 화면(score={explored['score']})",
+                                            "confidence": explored["score"], "auto": True}
+
+                        # Think: 다음 행동 결정 (첫 스텝에서는 answer 금지 권고)
+                        # 프롬프트에는 직전 관찰 대비 바뀐 요소(+순위 상위 요소)만
+                        dom_text = render_diff(obs, obs.get("diff"), focus)
+                        if decision is None:
+                            decision = await self._decide_next_action(user_question, current_url, dom_text, rag_snippets, step, explore_deadline)
+                        print(f"[interactive_agent] 결정: {decision}")
+
+                        action = (decision.get("action") or "stop").lower()
+                        target = (decision.get("target") or {})
+
+                        # 방문 로그에 결정 기록(관찰은 직전 .post 항목에 이미 기록된 경우 생략)
+                        entry = {
+                            "step": step + 1,
+                            "url": current_url,
+                            "path": urlparse(current_url).path,
+                            "decision": decision,
+                        }
+                        if fresh:
+                            entry["observation"] = self._trace_observation(obs)
+                        visit_trace.append(entry)
+                        # 진행중 메시지(프론트에서 progress로 표시)
+                        if state is not None:
+                            state.setdefault("messages", []).append({
+                                "role": self.role,
+                                "content": f"해당 페이지에서 탐색 중... (step {step+1}) URL: {current_url}",
+                                "chunk_type": "progress"
+                            })
+
+                        if action == "explore" and explored is not None:
+                            # 가장 잘 맞는 탭을 작업 페이지로 삼고 기존 페이지는 닫음(탭에서 만든 관찰 재사용)
+                            replay_path.append(self._replay_step(target, obs))
+                            previous, page = page, explored["tab"]
+                            session.page = page
+                            await previous.close()
+                            current_url = page.url
+                            post_obs = explored["observation"]
+                            post_obs["diff"] = tracker.update(post_obs)
                             visit_trace.append({
                                 "step": f"{step+1}.post",
                                 "url": current_url,
                                 "path": urlparse(current_url).path,
-                                "observation": post_dom[:800],
-                                "action_result": f"goto-as-click:{url}"
+                                "observation": self._trace_observation(post_obs),
+                                "action_result": f"explored:{self._describe_target(target, obs)}"
                             })
                             continue
-                        if not url:
-                            break
-                        # 비정상 URL은 클릭 폴백
-                        if url.startswith("javascript:") or url.startswith("#"):
-                            acted = await self._click_by(page, {"by": target.get("by") or "href", "value": url})
-                            await page.wait_for_load_state('networkidle')
-                            current_url = page.url if acted else current_url
+
+                        if action == "goto":
+                            url = target.get("value") or target.get("url") or ""
+                            # by='text'/'index'인 goto는 링크/버튼 클릭으로 처리
+                            goto_by = (target.get("by") or "").lower()
+                            if goto_by in ("text", "index"):
+                                acted = await self._act(page, self._click_by(page, {"by": goto_by, "value": url}, explore_deadline, obs),
+                                                        explore_deadline, "interactive.click", waits)
+                                if acted:
+                                    replay_path.append(self._replay_step({"by": goto_by, "value": url}, obs))
+                                current_url = page.url if acted else current_url
+                                post_obs = await self._observe(page, tracker)
+                                visit_trace.append({
+                                    "step": f"{step+1}.post",
+                                    "url": current_url,
+                                    "path": urlparse(current_url).path,
+                                    "observation": self._trace_observation(post_obs),
+                                    "action_result": f"goto-as-click:{url}"
+                                })
+                                continue
+                            if not url:
+                                break
+                            # 비정상 URL은 클릭 폴백
+                            if url.startswith("javascript:") or url.startswith("#"):
+                                acted = await self._act(page, self._click_by(page, {"by": target.get("by") or "href", "value": url}, explore_deadline, obs),
+                                                        explore_deadline, "interactive.click", waits)
+                                if acted:
+                                    replay_path.append(self._replay_step({"by": target.get("by") or "href", "value": url}, obs))
+                                current_url = page.url if acted else current_url
+                                # 이동 후 즉시 DOM 재관찰 기록
+                                post_obs = await self._observe(page, tracker)
+                                visit_trace.append({
+                                    "step": f"{step+1}.post",
+                                    "url": current_url,
+                                    "path": urlparse(current_url).path,
+                                    "observation": self._trace_observation(post_obs),
+                                    "action_result": "click-fallback"
+                                })
+                                continue
+                            # 상대경로 → 절대 URL 보정
+                            if not re.match(r'^https?://', url):
+                                url = urljoin(current_url or self.base_url, url)
+                            await self._act(page, page.goto(url, wait_until="domcontentloaded", timeout=budget_ms(explore_deadline, 30000)),
+                                            explore_deadline, "interactive.goto", waits, url=url)
+                            replay_path.append({"goto": url})
+                            current_url = page.url
                             # 이동 후 즉시 DOM 재관찰 기록
-                            post_dom = await self._summarize_dom(page)
+                            post_obs = await self._observe(page, tracker)
                             visit_trace.append({
                                 "step": f"{step+1}.post",
                                 "url": current_url,
                                 "path": urlparse(current_url).path,
-                                "observation": post_dom[:800],
-                                "action_result": "click-fallback"
+                                "observation": self._trace_observation(post_obs)
                             })
                             continue
-                        # 상대경로 → 절대 URL 보정
-                        if not re.match(r'^https?://', url):
-                            url = urljoin(current_url or self.base_url, url)
-                        await page.goto(url)
-                        await page.wait_for_load_state('networkidle')
-                        current_url = page.url
-                        # 이동 후 즉시 DOM 재관찰 기록
-                        post_dom = await self._summarize_dom(page)
-                        visit_trace.append({
-                            "step": f"{step+1}.post",
-                            "url": current_url,
-                            "path": urlparse(current_url).path,
-                            "observation": post_dom[:800]
-                        })
-                        continue
-
-                    if action == "click":
-                        # 로그인 완료 상태면 'Login' 클릭 회피
-                        try:
-                            if state and state.get("navigation_result", {}).get("login_completed") and (target.get("by") or "").lower() == "text" and (target.get("value") or "").strip().lower() == "login":
-                                print("[interactive_agent] 로그인 완료 상태: 'Login' 클릭 무시")
-                                continue
-                        except Exception:
-                            pass
-                        acted = await self._click_by(page, target)
-                        await page.wait_for_load_state('networkidle')
-                        current_url = page.url if acted else current_url
-                        # 클릭 후 즉시 DOM 재관찰 기록
-                        post_dom = await self._summarize_dom(page)
-                        visit_trace.append({
-                            "step": f"{step+1}.post",
-                            "url": current_url,
-                            "path": urlparse(current_url).path,
-                            "observation": post_dom[:800],
-                            "action_result": f"clicked:{target}"
-                        })
-                        continue
-
-                    if action == "answer":
-                        # 최종 답변 생성: 반드시 방문 경로/링크/클릭 요소 포함
-                        trace_block = self._format_trace_block(visit_trace)
-                        final_dom = await self._summarize_dom(page)
-                        # 정책 페이지 감지 시 정책 항목을 DOM에서 추가 추출
-                        policy_items = await self._extract_policies(page)
-                        rag_snips = search_texts(f"{user_question}\n{current_url}", k=5)
-                        if policy_items:
-                            final_dom = f"[정책 항목]\n- " + "\n- ".join(policy_items[:20]) + "\n\n" + final_dom
-                        messages = self._build_answer_with_trace(user_question, final_dom, rag_snips, trace_block)
-                        final = await self.llm.ainvoke(messages)
-                        final_text = getattr(final, "content", str(final)).strip()
-                        response_msg = final_text
-                        if state:
-                            state.setdefault("interactive_result", {})["visit_trace"] = visit_trace
-                            state.setdefault("interactive_result", {})["final_dom"] = final_dom
-                            state.setdefault("interactive_result", {})["final_url"] = current_url
-                            state.setdefault("messages", []).append({"role": self.role, "content": response_msg})
-                            return {**state, "response": response_msg}
-                        else:
-                            return {"response": response_msg}
-
-                    if action == "stop":
-                        break
+
+                        if action == "click":
+                            # 로그인 완료 상태면 'Login' 클릭 회피
+                            try:
+                                if state and state.get("navigation_result", {}).get("login_completed") and (target.get("by") or "").lower() == "text" and (target.get("value") or "").strip().lower() == "login":
+                                    print("[interactive_agent] 로그인 완료 상태: 'Login' 클릭 무시")
+                                    continue
+                            except Exception:
+                                pass
+                            acted = await self._act(page, self._click_by(page, target, explore_deadline, obs),
+                                                    explore_deadline, "interactive.click", waits)
+                            if acted:
+                                replay_path.append(self._replay_step(target, obs))
+                            current_url = page.url if acted else current_url
+                            # 클릭 후 즉시 DOM 재관찰 기록
+                            post_obs = await self._observe(page, tracker)
+                            visit_trace.append({
+                                "step": f"{step+1}.post",
+                                "url": current_url,
+                                "path": urlparse(current_url).path,
+                                "observation": self._trace_observation(post_obs),
+                                "action_result": f"clicked:{self._describe_target(target, obs)}"
+                            })
+                            continue
+
+                        if action == "answer":
+                            # 최종 답변 생성: 반드시 방문 경로/링크/클릭 요소 포함
+                            result = await self._answer_on_page(state, user_question, page, visit_trace, deadline, waits)
+                            answered = result.get("interactive_result", {}) if state else {}
+                            if self.memory is not None and not answered.get("partial"):
+                                await asyncio.to_thread(self.memory.record, user_question, urlparse(start_url).hostname,
+                                                        start_url, page.url, replay_path, obs.get("headings") or [])
+                            return result
+
+                        if action == "stop":
+                            break
+                except DeadlineExceeded:
+                    # 탐색 예산 소진: 지금까지의 관찰로 답변 생성
+                    print("[interactive_agent] 탐색 예산 소진: 현재 페이지 기준으로 답변 생성")
+                    partial = True
+
 
                 # 루프 종료: answer에 도달 못하면 현재 근거+방문 경로로라도 답 생성
-                final_dom = await self._summarize_dom(page)
-                policy_items = await self._extract_policies(page)
-                rag_snips = search_texts(f"{user_question}\n{current_url}", k=5)
-                trace_block = self._format_trace_block(visit_trace)
-                if policy_items:
-                    final_dom = f"[정책 항목]\n- " + "\n- ".join(policy_items[:20]) + "\n\n" + final_dom
-                messages = self._build_answer_with_trace(user_question, final_dom, rag_snips, trace_block)
-                final = await self.llm.ainvoke(messages)
-                final_text = getattr(final, "content", str(final)).strip()
-                if state:
-                    state.setdefault("interactive_result", {})["visit_trace"] = visit_trace
-                    state.setdefault("interactive_result", {})["final_dom"] = final_dom
-                    state.setdefault("interactive_result", {})["final_url"] = current_url
-                    state.setdefault("messages", []).append({"role": self.role, "content": final_text})
-                    return {**state, "response": final_text}
-                else:
-                    return {"response": final_text}
+                return await self._answer_on_page(state, user_question, page, visit_trace, deadline, waits, partial=partial)
+            finally:
+                await pool.release(session.handle)
 
         except Exception as e:
             error_msg = f"❌ Interactive agent 오류: {str(e)}"
             print(f"[interactive_agent] 오류: {e}")
             traceback.print_exc()
             friendly = "apim 콘솔 페이지 접속이 어려워 접속 기반 정보제공이 어렵습니다. 잠시후 다시 시도해주세요"
+            if isinstance(e, DeadlineExceeded):
+                friendly = SKIP_MSG
             if state:
                 state.setdefault("messages", []).append({"role": self.role, "content": friendly})
                 return {**state, "response": friendly}
             else:
                 return {"response": friendly}
 
-    async def _summarize_dom(self, page) -> str:
-        """페이지 DOM을 요약(스크립트/스타일 제거, 헤딩/링크/버튼/문단 중심)"""
-        html = await page.content()
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style", "noscript"]):
-            tag.extract()
-        pieces = []
-        title = soup.title.get_text(strip=True) if soup.title else ""
-        if title:
-            pieces.append(f"# {title}")
-        # 헤딩 우선
-        for hn in ["h1", "h2", "h3"]:
-            for h in soup.find_all(hn):
-                txt = h.get_text(" ", strip=True)
-                if txt:
-                    pieces.append(f"## {txt}")
-        # 버튼/링크 텍스트
-        for a in soup.find_all(["a", "button"]):
-            txt = a.get_text(" ", strip=True)
-            if not txt:
-                continue
-            href = a.get("href") or ""
-            if href and len(href) > 120:
-                href = href[:120] + "..."
-            pieces.append(f"- {txt} {href}")
-        # 일반 문단(상한)
-        for p in soup.find_all(["p", "li"]):
-            txt = p.get_text(" ", strip=True)
-            if txt:
-                pieces.append(txt)
-            if len("\n".join(pieces)) > 2500:
-                break
-        dom_text = "\n".join(pieces)[:3000]
-        return dom_text
-
-    async def _decide_next_action(self, question: str, current_url: str, dom_text: str, rag_snippets: str, step_index: int) -> dict:
+    async def _act(self, page, action, deadline: float | None, step: str, timings: list | None = None,
+                   url: str | None = None):
+        """이동/클릭(action 코루틴) 실행 후 화면 준비 대기(포털별 DOM/API 신호, 없으면 짧은 networkidle)하고 action 결과 반환
+        API 응답 대기는 action 전에 걸어 둔다. url: goto 대상(호스트 규칙 선택용). 대기 시간은 timings에 기록"""
+        result, via = await get_readiness().after(page, action, step, deadline, timings=timings, url=url)
+        if via == "fallback":
+            print(f"[interactive_agent] 준비 신호 없음({step}): 현재 DOM으로 진행")
+        return result
+
+    def _site_map_hit(self, question: str, target_url: str) -> dict | None:
+        """목표 포털(target_url 호스트)에서 질문과 가장 가까운 사이트맵 페이지 {page, similarity}"""
+        if self.site_map is None:
+            return None
+        try:
+            hits = self.site_map.search(question, k=1, host=urlparse(target_url).hostname)
+        except Exception as e:
+            print(f"[interactive_agent] 사이트맵 검색 실패: {e}")
+            return None
+        return hits[0] if hits else None
+
+    async def _answer_on_page(self, state: dict | None, question: str, page, visit_trace: list[dict],
+                              deadline: float | None, waits: list, partial: bool = False, source: str = "browser") -> dict:
+        """현재 화면(최종 DOM) + 방문 경로로 최종 답변 생성"""
+        current_url = page.url
+        trace_block = self._format_trace_block(visit_trace)
+        # 최종 요약과 정책 항목을 같은 스냅샷에서 추출
+        final_dom = await self._final_dom(page)
+        rag_snips = await asyncio.to_thread(search_texts, f"{question}\n{current_url}", k=5)
+        messages = self._build_answer_with_trace(question, final_dom, rag_snips, trace_block)
+        response_msg, answer_partial = await self._answer_within_budget(messages, deadline, trace_block)
+        if not state:
+            return {"response": response_msg}
+        result = state.setdefault("interactive_result", {})
+        result["visit_trace"] = visit_trace
+        result["final_dom"] = final_dom
+        result["final_url"] = current_url
+        result["partial"] = partial or answer_partial
+        result["waits"] = waits
+        result["source"] = source
+        state.setdefault("messages", []).append({"role": self.role, "content": response_msg})
+        return {**state, "response": response_msg}
+
+    def _memory_hit(self, question: str, target_url: str) -> dict | None:
+        """목표 포털(target_url 호스트)에서 비슷한 질문으로 answer에 도달했던 경로 {entry, similarity}"""
+        if self.memory is None:
+            return None
+        try:
+            return self.memory.lookup(question, urlparse(target_url).hostname)
+        except Exception as e:
+            print(f"[interactive_agent] 내비게이션 메모리 조회 실패: {e}")
+            return None
+
+    def _replay_step(self, target: dict, observation: dict | None) -> dict:
+        """수행한 클릭 → 재생 가능한 표현(번호 지정은 역할/이름으로, 번호는 화면마다 달라짐)"""
+        if (target.get("by") or "").lower() == "index":
+            element = element_at(observation, target.get("value"))
+            if element:
+                return {"element": {k: element[k] for k in ("role", "name", "nth", "selector") if k in element}}
+        return {"target": target}
+
+    async def _replay_memory(self, page, entry: dict, deadline: float | None, waits: list) -> dict | None:
+        """저장된 최종 URL로 이동(딥링크가 안 되면 시작 URL부터 클릭 경로 재생) 후 같은 화면인지 검증.
+        검증되면 그 화면의 관찰, 아니면 None"""
+        try:
+            if entry["final_url"] != entry["start_url"]:
+                await self._act(page, page.goto(entry["final_url"], wait_until="domcontentloaded", timeout=budget_ms(deadline, 30000)),
+                                deadline, "interactive.memory", waits, url=entry["final_url"])
+                observation = await self._verify_memory(page, entry)
+                if observation is not None or not entry.get("clicks"):
+                    return observation
+            await self._act(page, page.goto(entry["start_url"], wait_until="domcontentloaded", timeout=budget_ms(deadline, 30000)),
+                            deadline, "interactive.memory", waits, url=entry["start_url"])
+            for step in entry.get("clicks") or []:
+                if "goto" in step:
+                    await self._act(page, page.goto(step["goto"], wait_until="domcontentloaded", timeout=budget_ms(deadline, 30000)),
+                                    deadline, "interactive.memory", waits, url=step["goto"])
+                elif not await self._act(page, get_click_resolver().click(page, step.get("target") or {}, deadline, step.get("element")),
+                                         deadline, "interactive.memory", waits):
+                    return None
+            return await self._verify_memory(page, entry)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"[interactive_agent] 저장된 경로 재생 실패: {e}")
+            return None
+
+    async def _verify_memory(self, page, entry: dict) -> dict | None:
+        """같은 화면인지: 최종 URL 경로(해시 라우트 포함)가 같고, 저장된 헤딩 중 하나 이상이 보임"""
+        current, recorded = urlparse(page.url), urlparse(entry["final_url"])
+        if (current.hostname, current.path, current.fragment) != (recorded.hostname, recorded.path, recorded.fragment):
+            return None
+        observation = await self._observe(page)
+        headings = entry.get("headings") or []
+        if headings and not set(headings) & set(observation.get("headings") or []):
+            return None
+        return observation
+
+    async def _answer_from_snapshot(self, state: dict | None, question: str, hit: dict, deadline: float | None) -> dict:
+        """크롤링 스냅샷(페이지 요약)을 최종 화면으로 보고 답변"""
+        page = hit["page"]
+        print(f"[interactive_agent] 사이트맵 스냅샷으로 답변: {page['url']} ({hit['similarity']:.2f})")
+        visit_trace = [{
+            "step": 0,
+            "url": page["url"],
+            "path": urlparse(page["url"]).path,
+            "observation": (page.get("summary") or "")[:800],
+            "action_result": f"site_map:{hit['similarity']:.2f}",
+        }]
+        trace_block = self._format_trace_block(visit_trace)
+        final_dom = page.get("summary") or ""
+        rag_snips = await asyncio.to_thread(search_texts, f"{question}\n{page['url']}", k=5)
+        messages = self._build_answer_with_trace(question, final_dom, rag_snips, trace_block)
+        response_msg, partial = await self._answer_within_budget(messages, deadline, trace_block)
+        if not state:
+            return {"response": response_msg}
+        state["interactive_result"] = {
+            "visit_trace": visit_trace,
+            "final_dom": final_dom,
+            "final_url": page["url"],
+            "partial": partial,
+            "waits": [],
+            "source": "site_map",
+        }
+        state.setdefault("messages", []).append({"role": self.role, "content": response_msg})
+        return {**state, "response": response_msg}
+
+    async def _answer_within_budget(self, messages: list[dict], deadline: float | None, trace_block: str) -> tuple[str, bool]:
+        """최종 답변 LLM 호출. 예산이 소진되면 방문 경로만으로 부분 답변 (text, partial)"""
+        try:
+            final = await with_budget(self.llm.ainvoke(messages), deadline)
+            return getattr(final, "content", str(final)).strip(), False
+        except DeadlineExceeded:
+            print("[interactive_agent] 최종 답변 예산 소진: 방문 경로로 부분 답변")
+            return f"{PARTIAL_NOTE}\n\n{trace_block}", True
+
+    def _describe_target(self, target: dict, observation: dict | None) -> str:
+        """방문 로그용 대상 표기: 번호 지정이면 역할/이름으로 풀어 쓴다"""
+        if (target.get("by") or "").lower() == "index":
+            element = element_at(observation, target.get("value"))
+            if element:
+                return f"{element['role']} \"{element['name']}\""
+        return str(target)
+
+    async def _explore_parallel(self, context, page, obs: dict, ranked: list[dict], question: str,
+                                tried: set, deadline: float | None, waits: list) -> dict | None:
+        """상위 이동 후보(링크/메뉴/탭)를 같은 컨텍스트의 새 탭에서 동시에 열어 질문과 비교.
+        현재 화면보다 EXPLORE_MIN_GAIN 이상 잘 맞는 화면이 있으면 {element, tab, observation, score, tried}.
+        동시 로딩은 EXPLORE_MAX_TABS개까지, 비교에서 진 탭은 바로 닫는다."""
+        candidates = [el for el in ranked if el["role"] in NAVIGATION_ROLES
+                      and (el["role"], el["name"]) not in tried][:settings.EXPLORE_CANDIDATES]
+        if len(candidates) < 2 or expired(deadline):
+            return None
+        tried.update((el["role"], el["name"]) for el in candidates)
+        base_url = page.url
+        hrefs = await asyncio.gather(*(self._href_of(page, el) for el in candidates))
+        current_score = (await asyncio.to_thread(self.ranker.score_pages, question, [obs.get("header") or obs["text"]]))[0]
+        limit = asyncio.Semaphore(max(1, settings.EXPLORE_MAX_TABS))
+        best = None
+        opened = []  # 아직 닫지 않은 탭(반환하는 best 탭 외에는 finally에서 모두 닫음)
+        keep = None
+
+        async def open_tab(element: dict, href: str | None):
+            nonlocal best
+            async with limit:
+                tab = None
+                try:
+                    tab = await context.new_page()
+                    opened.append(tab)
+                    if href:
+                        await self._act(tab, tab.goto(href, wait_until="domcontentloaded", timeout=budget_ms(deadline, 15000)),
+                                        deadline, "interactive.explore", waits, url=href)
+                    else:
+                        # href 없는 메뉴/탭: 새 탭에서 같은 화면을 열고 같은 요소를 클릭
+                        await self._act(tab, tab.goto(base_url, wait_until="domcontentloaded", timeout=budget_ms(deadline, 15000)),
+                                        deadline, "interactive.explore", waits, url=base_url)
+                        if not await self._act(tab, get_click_resolver().click(tab, {}, deadline, element),
+                                               deadline, "interactive.explore", waits):
+                            raise RuntimeError("요소를 찾지 못함")
+                    observation = await build_observation(tab)
+                except Exception as e:
+                    print(f"[interactive_agent] 병렬 탭 실패 {element['name']}: {e}")
+                    if tab is not None:
+                        await tab.close()
+                        opened.remove(tab)
+                    return
+            score = (await asyncio.to_thread(self.ranker.score_pages, question, [observation.get("header") or observation["text"]]))[0]
+            print(f"[interactive_agent] 병렬 탭 {element['name']} → {tab.url} (score={score})")
+            # 비교와 교체를 await 없이 끝낸 뒤 진 탭을 닫음(다른 탭 작업과 엇갈리지 않게)
+            if best is None or score > best["score"]:
+                loser = best["tab"] if best is not None else None
+                best = {"element": element, "tab": tab, "observation": observation, "score": score}
+            else:
+                loser = tab
+            if loser is not None:
+                await loser.close()
+                opened.remove(loser)
+
+        try:
+            await asyncio.gather(*(open_tab(el, href) for el, href in zip(candidates, hrefs)))
+            if best is None:
+                return None
+            if best["score"] < current_score + settings.EXPLORE_MIN_GAIN:
+                print(f"[interactive_agent] 병렬 탭 결과가 현재 화면(score={current_score})보다 낫지 않음")
+                return None
+            best["tried"] = len(candidates)
+            keep = best["tab"]
+            return best
+        finally:
+            # 실패/취소(데드라인 등)/비교에서 진 탭을 포함해 반환하지 않는 탭은 모두 닫음
+            await asyncio.gather(*(tab.close() for tab in opened if tab is not keep), return_exceptions=True)
+
+    async def _href_of(self, page, element: dict) -> str | None:
+        """새 탭에서 바로 열 수 있는 절대 URL(링크가 아니거나 javascript:/# 이면 None)"""
+        if element["role"] != "link":
+            return None
+        try:
+            href = await locator_for(page, element).get_attribute("href", timeout=1000)
+        except Exception:
+            return None
+        if not href or href.startswith("javascript:") or (href.startswith("#") and not href.startswith("#/")):
+            return None
+        return urljoin(page.url, href)
+
+    async def _observe(self, page, tracker: ObservationTracker | None = None) -> dict:
+        """ReAct 결정용 관찰: {"text": 번호 붙은 요소 목록, "elements": [...], "diff": 직전 관찰 대비 차이}"""
+        observation = await build_observation(page)
+        if tracker is not None:
+            observation["diff"] = tracker.update(observation)
+        return observation
+
+    def _trace_observation(self, observation: dict) -> str:
+        """방문 로그에 남길 관찰: 직전 관찰 대비 차이만"""
+        return render_diff(observation, observation.get("diff"))[:800]
+
+    async def _final_dom(self, page) -> str:
+        """최종 답변용 DOM 요약: 정책 페이지면 같은 스냅샷의 정책 항목을 앞에 붙임"""
+        snapshot = await take_snapshot(page)
+        final_dom = render_summary(snapshot)
+        items = policy_items(snapshot)
+        if items:
+            final_dom = f"[정책 항목]\n- " + "\n- ".join(items[:20]) + "\n\n" + final_dom
+        return final_dom
+
+    async def _decide_next_action(self, question: str, current_url: str, dom_text: str, rag_snippets: str, step_index: int, deadline: float | None = None) -> dict:
         """LLM으로 다음 Action 결정(JSON only)"""
-        llm = self.llm
+        llm = self.action_llm
         system = (
             "너는 APIM 콘솔 내비게이터다. 다음 액션을 JSON으로만 반환해.\n"
-            "스키마: {\"action\":\"goto|click|stop|answer\", \"target\":{\"by\":\"url|text|href|id\", \"value\":\"...\"}, \"reason\":\"...\", \"confidence\":0.0}\n"
+            "스키마: {\"action\":\"goto|click|stop|answer\", \"target\":{\"by\":\"index|url|text|href|id\", \"value\":\"...\"}, \"reason\":\"...\", \"confidence\":0.0}\n"
             "절대 코드블록, 설명, 접두/접미 문구 없이 JSON 객체만 출력할 것\n"
             "규칙: 첫 스텝(step_index==0)에서는 answer를 선택하지 말 것. 관련 화면으로 이동을 우선.\n"
             "규칙: 이미 인증된 상태라면 'Login'을 클릭하지 말 것. goto가 text 대상이면 클릭으로 처리."
@@ -271,7 +592,7 @@ class InteractiveAgent:
 현재 URL: {current_url}
 현재 스텝: {step_index}
 
-[DOM 요약]
+[페이지 관찰: 번호가 붙은 요소 목록]
 {dom_text}
 
 [RAG 스니펫]
@@ -279,16 +600,20 @@ class InteractiveAgent:
 
 규칙:
 - 불확실하면 stop 또는 answer 중 선택(근거로 충분하면 answer). 단, step 0에서는 answer 금지
-- click은 target.by/value를 정확히 지정(text|href|id)
+- click은 target.by="index", value=요소 번호로 지정(목록에 없는 요소만 text|href|id)
+- 관찰은 이전 화면 대비 바뀐 요소 위주다. [생략]된 공통 메뉴가 필요하면 target.by="text"로 지정
 - goto는 절대/상대 URL 모두 허용(상대는 현재 URL 기준)
 JSON만 출력.
 """
         try:
-            resp = await llm.ainvoke(system + "\n\n" + prompt)
+            resp = await with_budget(llm.ainvoke(system + "\n\n" + prompt), deadline)
             text = getattr(resp, "content", resp)
-        except Exception:
-            resp_sync = llm.invoke(system + "\n\n" + prompt)
-            text = getattr(resp_sync, "content", resp_sync)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # 동기 invoke로 재시도하지 않음(이벤트 루프를 막고 LLM 동시 호출 상한/데드라인을 우회)
+            print(f"[interactive_agent] 다음 행동 LLM 호출 실패: {e}")
+            return {"action": "stop", "reason": "llm_error", "confidence": 0.0}
         # 견고한 JSON 추출 로직
         try:
             s = (text or "").strip()
@@ -306,31 +631,23 @@ JSON만 출력.
             print(f"[interactive_agent] decision parse failed; raw text: {(text or '')[:500]}")
             return {"action":"stop","reason":"parse_fail","confidence":0.0}
 
-    async def _click_by(self, page, target: dict) -> bool:
+    async def _click_by(self, page, target: dict, deadline: float | None = None, observation: dict | None = None) -> bool:
+        """target(index|text|href|id) 클릭. 가능한 locator 전략을 동시에 대기시켜 먼저 찾은 것으로 클릭(click_resolver)"""
         by = (target.get("by") or "").lower()
-        value = target.get("value") or ""
+        element = None
+        if by == "index":
+            # 관찰 목록의 번호 → 역할/이름(또는 셀렉터)으로 정확히 지정된 요소
+            element = element_at(observation, target.get("value"))
+            if element is None:
+                print(f"[interactive_agent] 관찰에 없는 요소 번호: {target.get('value')}")
+                return False
         try:
-            if by == "text" and value:
-                await page.wait_for_selector(f"text={value}", timeout=10000)
-                await page.click(f"text={value}")
-                return True
-            if by == "href" and value:
-                try:
-                    await page.wait_for_selector(f"a[href='{value}']", timeout=7000)
-                    await page.click(f"a[href='{value}']")
-                    return True
-                except Exception:
-                    await page.wait_for_selector(f"a[href*='{value}']", timeout=7000)
-                    await page.click(f"a[href*='{value}']")
-                    return True
-            if by == "id" and value:
-                await page.wait_for_selector(f"#{value}", timeout=10000)
-                await page.click(f"#{value}")
-                return True
+            return await get_click_resolver().click(page, target, deadline, element)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"[interactive_agent] _click_by 실패: {e}")
             return False
-        return False
 
     def _format_trace_block(self, visit_trace: list[dict]) -> str:
         lines = ["[방문 경로/행동 로그]"]
@@ -385,39 +702,3 @@ JSON만 출력.
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ]
-
-    async def _extract_policies(self, page) -> list[str]:
-        try:
-            html = await page.content()
-            soup = BeautifulSoup(html, "html.parser")
-            texts = []
-            # 후보 1: 정책 리스트 예상 영역의 항목들
-            for sel in [
-                "[class*='policy'] li",
-                "[class*='policy'] .ant-list-item",
-                "[class*='policy'] .ant-collapse-item .ant-collapse-header",
-                "[class*='Policies'] li",
-                "[class*='Policies'] .ant-list-item",
-                "[class*='Policies'] .ant-collapse-item .ant-collapse-header",
-            ]:
-                for node in soup.select(sel):
-                    t = node.get_text(" ", strip=True)
-                    if t and len(t) > 1:
-                        texts.append(t)
-            # 후보 2: 상세 페이지에서 '정책' 관련 버튼/레이블
-            for node in soup.find_all(["a", "button", "span"], string=True):
-                txt = node.get_text(" ", strip=True)
-                if any(k in txt for k in ["Policy", "정책", "JWT", "Rate Limiting", "Key", "OIDC", "SAML", "CORS"]):
-                    texts.append(txt)
-            # 정제
-            cleaned = []
-            seen = set()
-            for t in texts:
-                t = t.strip()
-                if t and t not in seen and len(t) < 200:
-                    seen.add(t)
-                    cleaned.append(t)
-            return cleaned
-        except Exception as e:
-            print(f"[interactive_agent] _extract_policies 실패: {e}")
-            return [] 
\ No newline at end of file
@@ -1,19 +1,40 @@
 import asyncio
 import base64
+from contextlib import nullcontext
 from pathlib import Path
-from playwright.async_api import async_playwright
+from utils.browser_pool import get_browser_pool
 import traceback
 import os
 from datetime import datetime
 import json
 import re
-from bs4 import BeautifulSoup
 from utils.config import settings
+from utils.deadline import DeadlineExceeded, budget_ms, expired, with_budget
+from utils.auth_sessions import AuthSessionCache
+from utils.readiness import get_readiness
+
+# 시간 예산 소진으로 로그인까지 마치지 못했을 때 안내
+DEADLINE_MSG = "⏱️ 응답 시간 제한으로 콘솔 접속을 마치지 못했습니다. 위 문서 기반 답변을 참고해주세요"
+
+# 로그인 화면 준비 완료 조건(호스트 규칙과 OR: 이미 로그인돼 포털 화면이 떠도 대기 종료)
+LOGIN_READY = "input[type='password']"
+
+def _is_login_url(url: str) -> bool:
+	url = (url or "").lower()
+	return "signin" in url or "login" in url
+
+def _prefer(selector: str | None, selectors: list[str]) -> list[str]:
+	"""기억된 셀렉터를 맨 앞으로"""
+	if not selector:
+		return selectors
+	return [selector] + [s for s in selectors if s != selector]
 
 class NavigationAgent:
-	def __init__(self, llm=None):
+	def __init__(self, llm=None, browser_limiter=None):
 		self.llm = llm
+		self.browser_limiter = browser_limiter  # 세션이 반납될 때까지 점유할 브라우저 동시 실행 상한
 		self.role = "navigation_agent"
+		self._background = set()  # 진행 중인 백그라운드 세션 갱신 작업(참조 유지: GC로 중단되지 않도록)
 		# 3개 포털 정의
 		self.portals = {
 			"developers": "https://developers.skapim.com/",      # 개발자 포털
@@ -22,32 +43,66 @@ class NavigationAgent:
 		}
 		self.login_email = settings.APIM_LOGIN_EMAIL
 		self.login_password = settings.APIM_LOGIN_PASSWORD
+		# 포털별 로그인 세션 캐시(유효한 세션이 있으면 로그인 폼을 건너뜀)
+		self.sessions = None
+		if settings.AUTH_SESSION_CACHE_ENABLED:
+			self.sessions = AuthSessionCache(
+				persist_dir=str(Path(settings.DATA_DIR) / "auth_sessions") if settings.AUTH_SESSION_PERSIST else None,
+				ttl_s=settings.AUTH_SESSION_TTL_S,
+				refresh_margin_s=settings.AUTH_SESSION_REFRESH_MARGIN_S,
+				probe_interval_s=settings.AUTH_SESSION_PROBE_INTERVAL_S,
+			)
 		
-	async def run(self, state: dict = None, user_question: str = "", rag_result: str = "") -> dict:
-		"""사용자 질문을 분석하여 적절한 포털을 선택하고 로그인 후 redirectUrl 전달"""
+	async def run(self, state: dict = None, user_question: str = "", rag_result: str = "", session_owner: str | None = None) -> dict:
+		"""사용자 질문을 분석하여 적절한 포털을 선택하고 로그인 후 redirectUrl 전달
+		로그인된 페이지는 닫지 않고 state["browser_session"] 핸들로 InteractiveAgent에 인계한다.
+		"""
+		# 노드 예산: 브라우저 대기/LLM 호출을 남은 시간으로 clamp
+		deadline = (state or {}).get("deadline")
+		waits = []  # 단계별 페이지 준비 대기 시간
 		try:
 			print(f"[navigation_agent] 시작: 질문='{user_question}'")
 			# 1단계: 질문 분석하여 적절한 포털 선택
-			think = await self.think_portal_and_path(user_question)
+			think = await self.think_portal_and_path(user_question, deadline)
 			selected_portal = think.get("portal", "console")
 			start_path = think.get("path", "/gateway")
 			print(f"[navigation_agent] 선택된 포털: {selected_portal}, path: {start_path}")
-			async with async_playwright() as p:
-				browser = await p.chromium.launch(headless=True)
-				page = await browser.new_page()
+			# 공유 로그인 세션(배치 실행 등)이 있으면 그 storage state로 시작 → 로그인 입력 생략
+			shared_auth = (state or {}).get("auth_state_path")
+			if shared_auth and not Path(shared_auth).exists():
+				shared_auth = None
+			# 없으면 포털별 세션 캐시(검증/선제 갱신 포함)
+			cached_session = None if shared_auth else await self._cached_session(selected_portal, deadline)
+			# 서버 공용 브라우저 풀에서 격리된 컨텍스트+페이지를 열고, 로그인에 성공하면 닫지 않고 인계
+			pool = get_browser_pool()
+			# 슬롯은 세션과 함께 유지되어 InteractiveAgent에 인계된 동안에도 상한에 포함
+			slot = self.browser_limiter.slot(deadline) if self.browser_limiter else None
+			session = await pool.open_session(owner=session_owner, slot=slot, storage_state=shared_auth or cached_session)
+			context, page = session.context, session.page
+			handed_off = False
+			try:
+				if shared_auth:
+					print(f"[navigation_agent] 공유 로그인 세션 사용: {shared_auth}")
 				# 2단계: 선택된 포털로 이동
 				target_portal_url = self.portals[selected_portal].rstrip('/') + start_path
 				print(f"[navigation_agent] 포털 이동: {target_portal_url}")
-				await page.goto(target_portal_url)
-				await page.wait_for_load_state('networkidle')
+				await get_readiness().after(page, page.goto(target_portal_url, wait_until="domcontentloaded", timeout=budget_ms(deadline, 30000)),
+											"navigation.portal", deadline, selector=LOGIN_READY, timings=waits, url=target_portal_url)
 				# 3단계: 로그인 페이지로 리다이렉트 확인
 				current_url = page.url
 				print(f"[navigation_agent] 현재 URL: {current_url}")
-				# 4단계: 로그인 수행
-				login_success = await self._login_to_console(page)
+				# 4단계: 로그인 수행(세션이 살아 있어 포털 페이지에 바로 들어왔으면 생략)
+				if (shared_auth or cached_session) and not _is_login_url(current_url):
+					print(f"[navigation_agent] 저장된 로그인 세션으로 진입: 로그인 생략")
+					login_success = True
+				else:
+					if cached_session:
+						self.sessions.invalidate(selected_portal)
+					login_success = await self._login_to_console(page, deadline, selected_portal, waits)
+					if login_success and self.sessions:
+						self.sessions.store(selected_portal, await context.storage_state())
 				if not login_success:
-					error_msg = "❌ 로그인 실패"
-					await browser.close()
+					error_msg = DEADLINE_MSG if expired(deadline) else "❌ 로그인 실패"
 					if state:
 						state["messages"].append({"role": self.role, "content": error_msg})
 						return {**state, "response": error_msg}
@@ -56,31 +111,29 @@ class NavigationAgent:
 				# 5단계: 로그인 후 최종 URL 확인 (redirectUrl)
 				final_url = page.url
 				print(f"[navigation_agent] 로그인 후 최종 URL: {final_url}")
-				# 로그인 세션 저장 (Playwright storage state)
-				try:
-					server_root = Path(__file__).resolve().parents[2]
-					auth_dir = server_root / "playwright_auth"
-					auth_dir.mkdir(parents=True, exist_ok=True)
-					auth_path = auth_dir / "auth_state.json"
-					await page.context.storage_state(path=str(auth_path))
-					print(f"[navigation_agent] 로그인 세션 저장: {auth_path}")
-				except Exception as e:
-					print(f"[navigation_agent] 세션 저장 실패: {e}")
-				await browser.close()
+				# 로그인 세션 저장 (Playwright storage state): 인계가 끊긴 경우(재개 실행 등)의 폴백
+				auth_path = await self._save_auth_state(page)
 				response_msg = f"🔍 {selected_portal} 포털을 선택하고 로그인을 완료했습니다: {final_url}"
 				if state:
+					state["browser_session"] = session.handle
+					handed_off = True
 					state["navigation_result"] = {
 						"selected_portal": selected_portal,
 						"portal_url": target_portal_url,
 						"target_url": final_url,
 						"login_completed": True,
-						"auth_state_path": str(auth_path) if 'auth_path' in locals() else None,
+						"auth_state_path": auth_path,
 						"user_question": user_question,
+						"waits": waits,
 					}
 					state["messages"].append({"role": self.role, "content": response_msg})
 					return {**state, "response": response_msg}
 				else:
 					return {"response": response_msg}
+			finally:
+				# 인계하지 않은 세션(로그인 실패/오류)은 바로 반납
+				if not handed_off:
+					await pool.release(session.handle)
 		except Exception as e:
 			error_msg = f"❌ Navigation agent 오류: {str(e)}"
 			print(f"[navigation_agent] 오류: {e}")
@@ -88,12 +141,104 @@ class NavigationAgent:
 			traceback.print_exc()
 			
 			friendly = "apim 콘솔 페이지 접속이 어려워 접속 기반 정보제공이 어렵습니다. 잠시후 다시 시도해주세요"
+			if isinstance(e, DeadlineExceeded) or expired(deadline):
+				friendly = DEADLINE_MSG
 			if state:
 				state["messages"].append({"role": self.role, "content": friendly})
 				return {**state, "response": friendly}
 			else:
 				return {"response": friendly}
 		
+	async def _save_auth_state(self, page, name: str = "auth_state.json") -> str | None:
+		"""로그인 세션(Playwright storage state)을 playwright_auth/{name}에 저장하고 경로 반환"""
+		try:
+			server_root = Path(__file__).resolve().parents[2]
+			auth_dir = server_root / "playwright_auth"
+			auth_dir.mkdir(parents=True, exist_ok=True)
+			auth_path = auth_dir / name
+			await page.context.storage_state(path=str(auth_path))
+			print(f"[navigation_agent] 로그인 세션 저장: {auth_path}")
+			return str(auth_path)
+		except Exception as e:
+			print(f"[navigation_agent] 세션 저장 실패: {e}")
+			return None
+
+	async def prepare_auth_state(self, portal: str = "console", path: str = "/gateway", name: str = "shared_auth_state.json",
+								 deadline: float | None = None) -> str | None:
+		"""포털 로그인 세션(캐시 또는 새 로그인)을 파일로 저장하고 경로 반환(배치 실행에서 질문 간 공유). 실패 시 None"""
+		try:
+			storage_state = await self._cached_session(portal, deadline) or await self._fresh_login(portal, path, deadline)
+			if not storage_state:
+				return None
+			auth_dir = Path(__file__).resolve().parents[2] / "playwright_auth"
+			auth_dir.mkdir(parents=True, exist_ok=True)
+			auth_path = auth_dir / name
+			auth_path.write_text(json.dumps(storage_state), encoding="utf-8")
+			return str(auth_path)
+		except Exception as e:
+			print(f"[navigation_agent] 공유 로그인 실패: {e}")
+			return None
+
+	async def _cached_session(self, portal: str, deadline: float | None = None) -> dict | None:
+		"""캐시된 로그인 세션(storage state). 오래 검증하지 않았으면 probe, 만료가 가까우면 백그라운드 갱신"""
+		if not self.sessions:
+			return None
+		entry = self.sessions.get(portal)
+		if entry is None:
+			return None
+		if self.sessions.needs_probe(entry):
+			if not await self._probe_session(portal, entry["storage_state"], deadline):
+				self.sessions.invalidate(portal)
+				return None
+			self.sessions.mark_valid(portal)
+		if self.sessions.needs_refresh(entry) and self.sessions.begin_refresh(portal):
+			task = asyncio.create_task(self._refresh_session(portal))
+			self._background.add(task)
+			task.add_done_callback(self._background.discard)
+		return entry["storage_state"]
+
+	def _browser_slot(self, deadline: float | None = None):
+		"""세션 probe/재로그인처럼 요청 세션 밖에서 여는 브라우저 컨텍스트도 동시 실행 상한에 포함"""
+		return self.browser_limiter.slot(deadline) if self.browser_limiter else nullcontext()
+
+	async def _probe_session(self, portal: str, storage_state: dict, deadline: float | None = None) -> bool:
+		"""페이지 렌더링 없이 HTTP 요청 1회로 세션 확인: 로그인 페이지로 리다이렉트되면 만료"""
+		try:
+			async with self._browser_slot(deadline), get_browser_pool().context(storage_state=storage_state) as context:
+				resp = await context.request.get(self.portals[portal], timeout=budget_ms(deadline, 5000))
+				valid = resp.ok and not _is_login_url(resp.url)
+				print(f"[navigation_agent] {portal} 세션 probe: {'유효' if valid else '만료'} ({resp.status} {resp.url})")
+				return valid
+		except DeadlineExceeded:
+			raise
+		except Exception as e:
+			print(f"[navigation_agent] {portal} 세션 probe 실패: {e}")
+			return False
+
+	async def _fresh_login(self, portal: str, path: str = "/gateway", deadline: float | None = None) -> dict | None:
+		"""새 컨텍스트에서 폼 로그인 후 세션을 캐시에 저장하고 storage state 반환. 실패 시 None"""
+		async with self._browser_slot(deadline), get_browser_pool().context() as context:
+			page = await context.new_page()
+			portal_url = self.portals[portal].rstrip('/') + path
+			await get_readiness().after(page, page.goto(portal_url, wait_until="domcontentloaded", timeout=budget_ms(deadline, 30000)),
+										"navigation.portal", deadline, selector=LOGIN_READY, url=portal_url)
+			if not await self._login_to_console(page, deadline, portal):
+				return None
+			storage_state = await context.storage_state()
+			if self.sessions:
+				self.sessions.store(portal, storage_state)
+			return storage_state
+
+	async def _refresh_session(self, portal: str) -> None:
+		"""만료 전 선제 재로그인(백그라운드). 요청 경로는 기존 세션을 계속 사용"""
+		try:
+			print(f"[navigation_agent] {portal} 세션 선제 갱신 시작")
+			await self._fresh_login(portal)
+		except Exception as e:
+			print(f"[navigation_agent] {portal} 세션 갱신 실패: {e}")
+		finally:
+			self.sessions.end_refresh(portal)
+
 	def _select_portal(self, user_question: str, rag_result: str) -> str:
 		"""사용자 질문을 분석하여 적절한 포털 선택"""
 		question_lower = user_question.lower()
@@ -153,15 +298,18 @@ class NavigationAgent:
 		print(f"[navigation_agent] 최고 점수 포털: {best_portal} (점수: {best_score})")
 		return best_portal
 	
-	async def _login_to_console(self, page):
-		"""포털 로그인 수행"""
+	async def _login_to_console(self, page, deadline: float | None = None, portal: str | None = None,
+								timings: list | None = None):
+		"""포털 로그인 수행. portal을 주면 그 포털에서 성공했던 셀렉터를 먼저 시도하고, 성공 시 다시 기억
+		고정 sleep 없이 로그인 폼 표시/URL 변화를 기다리며, 대기 시간은 timings에 기록"""
+		remembered = self.sessions.selectors(portal) if (self.sessions and portal) else {}
+		used = {}
 		try:
 			print(f"[navigation_agent] === 로그인 시도 시작 ===")
 			print(f"[navigation_agent] 현재 URL: {page.url}")
 			
-			# 페이지 로드 완료 대기
-			await page.wait_for_load_state('networkidle', timeout=60000)
-			await page.wait_for_timeout(3000)
+			# 로그인 폼(또는 이미 로그인된 포털 화면) 표시 대기
+			await get_readiness().ready(page, "login.form", deadline, selector=LOGIN_READY, timings=timings)
 			
 			# 이미 로그인된 상태인지 확인 (로그인 페이지가 아닌 경우)
 			current_url = page.url
@@ -190,7 +338,9 @@ class NavigationAgent:
 			]
 			
 			email_input = None
-			for selector in email_selectors:
+			for selector in _prefer(remembered.get("email"), email_selectors):
+				if email_input:
+					break
 				try:
 					locator = page.locator(selector)
 					count = await locator.count()
@@ -200,6 +350,7 @@ class NavigationAgent:
 							is_visible = await element.is_visible()
 							if is_visible:
 								email_input = element
+								used["email"] = selector
 								print(f"[navigation_agent] ✅ 아이디 입력 필드 발견: {selector}")
 								break
 							if email_input:
@@ -212,13 +363,7 @@ class NavigationAgent:
 				return False
 			
 			# 아이디 입력
-			await email_input.click()
-			await page.wait_for_timeout(500)
-			await email_input.select_text()
-			await page.keyboard.press('Delete')
-			await page.wait_for_timeout(500)
-			await email_input.type(self.login_email, delay=50)
-			await page.wait_for_timeout(1000)
+			await self._fill_input(email_input, self.login_email, deadline)
 			print(f"[navigation_agent] ✅ 아이디 입력 완료")
 			
 			# 비밀번호 입력 필드 찾기 (type="password")
@@ -230,7 +375,9 @@ class NavigationAgent:
 			]
 			
 			password_input = None
-			for selector in password_selectors:
+			for selector in _prefer(remembered.get("password"), password_selectors):
+				if password_input:
+					break
 				try:
 					locator = page.locator(selector)
 					count = await locator.count()
@@ -240,6 +387,7 @@ class NavigationAgent:
 							is_visible = await element.is_visible()
 							if is_visible:
 								password_input = element
+								used["password"] = selector
 								print(f"[navigation_agent] ✅ 비밀번호 입력 필드 발견: {selector}")
 								break
 							if password_input:
@@ -252,13 +400,7 @@ class NavigationAgent:
 				return False
 			
 			# 비밀번호 입력
-			await password_input.click()
-			await page.wait_for_timeout(500)
-			await password_input.select_text()
-			await page.keyboard.press('Delete')
-			await page.wait_for_timeout(500)
-			await password_input.type(self.login_password, delay=50)
-			await page.wait_for_timeout(1000)
+			await self._fill_input(password_input, self.login_password, deadline)
 			print(f"[navigation_agent] ✅ 비밀번호 입력 완료")
 			
 			# 로그인 버튼 찾기 (type="submit")
@@ -273,7 +415,7 @@ class NavigationAgent:
 			]
 			
 			login_success = False
-			for selector in login_button_selectors:
+			for selector in _prefer(remembered.get("submit"), login_button_selectors):
 				try:
 					locator = page.locator(selector)
 					count = await locator.count()
@@ -286,14 +428,18 @@ class NavigationAgent:
 									print(f"[navigation_agent] 🔘 로그인 버튼 클릭 시도: {selector}")
 									
 									current_url = page.url
-									await element.click()
-									
-									# 페이지 변경 대기
+									# 로그인 후 도착할 포털의 데이터 응답 대기를 클릭 전에 걸어 둠
+									readiness = get_readiness()
+									armed = readiness.arm(page, deadline, url=self.portals.get(portal))
 									try:
-										await page.wait_for_load_state('networkidle', timeout=20000)
-										await page.wait_for_timeout(3000)
-									except Exception as wait_error:
-										print(f"[navigation_agent] 페이지 로딩 대기 중 오류: {wait_error}")
+										await element.click(timeout=budget_ms(deadline, 30000))
+									except BaseException:
+										await readiness.disarm(armed)
+										raise
+									
+									# 로그인 화면을 벗어날 때까지 대기(그 후 새 화면 준비 대기)
+									await readiness.url_change(page, current_url, "login.submit", deadline,
+															   timings, accept=lambda url: not _is_login_url(url), armed=armed)
 									
 									new_url = page.url
 									print(f"[navigation_agent] 클릭 후 URL: {new_url}")
@@ -304,6 +450,7 @@ class NavigationAgent:
 										"login" not in new_url.lower()):
 										print(f"[navigation_agent] 🎉 로그인 성공! redirectUrl: {new_url}")
 										login_success = True
+										used["submit"] = selector
 										break
 										
 							except Exception as click_error:
@@ -318,23 +465,35 @@ class NavigationAgent:
 			
 			if login_success:
 				print(f"[navigation_agent] === 로그인 완전 성공! ===")
+				if self.sessions and portal:
+					self.sessions.remember_selectors(portal, used)
 				return True
 			else:
 				print(f"[navigation_agent] === 로그인 실패 ===")
 				return False
 				
+		except DeadlineExceeded:
+			print(f"[navigation_agent] 로그인 중 시간 예산 소진")
+			return False
 		except Exception as e:
 			print(f"[navigation_agent] 로그인 시도 중 오류: {e}")
 			import traceback
 			traceback.print_exc()
 			return False 
 	
-	async def think_portal_and_path(self, question: str) -> dict:
+	async def _fill_input(self, element, value: str, deadline: float | None = None) -> None:
+		"""입력 필드 값 설정 후 실제 값으로 확인. fill이 반영되지 않는 폼은 키 입력으로 재시도"""
+		await element.fill(value, timeout=budget_ms(deadline, 10000))
+		if await element.input_value(timeout=budget_ms(deadline, 5000)) != value:
+			await element.fill("", timeout=budget_ms(deadline, 5000))
+			await element.type(value, delay=20, timeout=budget_ms(deadline, 10000))
+
+	async def think_portal_and_path(self, question: str, deadline: float | None = None) -> dict:
 		"""RAG+LLM을 활용해 포털(console|developers|tenant)과 초기 path를 결정"""
 		from retrieval.vector_db import search_texts
-		from utils.config import get_llm_azopai
-		llm = get_llm_azopai()
-		docs = search_texts(question, k=5)
+		from utils.config import get_llm_for
+		llm = self.llm or get_llm_for("portal_select")
+		docs = await asyncio.to_thread(search_texts, question, k=5)
 		system = (
 			"너는 APIM 포털 네비게이터야. 사용자 질문과 문서 스니펫을 보고, 아래 JSON만 반환해.\n"
 			"필드: portal(console|developers|tenant), path(예:/gateway,/api,/policy), reason"
@@ -350,13 +509,16 @@ class NavigationAgent:
 	JSON만 출력:
 	{{"portal":"console","path":"/gateway","reason":"..."}}
 	"""
-		# 비동기 우선, 실패 시 동기 호출로 폴백
+		# 실패하면 기본 포털(console /gateway)로 진행(동기 invoke 재시도는 이벤트 루프를 막고 상한/데드라인을 우회)
 		try:
-			resp = await llm.ainvoke(system + "\n\n" + prompt)
+			resp = await with_budget(llm.ainvoke(system + "\n\n" + prompt), deadline)
 			text = getattr(resp, "content", resp)
-		except Exception:
-			resp_sync = llm.invoke(system + "\n\n" + prompt)
-			text = getattr(resp_sync, "content", resp_sync)
+		except DeadlineExceeded:
+			# 시간 예산 소진: 기본 포털(console /gateway)로 진행
+			text = ""
+		except Exception as e:
+			print(f"[navigation_agent] 포털 선택 LLM 호출 실패: {e}")
+			text = ""
 		try:
 			data = json.loads(text)
 			portal = data.get("portal") or "console"
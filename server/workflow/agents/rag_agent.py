@@ -1,16 +1,23 @@
+import asyncio
 import traceback
 import json
-from retrieval.vector_db import VectorDB, get_global_vector_db
+from retrieval.vector_db import VectorDB, init_default_vector_db
 import re
 from time import sleep
 from pathlib import Path
+from retrieval.query_rewrite import LocalQueryRewriter
 from utils.prompts import build_rag_query_messages, rag_prompt_meta
+from utils.config import settings
+from utils.deadline import DeadlineExceeded, with_budget
 class RAGAgent:
-    def __init__(self, llm):
+    def __init__(self, llm, vector_db: VectorDB | None = None):
         self.llm = llm
         self.role = "ragagent"
-        # 전역 VectorDB 사용 (startup에서 초기화됨)
-        self.vector_db = get_global_vector_db() or VectorDB()
+        # 주입된 VectorDB 또는 전역 VectorDB 사용 (startup에서 초기화됨)
+        self.vector_db = vector_db or init_default_vector_db()
+        # 로컬 질의 변환(설정이 llm이면 사용 안 함)
+        self.rewrite_mode = settings.RAG_QUERY_REWRITE
+        self.local_rewriter = LocalQueryRewriter(self.vector_db, mode=self.rewrite_mode)
 
     async def run(self, state: dict = None, question: str = None) -> dict:
         # state 객체가 있으면 그것을 사용, 없으면 question만 사용
@@ -20,25 +27,47 @@ class RAGAgent:
             return {"error": "No question provided"}
 
         try:
-            # 1. LLM에게 검색 키워드(한 문장)로 변환 요청 (APIM 관리자 역할)
-            messages = build_rag_query_messages(question)
-            # 로그: 프롬프트 메타(짧음)
-            if state is not None:
-                state.setdefault("messages", []).append({"role": self.role, "content": rag_prompt_meta()})
-            llm_response = await self.llm.ainvoke(messages)
-            content = getattr(llm_response, "content", str(llm_response)).strip()
-            try:
-                parsed = json.loads(content)
-                english_query = parsed.get("english_query") or content
-            except Exception:
-                english_query = content
+            # 0. 로컬 질의 변환(glossary/다국어 임베딩) 우선 시도: 충분히 유사한 문서가 나오면 LLM 왕복 생략
+            search_results = None
+            english_query = None
+            local_query = None
+            deadline = (state or {}).get("deadline")
+            if self.rewrite_mode != "llm":
+                local_results, local_query, confidence = await asyncio.to_thread(self.local_rewriter.search, question, k=5)
+                print(f"[RAGAgent] 로컬 질의 변환({self.rewrite_mode}): '{local_query}' confidence={confidence:.2f}")
+                if local_results and confidence >= settings.RAG_LOCAL_MIN_SIMILARITY:
+                    search_results = local_results
+                    english_query = local_query
 
-            # 2. 벡터DB에 영어 쿼리로 검색
-            search_results = self.vector_db.search(english_query, k=5)
+            if search_results is None:
+                # 1. LLM에게 검색 키워드(한 문장)로 변환 요청 (APIM 관리자 역할)
+                messages = build_rag_query_messages(question)
+                # 로그: 프롬프트 메타(짧음)
+                if state is not None:
+                    state.setdefault("messages", []).append({"role": self.role, "content": rag_prompt_meta()})
+                try:
+                    llm_response = await with_budget(self.llm.ainvoke(messages), deadline)
+                    content = getattr(llm_response, "content", str(llm_response)).strip()
+                    try:
+                        parsed = json.loads(content)
+                        english_query = parsed.get("english_query") or content
+                    except Exception:
+                        english_query = content
+                    rewrite_note = "• Few-shot(3개) 적용"
+                except DeadlineExceeded:
+                    # 시간 예산 소진: LLM 변환 없이 로컬 변환 질의(없으면 원문)로 검색
+                    print("[RAGAgent] 시간 예산 소진: LLM 질의 변환 생략")
+                    english_query = local_query or question
+                    rewrite_note = "• 시간 예산 부족으로 LLM 질의 변환 생략"
+
+                # 2. 벡터DB에 영어 쿼리로 검색
+                search_results = await asyncio.to_thread(self.vector_db.search, english_query, k=5)
+            else:
+                rewrite_note = f"• 로컬 질의 변환({self.rewrite_mode}) 적용"
 
             # 3. state에 결과 저장 + 간단한 개요 메시지 남기기
             cnt = len(search_results) if search_results else 0
-            overview = f"• Few-shot(3개) 적용\n• RAG {cnt}개 조회"
+            overview = f"{rewrite_note}\n• RAG {cnt}개 조회"
 
             if state:
                 state["rag_result"] = search_results
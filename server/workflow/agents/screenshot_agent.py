@@ -1,7 +1,8 @@
 import asyncio
 import base64
 from pathlib import Path
-from playwright.async_api import async_playwright
+from utils.browser_pool import get_browser_pool
+from utils.readiness import get_readiness
 import traceback
 import os
 from datetime import datetime
@@ -83,25 +84,15 @@ class ScreenshotAgent:
         filename = f"screenshot_{timestamp}.png"
         screenshot_path = self.screenshots_dir / filename
         
-        async with async_playwright() as p:
-            # 브라우저 시작 (headless 모드)
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        # 서버 공용 브라우저 풀의 격리된 컨텍스트 사용(뷰포트 1920x1080, 이미지/폰트가 필요하므로 요청 차단 해제)
+        async with get_browser_pool().context(block_resources=False, viewport={"width": 1920, "height": 1080}) as context:
+            page = await context.new_page()
             
-            # 뷰포트 크기 설정
-            await page.set_viewport_size({"width": 1920, "height": 1080})
-            
-            # 페이지 이동
-            await page.goto(url, wait_until="networkidle")
-            
-            # 약간의 대기 시간 (페이지 로딩 완료 확인)
-            await page.wait_for_timeout(2000)
+            # 페이지 이동(이미지까지 load) 후 화면 준비 신호 대기
+            await get_readiness().after(page, page.goto(url, wait_until="load"), "screenshot", url=url)
             
             # 스크린샷 캡처
             await page.screenshot(path=str(screenshot_path), full_page=True)
-            
-            # 브라우저 종료
-            await browser.close()
         
         return screenshot_path
     
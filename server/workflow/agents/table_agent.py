@@ -2,6 +2,11 @@ import traceback
 import pandas as pd
 import json
 from utils.prompts import build_table_summary_messages, table_prompt_meta
+from utils.deadline import DeadlineExceeded, with_budget
+
+# 시간 예산이 소진되면 LLM 요약 대신 근거만 내보낸다
+# (그 메시지에는 degraded="deadline", 실패는 role="error" → 답변 캐시/배치가 문구 대신 이 신호로 판정)
+DEADLINE_NOTE = "⏱️ 응답 시간 제한으로 요약을 생략하고 근거만 표시합니다."
 
 class TableAgent:
     def __init__(self, llm):
@@ -10,6 +15,7 @@ class TableAgent:
         
     async def run(self, state=None, cloud_result=None, user_request=None):
         # state 객체가 있으면 그것을 사용, 없으면 인자값만 사용
+        deadline = (state or {}).get("deadline")
         if state:
             cloud_result = state.get("cloud_result")
             rag_result = state.get("rag_result") or []
@@ -39,7 +45,7 @@ class TableAgent:
                 evidence_block = "\n".join(evidence_lines)
                 messages = build_table_summary_messages(user_request, context, evidence_block)
                 try:
-                    summary_response = await self.llm.ainvoke(messages)
+                    summary_response = await with_budget(self.llm.ainvoke(messages), deadline)
                     summary = summary_response.content
                     if state:
                         header = "🧭 실제 UI 단계별 요약/경로 표"
@@ -48,6 +54,10 @@ class TableAgent:
                         return {**state, "response": final_response}
                     else:
                         return {"summary": summary}
+                except DeadlineExceeded:
+                    final_response = f"🧭 실제 UI 방문 경로\n\n{DEADLINE_NOTE}\n{evidence_block}"
+                    state["messages"].append({"role": self.role, "content": final_response, "degraded": "deadline"})
+                    return {**state, "response": final_response}
                 except Exception as e:
                     error_msg = f"요약 실패: {str(e)}"
                     traceback.print_exc()
@@ -83,7 +93,7 @@ class TableAgent:
         evidence_block = "\n".join(evidence_lines)
         messages = build_table_summary_messages(user_request, context, evidence_block)
         try:
-            summary_response = await self.llm.ainvoke(messages)
+            summary_response = await with_budget(self.llm.ainvoke(messages), deadline)
             summary = summary_response.content
             
             if state:
@@ -94,6 +104,13 @@ class TableAgent:
             else:
                 return {"summary": summary}
                 
+        except DeadlineExceeded:
+            final_response = f"📚 APIM Document 근거\n\n{DEADLINE_NOTE}\n{evidence_block}"
+            if state:
+                state["messages"].append({"role": self.role, "content": final_response, "degraded": "deadline"})
+                return {**state, "response": final_response}
+            else:
+                return {"summary": final_response}
         except Exception as e:
             error_msg = f"요약 실패: {str(e)}"
             traceback.print_exc()
@@ -0,0 +1,231 @@
+"""배치 질의 실행: 여러 질문을 공유 자원으로 한 번에 실행하고 질문별 결과/소요 시간 반환
+
+- 질의 임베딩: 로컬 질의 변환 결과를 한 번의 배치 encode로 미리 계산(이후 검색은 캐시 적중)
+- 로그인: 콘솔에 한 번만 로그인해 세션(storage state)을 저장하고 모든 질문의 브라우저 컨텍스트가 재사용
+- 동시 실행: concurrency개까지 병렬(브라우저/LLM 동시 실행 상한은 런타임 공용 limiter가 추가로 적용)
+- 결과는 답변 캐시에 저장(refresh) → 사이드바 FAQ/상위 질의 사전 계산(야간 배치)에 사용
+- 서버(POST /batch)에서는 작업 큐의 작업 하나로 실행: 질문이 끝날 때마다 batch_item 이벤트,
+  마지막에 batch(전체 보고서) 이벤트. deadline이 지나면 남은 질문은 실행하지 않고 error로 기록
+
+사용 예:
+    python -m workflow.batch                              # 사이드바 FAQ를 in-process로 실행(회귀 테스트/측정)
+    python -m workflow.batch questions.txt --concurrency 4 --out results.json
+    python -m workflow.batch questions.txt --url http://localhost:8001/api/v1/workflow   # 서버 캐시 예열
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from utils.answer_cache import answer_status
+from utils.concurrency import percentile
+from utils.config import settings
+from utils.deadline import remaining
+from workflow.runtime import get_runtime
+
+# app/components/sidebar.py의 FAQ 버튼 질문
+FAQ_QUESTIONS = [
+    "API 인증 방법을 알려주세요",
+    "게이트웨이 설정 방법은?",
+    "사용자 권한 관리는 어떻게 하나요?",
+]
+
+_ANSWER_TYPES = ("table_ui", "table_rag", "interactive")
+
+
+def _summarize(question: str, events: list[dict], arrivals: list[float], cached: bool) -> dict:
+    """질문 하나의 이벤트 시퀀스 → 결과 요약(최종 답변, 상태, 노드별 도착 시각)"""
+    answers = {ev["type"]: ev.get("response") for ev in events if ev.get("type") in _ANSWER_TYPES}
+    answer_type = next((t for t in _ANSWER_TYPES if answers.get(t)), None)
+    graph_events = [ev for ev in events if ev.get("type") not in ("run", "cache", "end")]
+    status = answer_status(graph_events)  # degraded: 콘솔 실패/시간 제한 등으로 부분 답변
+    nodes = {}
+    for ev, at in zip(events, arrivals):
+        if ev.get("type") not in ("run", "cache", "end"):
+            nodes[ev["type"]] = round(at * 1000, 1)
+    return {
+        "question": question,
+        "status": status,
+        "cached": cached,
+        "answer_type": answer_type,
+        "answer": answers.get(answer_type) if answer_type else None,
+        "events": [ev.get("type") for ev in events],
+        "timings": {
+            "total_ms": round(arrivals[-1] * 1000, 1) if arrivals else 0.0,
+            "first_event_ms": round(arrivals[0] * 1000, 1) if arrivals else None,
+            "nodes_ms": nodes,  # 시작 기준 노드 이벤트 도착 시각
+        },
+    }
+
+
+async def _run_question(question: str, ui_mode: str, refresh: bool, timeout_s: float,
+                        auth_state_path: str | None) -> dict:
+    from routers.workflow import query_events
+    start = time.perf_counter()
+    events, arrivals = [], []
+    try:
+        async for event in query_events(question, ui_mode, use_cache=True, timeout_s=timeout_s,
+                                        auth_state_path=auth_state_path, refresh=refresh):
+            events.append(event)
+            arrivals.append(time.perf_counter() - start)
+    except Exception as e:
+        events.append({"type": "error", "response": str(e)})
+        arrivals.append(time.perf_counter() - start)
+    cached = any(ev.get("type") == "cache" for ev in events)
+    return _summarize(question, events, arrivals, cached)
+
+
+def _skipped(question: str) -> dict:
+    return _summarize(question, [{"type": "error", "response": "배치 시간 예산 소진으로 실행하지 않음"}], [0.0], False)
+
+
+async def batch_events(questions: list[str], ui_mode: str = "auto", concurrency: int | None = None,
+                       refresh: bool = True, share_login: bool = True, timeout_s: float | None = None,
+                       deadline: float | None = None):
+    """질문 목록을 공유 자원으로 실행하며 진행 이벤트를 낸다. refresh=True면 캐시를 읽지 않고 새로 계산해 캐시 갱신
+    - 질문이 끝날 때마다 {"type": "batch_item", "meta": {index, ...결과}}(완료 순서)
+    - 마지막에 {"type": "batch", "meta": 전체 보고서}(결과는 입력 순서)
+    deadline(epoch 초)이 있으면 질문별 예산을 남은 시간으로 줄이고, 소진 후 차례가 온 질문은 건너뛴다.
+    """
+    runtime = get_runtime()
+    concurrency = max(1, concurrency or settings.BATCH_CONCURRENCY)
+    timeout_s = timeout_s or settings.BATCH_TIMEOUT_S
+    questions = [q.strip() for q in questions if q and q.strip()]
+    batch_start = time.perf_counter()
+
+    # 1) 질의 임베딩 일괄 계산(route/rag 노드의 로컬 검색이 캐시 적중)
+    t0 = time.perf_counter()
+    queries = [q for question in questions for q in runtime.rag_agent.local_rewriter.queries(question)]
+    if queries:
+        await asyncio.to_thread(runtime.vector_db.encode_queries, queries)
+    embed_ms = (time.perf_counter() - t0) * 1000
+
+    # 2) 공유 로그인 1회
+    auth_state_path = None
+    login_ms = 0.0
+    if share_login and ui_mode != "never":
+        t0 = time.perf_counter()
+        auth_state_path = await runtime.navigation_agent.prepare_auth_state()
+        login_ms = (time.perf_counter() - t0) * 1000
+        print(f"[batch] 공유 로그인 {'완료' if auth_state_path else '실패(질문별 로그인으로 진행)'} ({login_ms:.0f}ms)")
+
+    # 3) 제한된 병렬 실행(완료 순서로 진행 이벤트, 보고서는 입력 순서)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(index: int, question: str) -> tuple[int, dict]:
+        async with sem:
+            left = remaining(deadline)
+            if left is not None and left <= 0:
+                return index, _skipped(question)
+            budget = timeout_s if left is None else min(timeout_s, left)
+            result = await _run_question(question, ui_mode, refresh, budget, auth_state_path)
+            print(f"[batch] {result['status']} {result['timings']['total_ms']:.0f}ms: {question}")
+            return index, result
+
+    tasks = [asyncio.create_task(one(i, q)) for i, q in enumerate(questions)]
+    results: list[dict] = [None] * len(questions)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result = await next_done
+            results[index] = result
+            yield {"type": "batch_item", "response": "", "meta": {"index": index, **result}}
+    finally:
+        for task in tasks:
+            task.cancel()
+    totals = [r["timings"]["total_ms"] for r in results]
+    yield {"type": "batch", "response": "", "meta": {
+        "count": len(results),
+        "concurrency": concurrency,
+        "ui_mode": ui_mode,
+        "status": {s: sum(1 for r in results if r["status"] == s) for s in ("ok", "degraded", "error")},
+        "timings": {
+            "wall_ms": round((time.perf_counter() - batch_start) * 1000, 1),
+            "embed_ms": round(embed_ms, 1),
+            "login_ms": round(login_ms, 1),
+            "question_ms_p50": percentile(totals, 50),
+            "question_ms_p95": percentile(totals, 95),
+        },
+        "shared_login": bool(auth_state_path),
+        "results": results,
+    }}
+
+
+async def run_batch(questions: list[str], **options) -> dict:
+    """batch_events를 끝까지 실행하고 전체 보고서 반환(in-process CLI용)"""
+    report = None
+    async for event in batch_events(questions, **options):
+        if event["type"] == "batch":
+            report = event["meta"]
+    return report
+
+
+def load_questions(paths: list[str]) -> list[str]:
+    """질문 파일(.txt: 한 줄에 하나, .json: 문자열 리스트) 읽기. 없으면 사이드바 FAQ"""
+    questions = []
+    for path in paths:
+        text = Path(path).read_text(encoding="utf-8")
+        if path.endswith(".json"):
+            questions.extend(json.loads(text))
+        else:
+            questions.extend(line for line in text.splitlines() if line.strip() and not line.startswith("#"))
+    return questions or list(FAQ_QUESTIONS)
+
+
+def _post_batch(url: str, body: dict) -> dict:
+    """서버에 배치 작업을 접수하고 작업 스트림에서 전체 보고서(batch 이벤트)를 받음"""
+    import requests
+    base = url.rstrip("/")
+    resp = requests.post(f"{base}/batch", json=body, timeout=30)
+    resp.raise_for_status()
+    job = resp.json()
+    print(f"[batch] 서버 작업 접수: {job['job_id']} (대기 순번 {job.get('position')})")
+    with requests.get(f"{base}/jobs/{job['job_id']}/stream", stream=True, timeout=None) as stream:
+        stream.raise_for_status()
+        for line in stream.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event["type"] == "batch_item":
+                print(f"[batch] {event['meta']['status']} {event['meta']['question']}")
+            elif event["type"] == "batch":
+                return event["meta"]
+            elif event["type"] == "error":
+                raise RuntimeError(event.get("response"))
+    raise RuntimeError("배치 작업이 보고서 없이 종료되었습니다")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="배치 질의 실행(FAQ/상위 질의 사전 계산, 회귀 테스트)")
+    parser.add_argument("files", nargs="*", help="질문 파일(.txt/.json). 생략 시 사이드바 FAQ")
+    parser.add_argument("--ui-mode", default="auto", choices=["auto", "always", "never"])
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--timeout-s", type=float, default=None, help="질문별 시간 예산")
+    parser.add_argument("--no-refresh", action="store_true", help="캐시에 있는 답변은 그대로 사용")
+    parser.add_argument("--no-shared-login", action="store_true")
+    parser.add_argument("--url", default=None, help="서버 API 기준 URL. 지정하면 서버에서 실행(서버 답변 캐시 예열)")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    questions = load_questions(args.files)
+    options = {
+        "ui_mode": args.ui_mode,
+        "concurrency": args.concurrency,
+        "refresh": not args.no_refresh,
+        "share_login": not args.no_shared_login,
+        "timeout_s": args.timeout_s,
+    }
+    if args.url:
+        report = _post_batch(args.url, {"questions": questions, **options})
+    else:
+        report = asyncio.run(run_batch(questions, **options))
+
+    for r in report["results"]:
+        print(f"{r['status']:8s} {r['timings']['total_ms']:9.0f}ms  {r['question']}")
+    print(json.dumps({k: v for k, v in report.items() if k != "results"}, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""포털 오프라인 크롤러: 포털마다 한 번 로그인해 링크를 너비 우선(BFS)으로 순회하고 사이트맵 인덱스를 구축
+
+- 페이지마다 URL → 제목/헤딩/링크/DOM 요약을 수집하고, retrieval.site_map이 페이지 임베딩을 만들어 저장
+- 범위 제한: 포털당 max_pages, 시작 페이지 기준 max_depth, 같은 호스트만, 로그아웃/로그인 링크 제외
+- 한 컨텍스트(로그인 세션)에서 concurrency개 탭으로 병렬 방문
+- InteractiveAgent는 이 인덱스로 질문에 맞는 화면을 찾아 바로 이동하거나, 스냅샷이 최신이면 그것으로 답변
+사용자 요청과 브라우저 동시 실행 상한(browser_limiter)을 공유하지 않으므로 한가한 시간(야간 배치)에 실행한다.
+
+사용 예:
+    python -m workflow.crawler                          # CRAWL_PORTALS 전체
+    python -m workflow.crawler console --max-pages 50 --max-depth 2
+서버에서는 POST /api/v1/workflow/site-map/crawl 로 백그라운드 실행
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from urllib.parse import urldefrag, urlparse
+
+from utils.browser_pool import get_browser_pool
+from utils.config import settings
+from utils.dom_snapshot import render_summary, take_snapshot
+from utils.readiness import get_readiness
+from workflow.runtime import get_runtime
+
+# 방문하면 세션이 끊기거나 로그인 화면으로 가는 링크
+SKIP_PATTERNS = ("logout", "signout", "sign-out", "log-out", "signin", "login")
+
+
+def _normalize(url: str) -> str:
+    """fragment 제거(해시 라우팅 #/path는 경로로 유지)"""
+    base, fragment = urldefrag(url)
+    return f"{base}#{fragment}" if fragment.startswith("/") else base
+
+
+def _crawlable(url: str, host: str) -> bool:
+    parsed = urlparse(url)
+    return (parsed.scheme in ("http", "https") and parsed.hostname == host
+            and not any(p in url.lower() for p in SKIP_PATTERNS))
+
+
+async def _visit(context, url: str, depth: int, portal: str, host: str) -> dict | None:
+    page = await context.new_page()
+    try:
+        await get_readiness().after(page, page.goto(url, wait_until="domcontentloaded", timeout=30000), "crawl.page", url=url)
+        final_url = _normalize(page.url)
+        if not _crawlable(final_url, host):
+            return None  # 로그인 화면/다른 호스트로 이동됨
+        # 제목/헤딩/링크/요약 모두 한 번의 DOM 스냅샷에서
+        snapshot = await take_snapshot(page, max_controls=500)
+        links, seen = [], set()
+        for control in snapshot["controls"]:
+            href = _normalize(control.get("abs") or "")
+            if href and href not in seen and href != final_url and _crawlable(href, host):
+                seen.add(href)
+                links.append([href, control.get("text", "")[:80]])
+        return {
+            "url": final_url,
+            "portal": portal,
+            "title": snapshot["title"],
+            "headings": snapshot["headings"][:30],
+            "links": links,
+            "summary": render_summary(snapshot),
+            "depth": depth,
+            "crawled_at": time.time(),
+        }
+    except Exception as e:
+        print(f"[crawler] 방문 실패 {url}: {e}")
+        return None
+    finally:
+        await page.close()
+
+
+async def crawl_portal(portal: str, max_pages: int, max_depth: int, concurrency: int) -> list[dict]:
+    """portal 하나를 시작 페이지부터 BFS로 순회해 페이지 목록 반환"""
+    navigation_agent = get_runtime().navigation_agent
+    start_url = _normalize(navigation_agent.portals[portal])
+    host = urlparse(start_url).hostname
+    storage_state = await navigation_agent._cached_session(portal) or await navigation_agent._fresh_login(portal, path="/")
+    if not storage_state:
+        print(f"[crawler] {portal} 로그인 실패: 로그인 없이 보이는 페이지만 수집")
+    pages, visited = [], set()
+    seen = {start_url}
+    queue = deque([(start_url, 0)])
+    async with get_browser_pool().context(storage_state=storage_state) as context:
+        while queue and len(pages) < max_pages:
+            batch = [queue.popleft() for _ in range(min(concurrency, len(queue), max_pages - len(pages)))]
+            results = await asyncio.gather(*(_visit(context, url, depth, portal, host) for url, depth in batch))
+            for (url, depth), page in zip(batch, results):
+                # 리다이렉트로 같은 화면에 도달한 URL은 한 번만 기록
+                if page is None or page["url"] in visited:
+                    continue
+                visited.add(page["url"])
+                pages.append(page)
+                if depth >= max_depth:
+                    continue
+                for href, _ in page["links"]:
+                    if href not in seen:
+                        seen.add(href)
+                        queue.append((href, depth + 1))
+            print(f"[crawler] {portal}: {len(pages)}페이지 수집, 대기 {len(queue)}")
+    return pages
+
+
+async def crawl(portals: list[str] | None = None, max_pages: int | None = None, max_depth: int | None = None,
+                concurrency: int | None = None) -> dict:
+    """포털들을 크롤링해 사이트맵 인덱스를 다시 만든다. 일부 포털만 크롤링하면 나머지 포털 페이지는 유지"""
+    runtime = get_runtime()
+    site_map = runtime.site_map
+    if site_map is None:
+        raise RuntimeError("SITE_MAP_ENABLED=False")
+    portals = portals or list(settings.CRAWL_PORTALS)
+    start = time.perf_counter()
+    crawled, counts = [], {}
+    for portal in portals:
+        pages = await crawl_portal(
+            portal,
+            max_pages=max_pages or settings.CRAWL_MAX_PAGES,
+            max_depth=max_depth if max_depth is not None else settings.CRAWL_MAX_DEPTH,
+            concurrency=max(1, concurrency or settings.CRAWL_CONCURRENCY),
+        )
+        crawled.extend(pages)
+        counts[portal] = len(pages)
+    kept = [p for p in site_map.pages if p.get("portal") not in portals]
+    # 임베딩 계산(CPU)은 이벤트 루프 밖에서
+    await asyncio.to_thread(site_map.build, kept + crawled)
+    return {"portals": counts, "pages": len(site_map.pages), "elapsed_s": round(time.perf_counter() - start, 1)}
+
+
+# ---- 서버 백그라운드 실행 ----
+_crawl_task: asyncio.Task | None = None
+_last_result: dict | None = None
+
+
+def start_background_crawl(**options) -> bool:
+    """백그라운드 크롤 시작. 이미 실행 중이면 False"""
+    global _crawl_task
+    if _crawl_task is not None and not _crawl_task.done():
+        return False
+
+    async def run():
+        global _last_result
+        started_at = time.time()
+        try:
+            _last_result = {"status": "done", "started_at": started_at, **await crawl(**options)}
+        except Exception as e:
+            print(f"[crawler] 실패: {e}")
+            _last_result = {"status": "failed", "started_at": started_at, "error": str(e)}
+
+    _crawl_task = asyncio.create_task(run())
+    return True
+
+
+def crawl_status() -> dict:
+    running = _crawl_task is not None and not _crawl_task.done()
+    return {"running": running, "last": _last_result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="포털 크롤링 → 사이트맵 인덱스 구축")
+    parser.add_argument("portals", nargs="*", help="console/developers/tenant. 생략 시 CRAWL_PORTALS")
+    parser.add_argument("--max-pages", type=int, default=None, help="포털당 최대 페이지 수")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None, help="동시 탭 수")
+    args = parser.parse_args()
+    result = asyncio.run(crawl(args.portals or None, args.max_pages, args.max_depth, args.concurrency))
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,207 @@
-from langgraph.graph import StateGraph, END
-from typing import Any, List, Dict
-from utils.config import get_llm_azopai
+from langgraph.graph import StateGraph, END, START
+from typing import Annotated, Any, List, Dict
+from langchain_core.runnables import RunnableConfig
 import asyncio
-from workflow.agents.table_agent import TableAgent
-from workflow.agents.rag_agent import RAGAgent
-from workflow.agents.navigation_agent import NavigationAgent
-from workflow.agents.interact_agent import InteractiveAgent
+import operator
+from workflow.runtime import get_runtime
+from workflow.ui_router import decide_ui_route
+from utils.config import settings
+from utils.deadline import shift
 import logging
 import json
 
+def _last_value(_old, new):
+    """병렬 노드가 같은 superstep에서 함께 써도 되는 '마지막 값' 리듀서"""
+    return new
+
 # 1. 상태 정의 (messages: List[Dict] with role, content)
+# 문서 브랜치와 콘솔 브랜치가 병렬로 실행되므로 공용 키(messages/response)는 리듀서로 병합하고,
+# 각 노드는 전체 state가 아니라 자신이 바꾼 키(delta)만 반환한다.
 class ApimQueryState(dict):
-    messages: List[Dict]    # [{"role": "user|agent|system", "content": ...}, ...]
-    response: str = None    # 각 agent 단계별 내역 및 최종 응답 리스트
+    messages: Annotated[List[Dict], operator.add]    # [{"role": "user|agent|system", "content": ...}, ...]
+    response: Annotated[str, _last_value] = None    # 각 agent 단계별 내역 및 최종 응답 리스트
     rag_result: dict = None  # ragagent가 찾은 관련 문서들
     navigation_result: dict = None
     interactive_result: dict = None
+    ui_mode: str = None      # 요청 파라미터: auto | always | never
+    ui_route: dict = None    # route 노드의 UI 탐색 여부 판단 결과
+    deadline: float = None   # 요청 데드라인(epoch 초). 노드별 예산의 기준
+    auth_state_path: str = None  # 공유 로그인 세션(storage state) 파일. 배치 실행에서 질문 간 재사용
+    browser_session: str = None  # navigation이 연 페이지의 브라우저 풀 핸들(interactive가 인계받아 사용 후 반납)
+
+# 에이전트/LLM 인스턴스는 런타임 컨테이너(workflow.runtime)에서 공유
+
+def _local_state(state: ApimQueryState) -> dict:
+    """에이전트가 제자리 수정해도 그래프 채널 값에 영향이 없도록 messages를 복사한 state"""
+    return {**state, "messages": list(state.get("messages") or [])}
+
+def _node_update(local: dict, base: int, result: dict, owned: tuple = ()) -> dict:
+    """에이전트 결과에서 노드가 바꾼 부분(delta)만 추출: 새 메시지, response, 노드 소유 키"""
+    messages = (result.get("messages") or local["messages"])[base:]
+    update = {"messages": messages, "response": result.get("response")}
+    for key in owned:
+        if key in result:
+            update[key] = result[key]
+    return update
+
+def _node_deadline(state: ApimQueryState, config: RunnableConfig, node: str) -> float | None:
+    """요청 데드라인에서 뒤 단계 몫(NODE_DEADLINE_RESERVE_S)을 뺀 노드 예산
+    재개 실행은 체크포인트의 지난 데드라인 대신 config로 받은 새 데드라인을 사용한다.
+    """
+    deadline = ((config or {}).get("configurable") or {}).get("deadline") or state.get("deadline")
+    return shift(deadline, settings.NODE_DEADLINE_RESERVE_S.get(node, 0.0))
+
+async def _run_agent(state: ApimQueryState, run, owned: tuple = (), deadline: float | None = None) -> dict:
+    local = _local_state(state)
+    # 에이전트는 state["deadline"]을 자기 예산으로 보고 대기/LLM 호출을 clamp
+    local["deadline"] = deadline
+    base = len(local["messages"])
+    result = await run(local)
+    return _node_update(local, base, result, owned)
 
-# Agent 인스턴스 생성
-async def get_llm():
-    llm = get_llm_azopai()
-    return llm
+def _run_id(config: RunnableConfig) -> str | None:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+def _user_question(state: ApimQueryState) -> str:
+    return next((m["content"] for m in reversed(state.get("messages") or []) if m["role"] == "user"), "")
+
+def _doc_confidence(runtime, question: str) -> float:
+    """문서 검색 최고 유사도. 로컬 변환 질의가 없으면(RAG_QUERY_REWRITE=llm, 용어집 미일치) 원문 질문으로 검색"""
+    results, _, confidence = runtime.rag_agent.local_rewriter.search(question, k=5)
+    if not results:
+        results = runtime.vector_db.search(question, k=5)
+        confidence = max((r["similarity"] for r in results), default=0.0)
+    return confidence
+
+# 라우터 노드: 문서만으로 충분하면 콘솔 브랜치(ui_intro → navigation → interactive → table_ui)를 생략
+async def route_node(state: ApimQueryState) -> ApimQueryState:
+    runtime = get_runtime()
+    question = _user_question(state)
+    # 로컬 검색(LLM 없이 수 ms)으로 문서 근거 충분성 추정. 인코딩은 이벤트 루프 밖에서
+    confidence = await asyncio.to_thread(_doc_confidence, runtime, question)
+    decision = decide_ui_route(
+        question,
+        confidence,
+        runtime.route_outcomes,
+        mode=state.get("ui_mode") or "auto",
+        doc_confidence=settings.UI_ROUTE_DOC_CONFIDENCE,
+        min_success_rate=settings.UI_ROUTE_MIN_SUCCESS_RATE,
+        min_samples=settings.UI_ROUTE_MIN_SAMPLES,
+        explore_rate=settings.UI_ROUTE_EXPLORE_RATE,
+    )
+    print(f"[route_node] UI 탐색 판단: {decision}")
+    return {"ui_route": decision}
+
+def select_branches(state: ApimQueryState) -> list[str]:
+    if (state.get("ui_route") or {}).get("explore", True):
+        return ["rag", "ui_intro"]
+    return ["rag"]
 
 # RAGAgent 노드
-async def rag_node(state: ApimQueryState) -> ApimQueryState:
-    llm = await get_llm()
-    rag_agent = RAGAgent(llm)
-    result = await rag_agent.run(state=state)
+async def rag_node(state: ApimQueryState, config: RunnableConfig = None) -> ApimQueryState:
+    rag_agent = get_runtime().rag_agent
+    result = await _run_agent(
+        state, lambda s: rag_agent.run(state=s), owned=("rag_result",),
+        deadline=_node_deadline(state, config, "rag"),
+    )
     print(f"[rag_node] rag_agent 결과: {result.get('response')}")
     return result
 
 # TableAgent 노드 공용
-async def table_node(state: ApimQueryState) -> ApimQueryState:
-    llm = await get_llm()
-    table_agent = TableAgent(llm)
-    result = await table_agent.run(state=state)
+async def table_node(state: ApimQueryState, config: RunnableConfig = None) -> ApimQueryState:
+    table_agent = get_runtime().table_agent
+    result = await _run_agent(
+        state, lambda s: table_agent.run(state=s),
+        deadline=_node_deadline(state, config, "table"),
+    )
     print(f"[table_node] table_agent 결과: {result.get('response')}")
     return result
 
-# UI 진입 안내 노드
+# UI 진입 안내 노드 (문서 검색과 동시에 콘솔 브랜치 시작을 알림)
 async def ui_intro_node(state: ApimQueryState) -> ApimQueryState:
-    msg = "이제 직접 콘솔에 들어가서 확인해 보겠습니다. 잠시만 기다려주세요..."
-    state.setdefault("messages", []).append({"role": "system", "content": msg})
+    msg = "문서 검색과 함께 콘솔에도 직접 접속해 확인하고 있습니다. 잠시만 기다려주세요..."
     print(f"[ui_intro_node] {msg}")
-    return {**state, "response": msg}
-
-# NavigationAgent 노드
-async def navigation_node(state: ApimQueryState) -> ApimQueryState:
-    navigation_agent = NavigationAgent()
-    user_question = next((m["content"] for m in reversed(state["messages"]) if m["role"] == "user"), "")
-    rag_str = ""
-    if state.get("rag_result"):
-        rag = state["rag_result"]
-        if isinstance(rag, list):
-            rag_str = "\n".join([ (r.get("document",{}).get("search_text",""))[:200] for r in rag[:3] ])
-    result = await navigation_agent.run(state=state, user_question=user_question, rag_result=rag_str)
+    return {"messages": [{"role": "system", "content": msg}], "response": msg}
+
+# NavigationAgent 노드 (문서 브랜치 결과와 무관하게 포털 선택/로그인 수행)
+async def navigation_node(state: ApimQueryState, config: RunnableConfig = None) -> ApimQueryState:
+    navigation_agent = get_runtime().navigation_agent
+    user_question = _user_question(state)
+    # 브라우저 동시 실행 상한(BROWSER_MAX_CONCURRENCY) 슬롯은 에이전트가 세션을 열 때 잡고 세션 반납 때 놓는다
+    result = await _run_agent(
+        state,
+        lambda s: navigation_agent.run(state=s, user_question=user_question, session_owner=_run_id(config)),
+        owned=("navigation_result", "browser_session"),
+        deadline=_node_deadline(state, config, "navigation"),
+    )
     print(f"[navigation_node] navigation_agent 결과: {result.get('response')}")
     return result
 
-# InteractiveAgent 노드
-async def interactive_node(state: ApimQueryState) -> ApimQueryState:
-    interactive_agent = InteractiveAgent()
-    user_question = next((m["content"] for m in reversed(state["messages"]) if m["role"] == "user"), "")
+# InteractiveAgent 노드 (문서 브랜치 + 콘솔 브랜치 fan-in)
+async def interactive_node(state: ApimQueryState, config: RunnableConfig = None) -> ApimQueryState:
+    interactive_agent = get_runtime().interactive_agent
+    user_question = _user_question(state)
+    # 재개 실행(resume): 이전 실행에서 로그인에 실패했다면 여기서 navigation만 다시 수행
+    # (table_rag 등 완료된 노드는 체크포인트 값을 그대로 사용)
+    nav_update = {"messages": []}
+    resuming = ((config or {}).get("configurable") or {}).get("resume")
+    if resuming and not state.get("navigation_result"):
+        nav_update = await navigation_node(state, config)
+        state = {
+            **state,
+            "messages": list(state.get("messages") or []) + nav_update["messages"],
+            "navigation_result": nav_update.get("navigation_result"),
+            "browser_session": nav_update.get("browser_session"),
+        }
     target_url = None
     if state.get("navigation_result"):
         target_url = state["navigation_result"].get("target_url")
-    result = await interactive_agent.run(state=state, user_question=user_question, target_url=target_url)
+    result = await _run_agent(
+        state,
+        lambda s: interactive_agent.run(state=s, user_question=user_question, target_url=target_url,
+                                        session_owner=_run_id(config)),
+        owned=("interactive_result",),
+        deadline=_node_deadline(state, config, "interactive"),
+    )
+    if nav_update["messages"]:
+        result["messages"] = nav_update["messages"] + result["messages"]
+        result["navigation_result"] = nav_update.get("navigation_result")
+    # 인계받은 페이지는 interactive가 반납했으므로 핸들 비움
+    result["browser_session"] = None
     print(f"[interactive_node] interactive_agent 결과: {result.get('response')}")
+    # 라우팅 학습용 결과 기록: 탐색이 시간 안에 최종 URL까지 도달했으면 성공
+    route = state.get("ui_route") or {}
+    if route.get("question_class"):
+        interactive_result = result.get("interactive_result") or {}
+        useful = bool(interactive_result.get("final_url")) and not interactive_result.get("partial")
+        # JSON 저장(파일 I/O)은 이벤트 루프 밖에서
+        await asyncio.to_thread(get_runtime().route_outcomes.record, route["question_class"], useful)
     return result
 
 # LangGraph 워크플로우 정의
-def create_apim_query_graph():
+def create_apim_query_graph(checkpointer=None):
     print("[create_apim_query_graph] 워크플로우 생성 시작")
     workflow = StateGraph(ApimQueryState)
+    workflow.add_node("route", route_node)
     workflow.add_node("rag", rag_node)
     workflow.add_node("table_rag", table_node)
     workflow.add_node("ui_intro", ui_intro_node)
     workflow.add_node("navigation", navigation_node)
     workflow.add_node("interactive", interactive_node)
     workflow.add_node("table_ui", table_node)
+    # route: UI 탐색이 필요하면 문서 브랜치(rag → table_rag)와 콘솔 브랜치(ui_intro → navigation)를 병렬 실행
+    # → table_rag의 LLM 요약과 navigation의 브라우저 로그인이 같은 superstep에서 겹친다
+    # 필요 없으면 문서 브랜치만 실행하고 table_rag에서 종료(fan-in 미충족)
+    workflow.add_edge(START, "route")
+    workflow.add_conditional_edges("route", select_branches, ["rag", "ui_intro"])
     workflow.add_edge("rag", "table_rag")
-    workflow.add_edge("table_rag", "ui_intro")
     workflow.add_edge("ui_intro", "navigation")
-    workflow.add_edge("navigation", "interactive")
+    # fan-in: 두 브랜치가 모두 끝나야 interactive 시작
+    workflow.add_edge(["table_rag", "navigation"], "interactive")
     workflow.add_edge("interactive", "table_ui")
     workflow.add_edge("table_ui", END)
-    workflow.set_entry_point("rag")
     print("[create_apim_query_graph] 워크플로우 생성 완료")
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
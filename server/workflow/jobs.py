@@ -0,0 +1,247 @@
+# 비동기 작업(Job) 큐: 질의 실행을 프로세스 내 큐에 넣고 고정 개수 worker가 처리한다.
+# - submit: 대기열이 가득 찼거나 예상 대기 시간이 너무 길면 즉시 거절(JobRejected → 503)
+# - status: 대기 순번/대기 시간/실행 시간 조회
+# - follow: 이미 나온 이벤트를 재생한 뒤 완료될 때까지 새 이벤트를 이어서 전달(연결이 끊겨도 작업은 계속)
+# - low_priority: 기다리는 클라이언트가 없는 작업(stale 캐시 갱신 등). 별도 대기열에 두고 일반 대기열이
+#   비었을 때만 접수/실행한다(사용자 요청 자리를 뺏지 않음)
+# worker 수는 동시에 실행되는 질의 수의 상한이고, 브라우저/LLM은 별도 상한(utils.concurrency)으로 제한된다.
+
+import asyncio
+import time
+import uuid
+from collections import deque
+from utils.concurrency import _round, percentile
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobRejected(Exception):
+    """부하 차단(load shedding)으로 작업 접수 거절"""
+
+    def __init__(self, reason: str, message: str, retry_after_s: float):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+        self.retry_after_s = retry_after_s
+
+
+class Job:
+    def __init__(self, factory, timeout_s: float, params: dict):
+        self.id = uuid.uuid4().hex
+        self.factory = factory        # factory(timeout_s) → 이벤트(dict) async iterator
+        self.timeout_s = timeout_s    # 접수 시점부터의 전체 예산(대기 시간 포함)
+        self.params = params
+        self.status = QUEUED
+        self.events: list[dict] = []
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._cond = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    async def _emit(self, event: dict) -> None:
+        async with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    async def _finish(self, status: str, error: str | None = None) -> None:
+        async with self._cond:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def queue_wait_ms(self) -> float:
+        end = self.started_at or time.time()
+        return round((end - self.created_at) * 1000, 1)
+
+    def run_ms(self) -> float | None:
+        if self.started_at is None:
+            return None
+        return round(((self.finished_at or time.time()) - self.started_at) * 1000, 1)
+
+
+class JobManager:
+    def __init__(self, workers: int = 4, max_queue: int = 20, max_queue_wait_s: float = 20.0,
+                 retention_s: float = 600.0, window: int = 200, max_background: int = 4):
+        self.workers = max(1, int(workers))
+        self.max_queue = max_queue
+        self.max_background = max_background
+        self.max_queue_wait_s = max_queue_wait_s
+        self.retention_s = retention_s
+        self.jobs: dict[str, Job] = {}
+        self._queue: deque[Job] = deque()
+        self._background: deque[Job] = deque()
+        self._available = asyncio.Semaphore(0)
+        self._tasks: list[asyncio.Task] = []
+        self.running = 0
+        self.submitted = 0
+        self.shed = 0
+        self.background_skipped = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue_waits_ms: deque[float] = deque(maxlen=window)
+        self._run_s: deque[float] = deque(maxlen=window)
+
+    # ---- 접수/조회 ----
+    def submit(self, factory, timeout_s: float, params: dict | None = None, low_priority: bool = False) -> Job:
+        self._purge()
+        self._ensure_workers()
+        if low_priority:
+            return self._submit_background(factory, timeout_s, params)
+        queued = len(self._queue)
+        if queued >= self.max_queue:
+            self._reject("queue_full", f"대기 중인 요청이 너무 많습니다({queued}건). 잠시 후 다시 시도해주세요")
+        estimated = self.estimated_wait_s(queued + 1)
+        if estimated is not None and estimated > min(self.max_queue_wait_s, timeout_s):
+            self._reject("overloaded", f"요청이 많아 예상 대기 시간({estimated:.0f}초)이 너무 깁니다. 잠시 후 다시 시도해주세요")
+        job = Job(factory, timeout_s, params or {})
+        self.jobs[job.id] = job
+        self._queue.append(job)
+        self._available.release()
+        self.submitted += 1
+        print(f"[jobs] 접수 {job.id} (대기 {len(self._queue)}건, 실행 {self.running}건)")
+        return job
+
+    def _submit_background(self, factory, timeout_s: float, params: dict | None) -> Job:
+        # 사용자 요청이 대기 중이면 미룰 수 있는 작업은 받지 않는다(shed 지표와 별도로 집계)
+        if self._queue or len(self._background) >= self.max_background:
+            self.background_skipped += 1
+            raise JobRejected("busy", "대기 중인 요청이 있어 백그라운드 작업을 접수하지 않습니다", self.max_queue_wait_s)
+        job = Job(factory, timeout_s, params or {})
+        self.jobs[job.id] = job
+        self._background.append(job)
+        self._available.release()
+        self.submitted += 1
+        print(f"[jobs] 백그라운드 접수 {job.id} (대기 {len(self._background)}건)")
+        return job
+
+    def _reject(self, reason: str, message: str) -> None:
+        self.shed += 1
+        retry_after_s = max(1.0, self.estimated_wait_s(len(self._queue)) or self.max_queue_wait_s)
+        print(f"[jobs] 접수 거절({reason}): {message}")
+        raise JobRejected(reason, message, retry_after_s)
+
+    def estimated_wait_s(self, position: int) -> float | None:
+        """대기 순번 기준 예상 대기 시간: 앞선 작업 수 / worker 수 × 최근 평균 실행 시간"""
+        if not self._run_s:
+            return None
+        ahead = max(0, position - (self.workers - self.running))
+        avg_run_s = sum(self._run_s) / len(self._run_s)
+        return ahead / self.workers * avg_run_s
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> int | None:
+        """대기열 순번(1부터, 백그라운드 작업은 일반 대기열 뒤). 실행 중/완료면 None"""
+        if job in self._queue:
+            return self._queue.index(job) + 1
+        if job in self._background:
+            return len(self._queue) + self._background.index(job) + 1
+        return None
+
+    def status(self, job: Job) -> dict:
+        position = self.position(job)
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "position": position,
+            "estimated_wait_s": self.estimated_wait_s(position) if position else None,
+            "queue_wait_ms": job.queue_wait_ms(),
+            "run_ms": job.run_ms(),
+            "events": len(job.events),
+            "error": job.error,
+            "params": job.params,
+        }
+
+    async def follow(self, job: Job, start: int = 0):
+        """start번째 이벤트부터 재생하고, 작업이 끝날 때까지 새 이벤트를 기다려 전달"""
+        i = start
+        while True:
+            async with job._cond:
+                await job._cond.wait_for(lambda: len(job.events) > i or job.finished)
+                pending = job.events[i:]
+                finished = job.finished
+            for event in pending:
+                yield event
+            i += len(pending)
+            if finished and i >= len(job.events):
+                return
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "background_queued": len(self._background),
+            "background_skipped": self.background_skipped,
+            "submitted": self.submitted,
+            "shed": self.shed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_wait_ms_p50": _round(percentile(self._queue_waits_ms, 50)),
+            "queue_wait_ms_p95": _round(percentile(self._queue_waits_ms, 95)),
+            "run_s_avg": round(sum(self._run_s) / len(self._run_s), 2) if self._run_s else None,
+        }
+
+    # ---- worker ----
+    def _ensure_workers(self) -> None:
+        """최초 접수 시 worker 시작(실행 중인 이벤트 루프 필요)"""
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker(len(self._tasks))))
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            await self._available.acquire()
+            job = self._queue.popleft() if self._queue else self._background.popleft()
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        job.started_at = time.time()
+        job.status = RUNNING
+        self.running += 1
+        wait_ms = job.queue_wait_ms()
+        self._queue_waits_ms.append(wait_ms)
+        print(f"[jobs] 실행 시작 {job.id} (대기 {wait_ms:.0f}ms)")
+        try:
+            # 대기한 시간만큼 예산에서 차감(클라이언트 timeout은 접수 시점부터 흐른다)
+            left_s = job.timeout_s - wait_ms / 1000
+            if left_s <= 0:
+                raise TimeoutError("대기열에서 시간 예산을 모두 소진했습니다")
+            async for event in job.factory(left_s):
+                await job._emit(event)
+            await job._finish(DONE)
+            self.completed += 1
+        except asyncio.CancelledError:
+            await job._finish(FAILED, "cancelled")
+            raise
+        except Exception as e:
+            print(f"[jobs] 실행 실패 {job.id}: {e}")
+            await job._emit({"type": "error", "response": f"처리 중 오류가 발생했습니다: {e}", "meta": {"retryable": True}})
+            await job._emit({"type": "end"})
+            await job._finish(FAILED, str(e))
+            self.failed += 1
+        finally:
+            self.running -= 1
+            self._run_s.append(time.time() - job.started_at)
+
+    def _purge(self) -> None:
+        """보관 기간이 지난 완료 작업 정리"""
+        now = time.time()
+        expired = [jid for jid, job in self.jobs.items()
+                   if job.finished and now - job.finished_at > self.retention_s]
+        for jid in expired:
+            del self.jobs[jid]
+
+    async def aclose(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
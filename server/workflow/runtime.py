@@ -0,0 +1,175 @@
+# 애플리케이션 단위 런타임 컨테이너
+# 컴파일된 그래프, 에이전트 인스턴스, 노드별 LLM 클라이언트, VectorDB 핸들을 한 번만 만들고
+# 요청 간 공유한다. FastAPI lifespan에서 start_runtime()으로 생성하며, 그래프 노드는 get_runtime()으로 의존성을 얻는다.
+
+import asyncio
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from retrieval.vector_db import VectorDB, init_default_vector_db
+from retrieval.site_map import SiteMap
+from retrieval.action_ranker import ActionRanker
+from retrieval.nav_memory import NavigationMemory
+from utils.config import get_llm_for, settings
+from workflow.ui_router import RouteOutcomeStore
+from utils.answer_cache import AnswerCache
+from utils.concurrency import ConcurrencyLimiter, LimitedLLM
+from utils.browser_pool import get_browser_pool, shutdown_browser_pool
+from workflow.jobs import JobManager
+from workflow.agents.rag_agent import RAGAgent
+from workflow.agents.table_agent import TableAgent
+from workflow.agents.navigation_agent import NavigationAgent
+from workflow.agents.interact_agent import InteractiveAgent
+
+# 노드별 LLM 티어 이름(utils.config.LLM_NODE_TIERS)
+LLM_NODES = ["rag_query", "portal_select", "next_action", "table_summary", "final_answer"]
+
+
+class ApimRuntime:
+    def __init__(self, vector_db: VectorDB | None = None, checkpointer=None):
+        # lifespan 밖(CLI/벤치마크/크롤러)에서도 서버와 같은 문서 인덱스를 로드(빈 인덱스로 대체하지 않음)
+        self.vector_db = vector_db or init_default_vector_db()
+        # 동시 실행 상한: 브라우저 세션과 LLM 호출을 따로 제한(문서 전용 질의는 브라우저 슬롯을 기다리지 않음)
+        self.browser_limiter = ConcurrencyLimiter("browser", settings.BROWSER_MAX_CONCURRENCY)
+        self.llm_limiter = ConcurrencyLimiter("llm", settings.LLM_MAX_CONCURRENCY)
+        self.llms = {node: LimitedLLM(get_llm_for(node), self.llm_limiter) for node in LLM_NODES}
+        self.rag_agent = RAGAgent(self.llms["rag_query"], vector_db=self.vector_db)
+        self.table_agent = TableAgent(self.llms["table_summary"])
+        self.navigation_agent = NavigationAgent(self.llms["portal_select"], browser_limiter=self.browser_limiter)
+        # 크롤러가 구축한 포털 사이트맵(질문 → 목표 화면)
+        self.site_map = SiteMap(str(Path(settings.DATA_DIR) / "site_map"), self.vector_db) if settings.SITE_MAP_ENABLED else None
+        # 클릭 후보 사전 순위(같은 인코더)
+        self.action_ranker = ActionRanker(
+            self.vector_db,
+            top_k=settings.ACTION_RANK_TOP_K,
+            auto_score=settings.ACTION_RANK_AUTO_SCORE,
+            auto_margin=settings.ACTION_RANK_AUTO_MARGIN,
+        ) if settings.ACTION_RANK_ENABLED else None
+        # 성공한 탐색 경로(비슷한 질문이면 최종 화면으로 바로 이동)
+        self.nav_memory = NavigationMemory(
+            str(Path(settings.DATA_DIR) / "nav_memory.json"),
+            self.vector_db,
+            max_entries=settings.NAV_MEMORY_MAX_ENTRIES,
+            min_similarity=settings.NAV_MEMORY_SIMILARITY,
+        ) if settings.NAV_MEMORY_ENABLED else None
+        self.interactive_agent = InteractiveAgent(self.llms["final_answer"], self.llms["next_action"],
+                                                  site_map=self.site_map, ranker=self.action_ranker,
+                                                  memory=self.nav_memory, browser_limiter=self.browser_limiter)
+        # 질문 유형별 UI 탐색 성공/실패 기록(라우팅 판단용)
+        self.route_outcomes = RouteOutcomeStore(
+            str(Path(settings.DATA_DIR) / "ui_route_outcomes.json"), decay=settings.UI_ROUTE_DECAY
+        )
+        # 요청 단위 답변 캐시
+        self.answer_cache = AnswerCache(
+            ttl_s=settings.ANSWER_CACHE_TTL_S,
+            console_max_age_s=settings.ANSWER_CACHE_CONSOLE_MAX_AGE_S,
+            stale_max_s=settings.ANSWER_CACHE_STALE_MAX_S,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            console_stale_max_s=settings.ANSWER_CACHE_CONSOLE_STALE_MAX_S,
+            # 갱신 작업의 시간 예산(BATCH_TIMEOUT_S)이 지나면 끝난 것으로 보고 다시 갱신 가능
+            refresh_timeout_s=settings.BATCH_TIMEOUT_S,
+        )
+        # 질의 작업 큐(submit/status/stream)
+        self.jobs = JobManager(
+            workers=settings.JOB_WORKERS,
+            max_queue=settings.JOB_QUEUE_MAX,
+            max_queue_wait_s=settings.JOB_MAX_QUEUE_WAIT_S,
+            retention_s=settings.JOB_RETENTION_S,
+        )
+        # 그래프 모듈이 get_runtime()을 참조하므로 지연 import
+        from workflow.graph import create_apim_query_graph
+        self.checkpointer = checkpointer
+        self.graph = create_apim_query_graph(checkpointer=checkpointer)
+        self._exit_stack = AsyncExitStack()
+
+    async def aclose(self) -> None:
+        """종료 시 작업 worker, 체크포인터 연결 등 비동기 자원 해제"""
+        await self.jobs.aclose()
+        await self._exit_stack.aclose()
+
+
+_RUNTIME: ApimRuntime | None = None
+
+
+def init_runtime(vector_db: VectorDB | None = None, checkpointer=None) -> ApimRuntime:
+    """런타임을 (재)생성해 전역으로 등록"""
+    global _RUNTIME
+    _RUNTIME = ApimRuntime(vector_db=vector_db, checkpointer=checkpointer)
+    print("[runtime] ApimRuntime 초기화 완료")
+    return _RUNTIME
+
+
+async def prune_checkpoints(checkpointer, ttl_s: float) -> int:
+    """마지막 체크포인트가 ttl_s보다 오래된 스레드(재개되지 않은 실패/중단 실행) 삭제. 삭제한 스레드 수 반환"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ttl_s)).isoformat()
+    latest: dict[str, str] = {}
+    async for item in checkpointer.alist(None):
+        thread_id = item.config["configurable"]["thread_id"]
+        ts = item.checkpoint["ts"]
+        if ts > latest.get(thread_id, ""):
+            latest[thread_id] = ts
+    expired = [thread_id for thread_id, ts in latest.items() if ts < cutoff]
+    for thread_id in expired:
+        await checkpointer.adelete_thread(thread_id)
+    return len(expired)
+
+
+async def _prune_checkpoints_loop(checkpointer, ttl_s: float) -> None:
+    """기동 시 1회, 이후 주기적으로(TTL과 1시간 중 짧은 간격) 만료 체크포인트 정리"""
+    while True:
+        try:
+            removed = await prune_checkpoints(checkpointer, ttl_s)
+            if removed:
+                print(f"[runtime] 만료된 그래프 체크포인트 정리: {removed}개 실행")
+        except Exception as e:
+            print(f"[runtime] 그래프 체크포인트 정리 실패: {e}")
+        await asyncio.sleep(min(ttl_s, 3600))
+
+
+async def _cancel_task(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def start_runtime(vector_db: VectorDB | None = None) -> ApimRuntime:
+    """lifespan용: SQLite 체크포인터를 열고 런타임 생성(실패한 실행을 마지막 성공 노드부터 재개)"""
+    exit_stack = AsyncExitStack()
+    checkpointer = None
+    if settings.GRAPH_CHECKPOINT_ENABLED:
+        try:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            path = Path(settings.GRAPH_CHECKPOINT_PATH or Path(settings.DATA_DIR) / "graph_checkpoints.sqlite")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            checkpointer = await exit_stack.enter_async_context(AsyncSqliteSaver.from_conn_string(str(path)))
+            print(f"[runtime] 그래프 체크포인터 사용: {path}")
+            # 체크포인터 연결보다 먼저 정리 작업을 멈추도록 나중에 등록(exit stack은 역순 해제)
+            prune_task = asyncio.create_task(_prune_checkpoints_loop(checkpointer, settings.GRAPH_CHECKPOINT_TTL_S))
+            exit_stack.push_async_callback(_cancel_task, prune_task)
+        except ImportError:
+            print("[runtime] langgraph-checkpoint-sqlite 미설치: 체크포인트 없이 실행")
+    # 브라우저 풀: 첫 요청 전에 Chromium을 미리 띄우고, 종료 시 함께 정리
+    exit_stack.push_async_callback(shutdown_browser_pool)
+    try:
+        await get_browser_pool().start()
+    except Exception as e:
+        print(f"[runtime] 브라우저 풀 기동 실패(첫 사용 시 재시도): {e}")
+    runtime = init_runtime(vector_db=vector_db, checkpointer=checkpointer)
+    runtime._exit_stack = exit_stack
+    return runtime
+
+
+def get_runtime() -> ApimRuntime:
+    """전역 런타임 반환. lifespan 밖(CLI/벤치마크)에서는 최초 호출 시 생성"""
+    if _RUNTIME is None:
+        return init_runtime()
+    return _RUNTIME
+
+
+async def shutdown_runtime() -> None:
+    global _RUNTIME
+    if _RUNTIME is not None:
+        await _RUNTIME.aclose()
+    _RUNTIME = None
@@ -0,0 +1,97 @@
+# 콘솔(UI) 탐색 필요 여부 라우팅
+# 검색 유사도(문서 근거 충분성) + 질문 유형 분류 + 과거 UI 탐색 결과(유형별 성공률)로
+# navigation/interactive 브랜치 실행 여부를 결정한다. 요청 파라미터 ui_mode(always|never)로 강제 가능.
+# - 성공률은 지수 감쇠(decay)로 누적해 최근 결과를 더 반영한다
+# - 성공률이 낮아 생략하는 경우에도 explore_rate 확률로 탐색해 성공률이 회복될 기회를 남긴다
+# - 질문 분류가 ui인 질문은 성공률과 무관하게 항상 탐색한다
+
+import json
+import random
+import threading
+from pathlib import Path
+
+# 콘솔 화면을 직접 봐야 답할 수 있는 질문 신호
+UI_KEYWORDS = [
+    "어디", "화면", "메뉴", "버튼", "클릭", "콘솔에서", "포털에서", "페이지", "위치",
+    "현재", "지금", "목록", "조회", "등록된", "설정된", "적용된", "상태", "우리", "내 ",
+]
+# 문서만으로 답할 수 있는 개념/설명형 질문 신호
+DOC_KEYWORDS = [
+    "무엇", "뭐야", "뭔가요", "이란", "란?", "개념", "의미", "차이", "설명", "왜",
+    "원리", "종류", "지원", "가능", "역할", "특징", "장점",
+]
+
+
+def classify_question(question: str) -> str:
+    """질문 유형 분류: ui | doc | mixed"""
+    q = question.lower()
+    ui_hits = sum(1 for k in UI_KEYWORDS if k in q)
+    doc_hits = sum(1 for k in DOC_KEYWORDS if k in q)
+    if ui_hits > doc_hits:
+        return "ui"
+    if doc_hits > ui_hits:
+        return "doc"
+    return "mixed"
+
+
+class RouteOutcomeStore:
+    """질문 유형별 UI 탐색 성공/실패 누적(선택적으로 JSON 파일에 저장)"""
+
+    def __init__(self, path: str | None = None, decay: float = 0.95):
+        self.path = Path(path) if path else None
+        self.decay = decay
+        self.stats: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.stats = json.load(f)
+            except Exception as e:
+                print(f"[ui_router] outcome 로드 실패: {e}")
+
+    def record(self, question_class: str, useful: bool) -> None:
+        with self._lock:
+            entry = self.stats.setdefault(question_class, {"success": 0, "total": 0})
+            # 오래된 결과일수록 가중치가 줄어든다(total은 최대 1 / (1 - decay)에 수렴)
+            entry["total"] = entry["total"] * self.decay + 1
+            entry["success"] = entry["success"] * self.decay + (1 if useful else 0)
+            if self.path:
+                try:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.path, "w", encoding="utf-8") as f:
+                        json.dump(self.stats, f, ensure_ascii=False)
+                except Exception as e:
+                    print(f"[ui_router] outcome 저장 실패: {e}")
+
+    def success_rate(self, question_class: str, min_samples: int) -> float | None:
+        entry = self.stats.get(question_class)
+        if not entry or entry["total"] < min_samples:
+            return None
+        return entry["success"] / entry["total"]
+
+
+def decide_ui_route(question: str, confidence: float, outcomes: RouteOutcomeStore, mode: str = "auto",
+                    doc_confidence: float = 0.6, min_success_rate: float = 0.3, min_samples: int = 5,
+                    explore_rate: float = 0.1) -> dict:
+    """UI 탐색 여부 결정. 반환: {explore, reason, question_class, confidence, success_rate}"""
+    question_class = classify_question(question)
+    rate = outcomes.success_rate(question_class, min_samples)
+    decision = {
+        "question_class": question_class,
+        "confidence": round(confidence, 3),
+        "success_rate": None if rate is None else round(rate, 3),
+    }
+    if mode == "always":
+        return {**decision, "explore": True, "reason": "forced:always"}
+    if mode == "never":
+        return {**decision, "explore": False, "reason": "forced:never"}
+    if question_class == "ui":
+        return {**decision, "explore": True, "reason": "ui_question"}
+    # 과거 탐색이 이 유형에서 거의 도움이 안 됐다면 생략(가끔은 탐색해 성공률을 다시 측정)
+    if rate is not None and rate < min_success_rate:
+        if random.random() < explore_rate:
+            return {**decision, "explore": True, "reason": "explore_sample"}
+        return {**decision, "explore": False, "reason": "low_past_success"}
+    if confidence >= doc_confidence:
+        return {**decision, "explore": False, "reason": "docs_sufficient"}
+    return {**decision, "explore": True, "reason": "low_doc_confidence"}